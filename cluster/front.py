@@ -0,0 +1,26 @@
+import logging
+from aiohttp import web
+
+from cluster.sharding import ShardRouter
+from cluster.workers import WorkerPool
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+
+
+def create_front_app(pool: WorkerPool, router: ShardRouter, path: str, secret: str | None) -> web.Application:
+    """aiohttp-приложение фронт-процесса: принимает вебхук Telegram и передает
+    обновление воркеру его команды. Ответ 200 - сразу после постановки в очередь"""
+
+    async def receive_update(request: web.Request) -> web.Response:
+        if secret and request.headers.get(SECRET_HEADER) != secret:
+            return web.Response(status=401)
+
+        update = await request.json()
+        pool.dispatch(await router.resolve(update), update)
+        return web.Response()
+
+    app = web.Application()
+    app.router.add_post(path, receive_update)
+    return app
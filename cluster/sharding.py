@@ -0,0 +1,60 @@
+from help.cache import TTLCache
+from db.help_db_commands import get_user_team
+
+
+def shard_index(team_id: int | None, user_id: int, shards_count: int) -> int:
+    """Номер воркера для обновления: игроки команды - всегда на одном воркере,
+    игроки без команды распределяются по user_id"""
+    key = team_id if team_id is not None else user_id
+    return key % shards_count
+
+
+def update_user_id(update: dict) -> int:
+    """ID пользователя из необработанного Update (message, callback_query и т.д.), 0 - если его нет"""
+    for field, payload in update.items():
+        if field == 'update_id' or not isinstance(payload, dict):
+            continue
+
+        sender = payload.get('from') or payload.get('chat') or {}
+        return sender.get('id', 0)
+
+    return 0
+
+
+class Shard:
+    """Часть игроков, которую обслуживает один воркер"""
+    __slots__ = ('index', 'count')
+
+    def __init__(self, index: int, count: int):
+        self.index = index
+        self.count = count
+
+    async def owns_chat(self, chat_id: int) -> bool:
+        """Принадлежит ли личный чат игрока этому воркеру (для восстановления таймеров)"""
+        return shard_index(await get_user_team(chat_id), chat_id, self.count) == self.index
+
+    def __repr__(self):
+        return f"Shard({self.index}/{self.count})"
+
+
+class ShardRouter:
+    """Выбор воркера для обновления во фронт-процессе.
+
+    Команда игрока кэшируется на ttl секунд. Игроки без команды не кэшируются:
+    после вступления в команду их обновления сразу уходят воркеру команды.
+    """
+
+    def __init__(self, shards_count: int, maxsize: int, ttl: float):
+        self.shards_count = shards_count
+        self._teams = TTLCache(maxsize, ttl)    # {user_id: team_id}
+
+    async def resolve(self, update: dict) -> int:
+        user_id = update_user_id(update)
+
+        team_id = self._teams.get(user_id)
+        if team_id is None and user_id:
+            team_id = await get_user_team(user_id)
+            if team_id is not None:
+                self._teams.set(user_id, team_id)
+
+        return shard_index(team_id, user_id, self.shards_count)
@@ -0,0 +1,105 @@
+import os
+import queue
+import signal
+import asyncio
+import logging
+import multiprocessing
+
+from aiogram import Bot, Dispatcher
+
+from cluster.sharding import Shard
+
+logger = logging.getLogger(__name__)
+
+# воркеры создаются через fork до запуска event loop: им достаются уже
+# импортированные модули и объекты бота без повторного импорта main.py
+_context = multiprocessing.get_context('fork')
+
+
+class WorkerPool:
+    """Процессы-воркеры, каждый со своей очередью необработанных обновлений.
+
+    target(shard, queue) выполняется в процессе воркера и обрабатывает
+    обновления из queue, пока не получит None.
+    """
+
+    def __init__(self, workers_count: int, target):
+        self.workers_count = workers_count
+        self.target = target
+        self.queues = []
+        self.processes = []
+
+    def start(self):
+        """Запускает воркеры. Вызывается до asyncio.run во фронт-процессе"""
+        for index in range(self.workers_count):
+            updates = _context.Queue()
+            process = _context.Process(
+                target=_run, args=(self.target, Shard(index, self.workers_count), updates),
+                name=f"quest-worker-{index}",
+            )
+            process.start()
+
+            self.queues.append(updates)
+            self.processes.append(process)
+
+        logger.info(f"Started {self.workers_count} workers: {[process.pid for process in self.processes]}")
+
+    def dispatch(self, index: int, update: dict):
+        """Передает обновление воркеру (не блокирует: очередь без ограничения размера)"""
+        self.queues[index].put(update)
+
+    def stop(self, timeout: float = 30):
+        """Просит воркеры доработать очереди и завершиться, зависшие - останавливает принудительно"""
+        for updates in self.queues:
+            updates.put(None)
+
+        for process in self.processes:
+            process.join(timeout)
+            if process.is_alive():
+                logger.warning(f"Worker {process.name} did not stop in {timeout} s, killing")
+                process.kill()
+                process.join()
+
+        self.queues.clear()
+        self.processes.clear()
+
+
+def _run(target, shard: Shard, updates):
+    # Ctrl+C получает вся группа процессов: воркеры останавливает фронт, дождавшись их очередей
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    target(shard, updates)
+
+
+async def consume_updates(dp: Dispatcher, bot: Bot, updates, poll_interval: float = 1.0):
+    """Обрабатывает обновления из очереди воркера до None (или до смерти фронт-процесса).
+    Каждое обновление - в отдельной задаче, как при вебхуке с handle_in_background"""
+    loop = asyncio.get_running_loop()
+    parent_pid = os.getppid()
+    tasks = set()
+
+    while True:
+        try:
+            update = await loop.run_in_executor(None, updates.get, True, poll_interval)
+        except queue.Empty:
+            if os.getppid() != parent_pid:
+                logger.warning("Front process is gone, worker is stopping")
+                break
+            continue
+
+        if update is None:
+            break
+
+        task = asyncio.create_task(_feed_update(dp, bot, update))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    if tasks:
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def _feed_update(dp: Dispatcher, bot: Bot, update: dict):
+    try:
+        await dp.feed_raw_update(bot, update)
+    except Exception:
+        pass    # aiogram уже записал ошибку обработчика в лог
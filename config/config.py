@@ -6,3 +6,53 @@ QUESTION_TIME_LIMIT = 5    # в минутах
 FIRST_CLUE_OF_QUESTION = 1    # в минутах
 SECOND_CLUE_OF_QUESTION = 3    # в минутах
 THIRD_CLUE_OF_QUESTION = 4   # в минутах
+DB_PATH = 'quest_bot.db'
+DB_READERS_COUNT = 4    # кол-во соединений только для чтения в пуле
+DB_CACHE_SIZE_KB = 16384    # размер кэша страниц SQLite на соединение
+DB_MMAP_SIZE = 64 * 1024 * 1024    # в байтах
+TEAM_STATE_FLUSH_INTERVAL = 1.0    # в секундах, 0 - писать состояние команды в БД сразу в конце хода
+TEAM_ACTOR_IDLE_TIMEOUT = 600    # в секундах, через сколько простоя очередь команды удаляется
+COUNTDOWN_REFRESH_STEPS = ((60, 30), (10, 10), (0, 1))    # (больше скольки секунд осталось, шаг обновления в секундах)
+COUNTDOWN_EDITS_PER_SECOND = 20    # общий лимит правок сообщений-таймеров на весь бот
+SCHEDULED_JOB_MAX_OVERDUE = 3600    # в секундах, более старые таймеры при перезапуске не восстанавливаются
+OUTBOX_GLOBAL_RATE = 30    # сообщений в секунду на весь бот
+OUTBOX_CHAT_RATE = 1    # сообщений в секунду в один чат
+OUTBOX_CHAT_BURST = 3    # сколько сообщений подряд можно отправить в чат без ожидания
+OUTBOX_WORKERS = 8    # кол-во параллельных отправок
+OUTBOX_MAX_RETRIES = 3    # повторы отправки после TelegramRetryAfter
+OUTBOX_MAX_CHATS = 10000    # сколько чатов помнить для лимитов
+MEDIA_STORAGE_CHAT_ID = None    # служебный чат для предзагрузки картинок при запуске, None - не загружать заранее
+MEDIA_OPTIMIZE = True    # уменьшать картинки перед отправкой (нужен Pillow)
+MEDIA_CACHE_DIR = 'media_cache'    # куда складывать уменьшенные картинки
+MEDIA_MAX_SIDE = 1280    # в пикселях, больше Telegram все равно не показывает
+MEDIA_JPEG_QUALITY = 85
+RUN_MODE = 'polling'    # 'polling', 'webhook' или 'cluster' (вебхук и несколько процессов-воркеров)
+WEBHOOK_URL = None    # публичный адрес бота, например 'https://bot.example.com'; None - вебхук регистрируется вручную
+WEBHOOK_PATH = '/webhook'
+WEBHOOK_HOST = '0.0.0.0'    # адрес, на котором слушает встроенный сервер
+WEBHOOK_PORT = 8000
+WEBHOOK_SECRET = None    # секрет для заголовка X-Telegram-Bot-Api-Secret-Token, None - без проверки
+DEDUP_MAX_SIZE = 10000    # сколько последних обновлений и нажатий помнить
+DEDUP_UPDATE_TTL = 300    # в секундах, сколько помнить update_id
+DEDUP_CALLBACK_TTL = 5    # в секундах, повторное нажатие той же кнопки за это время игнорируется
+USER_TEAM_CACHE_TTL = 60    # в секундах, сколько лимиты запросов помнят команду игрока
+USER_TEAM_CACHE_SIZE = 10000
+# лимиты запросов по флагу обработчика rate_limit: (токенов в секунду, запас); mode - 'reply' или 'drop'
+RATE_LIMITS = {
+    'default': {'user': (2, 10), 'team': None, 'mode': 'reply'},
+    'answer': {'user': (0.5, 3), 'team': (2, 8), 'mode': 'reply'},
+}
+RATE_LIMIT_IDLE_TIMEOUT = 600    # в секундах, через сколько простоя лимиты игрока забываются
+RATE_LIMIT_MAX_KEYS = 50000    # сколько игроков и команд помнить
+FSM_STORAGE = 'sqlite'    # где хранить FSM-состояния игроков: 'sqlite' или 'memory'
+FSM_FLUSH_INTERVAL = 0.5    # в секундах, как часто писать изменения FSM в БД; 0 - сразу
+FSM_STATE_TTL = 2 * 24 * 3600    # в секундах, через сколько без изменений состояние игрока удаляется
+CLUSTER_WORKERS = 4    # кол-во процессов-воркеров в режиме RUN_MODE = 'cluster'
+CLUSTER_TEAM_CACHE_TTL = 60    # в секундах, сколько фронт-процесс помнит команду игрока
+SHUTDOWN_DRAIN_TIMEOUT = 5    # в секундах, сколько при остановке ждать каждый этап: обработчики, таймеры, отправку сообщений
+GAME_JOURNAL_FLUSH_INTERVAL = 1.0    # в секундах, как часто писать журнал событий игры в БД; 0 - сразу в конце хода
+GAME_SNAPSHOT_EVERY = 50    # через сколько событий команды сохранять снимок ее состояния
+ANSWER_MAX_TYPOS = 0    # сколько опечаток прощать в ответе (например, 1), 0 - только точное совпадение
+ANSWER_TYPO_MIN_LENGTH = 5    # в ответах короче опечатки не прощаются (ответы из цифр - никогда)
+QUESTION_DEAL_WEIGHTS = None    # {сложность: вес} для выдачи вопросов локации по весу, например {1: 1, 2: 2, 3: 3}; None - все по кругу поровну
+QUESTION_CURSOR_FLUSH_INTERVAL = 5.0    # в секундах, как часто сохранять позиции раздачи вопросов
@@ -0,0 +1,101 @@
+import json
+from db.database import get_db_connection
+from game.answers import AnswerMatcher
+from config.config import ANSWER_MAX_TYPOS, ANSWER_TYPO_MIN_LENGTH
+
+class ContentCache:
+    """Кэш статического контента квеста (локации и вопросы) в памяти.
+
+    Загружается один раз при старте (после фикстур), дальше все обращения -
+    это поиск по словарю без запросов к БД. После перезагрузки фикстур кэш
+    нужно сбросить через invalidate() и загрузить заново.
+    """
+
+    def __init__(self):
+        self.is_loaded = False
+        self._locations = {}             # {location_id: location}
+        self._questions = {}             # {question_id: question}
+        self._location_questions = {}    # {location_id: [question1, question2, ...]}
+
+    async def load(self):
+        """Загружает локации и вопросы из БД и строит индексы"""
+        async with get_db_connection(readonly=True) as conn:
+            cursor = await conn.execute("SELECT * FROM locations")
+            columns = [column[0] for column in cursor.description]
+            locations = [dict(zip(columns, row)) for row in await cursor.fetchall()]
+
+            cursor = await conn.execute(
+                """SELECT id, location_id, question_text, answer, answer_variants, answer_hints, hints_media_paths,
+                          difficulty, question_type, media_path, cost
+                   FROM questions
+                   ORDER BY id"""
+            )
+            columns = [column[0] for column in cursor.description]
+            questions = [dict(zip(columns, row)) for row in await cursor.fetchall()]
+
+        self._locations = {location['id']: location for location in locations}
+        self._questions = {}
+        self._location_questions = {}
+
+        for question in questions:
+            # JSON-поля разбираем один раз при загрузке
+            question['answer_hints'] = _parse_json_list(question['answer_hints'])
+            question['hints_media_paths'] = _parse_json_list(question['hints_media_paths'])
+            question['answer_variants'] = _parse_json_list(question['answer_variants']) or []
+
+            # нормализованные ответы тоже считаем один раз, а не на каждую попытку
+            question['answer_matcher'] = AnswerMatcher(
+                [question['answer'], *question['answer_variants']],
+                max_typos=ANSWER_MAX_TYPOS,
+                min_length=ANSWER_TYPO_MIN_LENGTH,
+            )
+
+            self._questions[question['id']] = question
+            self._location_questions.setdefault(question['location_id'], []).append(question)
+
+        self.is_loaded = True
+
+    def invalidate(self):
+        """Сбрасывает кэш (например, после перезагрузки фикстур)"""
+        self.is_loaded = False
+        self._locations = {}
+        self._questions = {}
+        self._location_questions = {}
+
+    def get_location(self, location_id: int) -> dict | None:
+        return self._locations.get(location_id)
+
+    def get_question(self, question_id: int) -> dict | None:
+        return self._questions.get(question_id)
+
+    def get_location_questions(self, location_id: int) -> list[dict]:
+        return self._location_questions.get(location_id, [])
+
+    def get_all_location_questions(self) -> dict[int, list[dict]]:
+        """{location_id: [question1, question2, ...]} для всех локаций с вопросами"""
+        return self._location_questions
+
+    def get_media_paths(self) -> set[str]:
+        """Все пути к картинкам из контента: вопросы, подсказки и карты локаций"""
+        paths = {location.get('image_path') for location in self._locations.values()}
+
+        for question in self._questions.values():
+            paths.add(question.get('media_path'))
+            paths.update(question.get('hints_media_paths') or [])
+
+        paths.discard(None)
+        paths.discard('')
+        return paths
+
+
+def _parse_json_list(value: str | None) -> list | None:
+    if not value:
+        return None
+
+    try:
+        return json.loads(value)
+    except json.JSONDecodeError:
+        return None
+
+
+content_cache = ContentCache()
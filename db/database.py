@@ -1,147 +1,179 @@
+import asyncio
 import aiosqlite
+from contextvars import ContextVar
 from datetime import datetime
 from contextlib import asynccontextmanager
+from pathlib import Path
+
+from config.config import DB_PATH, DB_READERS_COUNT, DB_CACHE_SIZE_KB, DB_MMAP_SIZE
+
+MIGRATIONS_DIR = Path(__file__).parent / 'migrations'
 
 async def init_db():
-    async with aiosqlite.connect('quest_bot.db') as conn:
-        async with conn.cursor() as cursor:
-            # Таблица команд
-            await cursor.execute('''
-            CREATE TABLE IF NOT EXISTS teams (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                admin_id INTEGER NOT NULL,
-                lyrics_text TEXT,
-                invite_token TEXT UNIQUE,
-                created_at TEXT DEFAULT CURRENT_TIMESTAMP
-            )
-            ''')
-            # Единая таблица игроков (заменяет team_members и players)
-            await cursor.execute('''
-            CREATE TABLE IF NOT EXISTS players (
-                user_id INTEGER PRIMARY KEY, 
-                username TEXT, 
-                full_name TEXT,
-                team_id INTEGER,
-                is_captain BOOLEAN DEFAULT FALSE,
-                is_admin BOOLEAN DEFAULT FALSE,
-                location INTEGER DEFAULT 1,  -- Номер стартовой локации
-                joined_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (team_id) REFERENCES teams(id)
-            )
-            ''')
-
-            await cursor.execute('''
-            CREATE TABLE IF NOT EXISTS team_game_states (
-                team_id INTEGER PRIMARY KEY,
-                current_player_idx INTEGER DEFAULT 0,
-                players_order TEXT,  -- JSON массив [user_id1, user_id2, ...]
-                current_question_num INTEGER DEFAULT 1,
-                current_question_idx INTEGER DEFAULT 0,
-                deadline TEXT,       -- TIMESTAMP
-                question_deadline TEXT,
-                correct_answers INTEGER DEFAULT 0,
-                is_pretend_on_right_answer BOOLEAN DEFAULT 1,    -- зачислять ли правильный ответ за вопрос
-                status TEXT DEFAULT 'waiting',  -- waiting/playing/finished
-                is_test_mode BOOLEAN DEFAULT 0,
-                created_at TEXT DEFAULT (strftime('%Y-%m-%d %H:%M:%S', 'now', 'localtime')),
-                updated_at TEXT DEFAULT (strftime('%Y-%m-%d %H:%M:%S', 'now', 'localtime')),
-                ended_at TEXT,
-                FOREIGN KEY (team_id) REFERENCES teams(id)
-            )
-            ''')
-
-            await cursor.execute('''
-            CREATE TABLE IF NOT EXISTS state_transfers (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                sender_id INTEGER NOT NULL,
-                receiver_id INTEGER NOT NULL,
-                state_data TEXT NOT NULL,  -- JSON с состоянием
-                created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                expires_at TEXT DEFAULT (datetime('now', '+1 hour')),
-                FOREIGN KEY (sender_id) REFERENCES players(user_id),
-                FOREIGN KEY (receiver_id) REFERENCES players(user_id)
-            )
-            ''')
-
-            await cursor.execute('''
-            CREATE TABLE IF NOT EXISTS locations (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,               -- Название локации
-                description TEXT,                 -- Описание для игроков
-                letter_for_location TEXT,         -- Буква за этап
-                coordinates TEXT,                 -- "lat,lon" или "x,y,z"
-                image_path TEXT,                  -- Путь к изображению
-                is_hidden BOOLEAN DEFAULT FALSE,  -- Скрыта ли локация
-                unlock_condition TEXT             -- Условие разблокировки
-            )
-            ''')
-
-            await cursor.execute('''
-            CREATE TABLE IF NOT EXISTS questions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                location_id INTEGER NOT NULL,     -- К какой локации привязан
-                question_text TEXT NOT NULL,      -- Текст вопроса
-                answer TEXT NOT NULL,             -- Правильный ответ
-                answer_hints TEXT,                 -- Подсказки JSON массив [clue1, clue2, clue3]
-                hints_media_paths TEXT,            -- Фото для подсказок JSON массив [media_clue1, media_clue2, media_clue3]
-                difficulty INTEGER DEFAULT 1,     -- Сложность (1-5)
-                question_type TEXT DEFAULT 'text',-- text/photo/video/audio
-                media_path TEXT,                  -- Путь к медиафайлу
-                cost INTEGER DEFAULT 10,          -- Баллы за правильный ответ
-                FOREIGN KEY (location_id) REFERENCES locations(id)
-            )
-            ''')
-
-            await cursor.execute('''
-            CREATE TABLE IF NOT EXISTS quests (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                description TEXT,
-                start_location_id INTEGER,
-                is_active BOOLEAN DEFAULT FALSE,
-                FOREIGN KEY (start_location_id) REFERENCES locations(id)
-            )
-            ''')
-
-            await cursor.execute('''
-            CREATE TABLE IF NOT EXISTS quest_locations (
-                quest_id INTEGER NOT NULL,
-                location_id INTEGER NOT NULL,
-                order_num INTEGER,                -- Порядковый номер в квесте
-                PRIMARY KEY (quest_id, location_id),
-                FOREIGN KEY (quest_id) REFERENCES quests(id),
-                FOREIGN KEY (location_id) REFERENCES locations(id)
-            )
-            ''')
-            
-            # Таблица состояния игры
-            await cursor.execute('''
-            CREATE TABLE IF NOT EXISTS game_state (
-                team_id INTEGER PRIMARY KEY,
-                current_player_index INTEGER DEFAULT 0,
-                status TEXT DEFAULT 'waiting',
-                FOREIGN KEY (team_id) REFERENCES teams(id)
-            )
-            ''')
-
-            await cursor.execute('''
-            CREATE TABLE IF NOT EXISTS game_progress (
-                team_id INTEGER PRIMARY KEY,
-                current_player_id INTEGER,
-                current_question INTEGER,
-                status TEXT,
-                FOREIGN KEY (team_id) REFERENCES teams(id)
-            )
-            ''')
-            
-            await conn.commit()
+    """Применяет к БД новые миграции из db/migrations. Если версия схемы актуальна - DDL не выполняется"""
+    migrations = _get_migrations()
+
+    async with aiosqlite.connect(DB_PATH) as conn:
+        current_version = await _get_schema_version(conn)
+        pending = [(version, path) for version, path in migrations if version > current_version]
+
+        for version, path in pending:
+            await _apply_migration(conn, version, path)
+            print(f"✅ Применена миграция {path.name}")
+
+def _get_migrations() -> list[tuple[int, Path]]:
+    """Возвращает упорядоченный список миграций [(версия, путь к файлу), ...]"""
+    migrations = []
+    for path in MIGRATIONS_DIR.glob('*.sql'):
+        version = int(path.name.split('_', maxsplit=1)[0])
+        migrations.append((version, path))
+
+    return sorted(migrations)
+
+async def _get_schema_version(conn: aiosqlite.Connection) -> int:
+    cursor = await conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'schema_version'"
+    )
+    if not await cursor.fetchone():
+        return 0
+
+    cursor = await conn.execute("SELECT MAX(version) FROM schema_version")
+    row = await cursor.fetchone()
+    return row[0] or 0
+
+async def _apply_migration(conn: aiosqlite.Connection, version: int, path: Path):
+    """Применяет одну миграцию в отдельной транзакции вместе с записью её версии"""
+    sql = path.read_text(encoding='utf-8')
 
-@asynccontextmanager
-async def get_db_connection():
-    conn = await aiosqlite.connect('quest_bot.db')
     try:
-        yield conn
-    finally:
-        await conn.close()
-        
\ No newline at end of file
+        # транзакция остается открытой после скрипта: версия пишется параметрами и фиксируется вместе с ним
+        await conn.executescript(
+            "BEGIN;\n"
+            "CREATE TABLE IF NOT EXISTS schema_version ("
+            "version INTEGER PRIMARY KEY, name TEXT NOT NULL, "
+            "applied_at TEXT DEFAULT CURRENT_TIMESTAMP);\n"
+            f"{sql}\n"
+        )
+        await conn.execute(
+            "INSERT INTO schema_version (version, name) VALUES (?, ?)",
+            (version, path.stem)
+        )
+        await conn.commit()
+    except aiosqlite.Error:
+        if conn.in_transaction:
+            await conn.rollback()
+        raise
+
+class ConnectionPool:
+    """Пул долгоживущих соединений: одно соединение на запись и несколько на чтение"""
+
+    def __init__(self, db_path: str, readers_count: int):
+        self.db_path = db_path
+        self.readers_count = readers_count
+        self._writer = None
+        self._writer_lock = asyncio.Lock()
+        self._readers = []
+        self._free_readers = asyncio.Queue()
+
+    @property
+    def is_open(self) -> bool:
+        return self._writer is not None
+
+    async def open(self):
+        """Открывает соединения и один раз настраивает их PRAGMA"""
+        if self.is_open:
+            return
+
+        self._writer = await self._connect()
+        await self._writer.execute_fetchall("PRAGMA journal_mode = WAL")
+
+        for _ in range(self.readers_count):
+            conn = await self._connect()
+            await conn.execute_fetchall("PRAGMA query_only = ON")
+            self._readers.append(conn)
+            self._free_readers.put_nowait(conn)
+
+    async def close(self):
+        """Закрывает все соединения пула"""
+        if not self.is_open:
+            return
+
+        async with self._writer_lock:
+            try:
+                await self._writer.execute_fetchall("PRAGMA optimize")
+            except aiosqlite.Error as e:
+                # БД занята другим процессом (режим cluster) - оптимизация подождет до следующего раза
+                print(f"⚠️ PRAGMA optimize пропущена: {e}")
+            finally:
+                await self._writer.close()
+                self._writer = None
+
+        for conn in self._readers:
+            await conn.close()
+        self._readers.clear()
+        self._free_readers = asyncio.Queue()
+
+    async def _connect(self) -> aiosqlite.Connection:
+        conn = await aiosqlite.connect(self.db_path)
+        await conn.execute_fetchall("PRAGMA synchronous = NORMAL")
+        await conn.execute_fetchall(f"PRAGMA cache_size = -{int(DB_CACHE_SIZE_KB)}")
+        await conn.execute_fetchall(f"PRAGMA mmap_size = {int(DB_MMAP_SIZE)}")
+        await conn.execute_fetchall("PRAGMA temp_store = MEMORY")
+        return conn
+
+    @asynccontextmanager
+    async def acquire(self, readonly: bool = False):
+        """Выдает соединение из пула: на чтение - любое свободное, на запись - единственное под блокировкой"""
+        if readonly and self._readers:
+            conn = await self._free_readers.get()
+            try:
+                yield conn
+            finally:
+                self._free_readers.put_nowait(conn)
+            return
+
+        async with self._writer_lock:
+            try:
+                yield self._writer
+            finally:
+                # незакоммиченные изменения не должны достаться следующему вызову
+                if self._writer is not None and self._writer.in_transaction:
+                    await self._writer.rollback()
+
+
+db_pool = ConnectionPool(DB_PATH, DB_READERS_COUNT)
+
+# соединение, которое уже удерживает текущая задача: (task, conn, readonly)
+_held_connection = ContextVar('held_connection', default=None)
+
+async def open_db_pool():
+    await db_pool.open()
+
+async def close_db_pool():
+    await db_pool.close()
+
+@asynccontextmanager
+async def get_db_connection(readonly: bool = False):
+    held = _held_connection.get()
+
+    # вложенный вызов внутри той же задачи переиспользует уже выданное соединение,
+    # иначе ожидание второго соединения может привести к взаимной блокировке
+    if held is not None and held[0] is asyncio.current_task() and (readonly or not held[2]):
+        yield held[1]
+        return
+
+    if not db_pool.is_open:
+        # пул не запущен (скрипты, фикстуры) - работаем как раньше
+        conn = await aiosqlite.connect(DB_PATH)
+        try:
+            yield conn
+        finally:
+            await conn.close()
+        return
+
+    async with db_pool.acquire(readonly=readonly) as conn:
+        token = _held_connection.set((asyncio.current_task(), conn, readonly))
+        try:
+            yield conn
+        finally:
+            _held_connection.reset(token)
@@ -2,7 +2,10 @@ import json
 import aiosqlite
 from pathlib import Path
 
-async def load_fixtures_from_json(db_path: str = 'quest_bot.db', 
+from config.config import DB_PATH
+from db.content_cache import content_cache
+
+async def load_fixtures_from_json(db_path: str = DB_PATH, 
                                 json_path: str = 'db/quest_fixtures.json'):
     # Проверяем существование файла
     if not Path(json_path).exists():
@@ -23,10 +26,13 @@ async def load_fixtures_from_json(db_path: str = 'quest_bot.db',
         await _load_table(conn, "quest_locations", data["quest_locations"])
         
         await conn.commit()
-        print(f"✅ Успешно загружено: "
-              f"{len(data['locations'])} локаций, "
-              f"{len(data['questions'])} вопросов, "
-              f"{len(data['quests'])} квестов")
+
+    # контент изменился - кэш нужно загрузить заново
+    content_cache.invalidate()
+    print(f"✅ Успешно загружено: "
+          f"{len(data['locations'])} локаций, "
+          f"{len(data['questions'])} вопросов, "
+          f"{len(data['quests'])} квестов")
 
 async def _load_table(conn, table_name: str, items: list):
     if not items:
@@ -0,0 +1,192 @@
+import json
+import time
+import asyncio
+import logging
+
+from db.database import get_db_connection
+from config.config import GAME_JOURNAL_FLUSH_INTERVAL, GAME_SNAPSHOT_EVERY
+
+logger = logging.getLogger(__name__)
+
+
+class GameJournal:
+    """Журнал событий игры (game_events) со снимками состояния (game_snapshots).
+
+    record только добавляет событие в память, поэтому не замедляет ход:
+    события пишутся пачкой одной транзакцией раз в flush_interval секунд
+    и при остановке. Номера seq и снимок каждые snapshot_every событий
+    команды назначаются при записи. Состояние команды на любой момент
+    восстанавливает replay: последний снимок до него + события после.
+    """
+
+    def __init__(self, flush_interval: float, snapshot_every: int):
+        self.flush_interval = flush_interval
+        self.snapshot_every = snapshot_every
+        self._pending = []    # [(team_id, type, payload, ts), ...]
+        self._teams = {}      # {team_id: TeamHistory} - состояние по журналу для снимков
+        self._flusher = None
+
+    def record(self, team_id: int, event_type: str, **payload):
+        """Добавляет событие в очередь на запись"""
+        if team_id is None:
+            return
+        self._pending.append((team_id, event_type, payload, time.time()))
+
+    async def commit(self):
+        """Конец хода: с flush_interval <= 0 события пишутся сразу"""
+        if self.flush_interval <= 0:
+            await self.flush()
+
+    async def flush(self):
+        """Записывает накопленные события (и снимки) одной транзакцией"""
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending, []
+
+        try:
+            async with get_db_connection() as conn:
+                events, snapshots = [], []
+
+                for team_id, event_type, payload, ts in batch:
+                    history = self._teams.get(team_id)
+                    if history is None:
+                        # команда еще не встречалась в этом процессе - продолжаем ее журнал из БД
+                        state, seq = await _replay(conn, team_id)
+                        history = self._teams[team_id] = TeamHistory(state, seq)
+
+                    history.apply(event_type, payload)
+                    events.append((team_id, history.seq, event_type, _dumps(payload), ts))
+
+                    if history.since_snapshot >= self.snapshot_every:
+                        snapshots.append((team_id, history.seq, _dumps(history.state), ts))
+                        history.since_snapshot = 0
+
+                await conn.executemany(
+                    "INSERT INTO game_events (team_id, seq, type, payload, ts) VALUES (?, ?, ?, ?, ?)",
+                    events
+                )
+                await conn.executemany(
+                    "INSERT OR REPLACE INTO game_snapshots (team_id, seq, state, ts) VALUES (?, ?, ?, ?)",
+                    snapshots
+                )
+                await conn.commit()
+        except Exception:
+            # номера могли разойтись с БД - перечитаем журналы команд при следующей записи
+            for team_id, *_ in batch:
+                self._teams.pop(team_id, None)
+            self._pending = batch + self._pending
+            raise
+
+    async def replay(self, team_id: int, until_seq: int = None, until_ts: float = None) -> tuple[dict | None, int]:
+        """Состояние команды после события until_seq (или на момент until_ts), по умолчанию - текущее.
+        Возвращает (состояние или None, номер последнего учтенного события)"""
+        await self.flush()
+
+        async with get_db_connection(readonly=True) as conn:
+            return await _replay(conn, team_id, until_seq, until_ts)
+
+    async def get_events(self, team_id: int, since_seq: int = 0, until_seq: int = None) -> list[dict]:
+        """События команды с номерами (since_seq, until_seq]"""
+        await self.flush()
+
+        query = "SELECT seq, type, payload, ts FROM game_events WHERE team_id = ? AND seq > ?"
+        params = [team_id, since_seq]
+        if until_seq is not None:
+            query += " AND seq <= ?"
+            params.append(until_seq)
+
+        async with get_db_connection(readonly=True) as conn:
+            cursor = await conn.execute(query + " ORDER BY seq", params)
+            rows = await cursor.fetchall()
+
+        return [
+            {'seq': seq, 'type': event_type, 'payload': json.loads(payload), 'ts': ts}
+            for seq, event_type, payload, ts in rows
+        ]
+
+    def start(self):
+        """Запускает фоновую запись журнала"""
+        if self._flusher is None and self.flush_interval > 0:
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """Останавливает фоновую запись и сбрасывает в БД все события"""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+
+        await self.flush()
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as error:
+                logger.error(f"Error while flushing game journal: {error}")
+
+
+class TeamHistory:
+    """Состояние команды, собранное из ее событий"""
+    __slots__ = ('state', 'seq', 'since_snapshot')
+
+    def __init__(self, state: dict | None = None, seq: int = 0):
+        self.state = state
+        self.seq = seq    # номер последнего события
+        self.since_snapshot = 0
+
+    def apply(self, event_type: str, payload: dict):
+        self.seq += 1
+        self.since_snapshot += 1
+
+        if event_type == 'started':
+            self.state = dict(payload)
+        elif event_type in ('updated', 'advanced'):
+            self.state = {**(self.state or {}), **payload}
+        elif event_type == 'cleared':
+            self.state = None
+        # остальные события (ответы и т.д.) состояние не меняют
+
+
+async def _replay(conn, team_id: int, until_seq: int = None, until_ts: float = None) -> tuple[dict | None, int]:
+    """Последний подходящий снимок + события после него"""
+    conditions, params = "", []
+    if until_seq is not None:
+        conditions += " AND seq <= ?"
+        params.append(until_seq)
+    if until_ts is not None:
+        conditions += " AND ts <= ?"
+        params.append(until_ts)
+
+    cursor = await conn.execute(
+        f"SELECT seq, state FROM game_snapshots WHERE team_id = ?{conditions} ORDER BY seq DESC LIMIT 1",
+        [team_id] + params
+    )
+    snapshot = await cursor.fetchone()
+
+    history = TeamHistory()
+    if snapshot:
+        history.seq = snapshot[0]
+        history.state = json.loads(snapshot[1])
+
+    cursor = await conn.execute(
+        f"SELECT type, payload FROM game_events WHERE team_id = ? AND seq > ?{conditions} ORDER BY seq",
+        [team_id, history.seq] + params
+    )
+    for event_type, payload in await cursor.fetchall():
+        history.apply(event_type, json.loads(payload))
+
+    return history.state, history.seq
+
+
+def _dumps(value) -> str:
+    # datetime пишем строкой в том же виде, что и в team_game_states
+    return json.dumps(value, ensure_ascii=False, default=lambda item: item.isoformat(' '))
+
+
+game_journal = GameJournal(GAME_JOURNAL_FLUSH_INTERVAL, GAME_SNAPSHOT_EVERY)
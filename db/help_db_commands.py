@@ -5,8 +5,23 @@ from aiogram import Bot
 from aiogram.types import Message
 from aiogram.fsm.context import FSMContext
 from db.database import get_db_connection
+from db.team_state_store import team_state_store
+from help.cache import TTLCache
+from config.config import USER_TEAM_CACHE_TTL, USER_TEAM_CACHE_SIZE
+
+# {user_id: team_id | None}, сбрасывается при изменении состава команд
+_user_team_cache = TTLCache(USER_TEAM_CACHE_SIZE, USER_TEAM_CACHE_TTL)
+
+def invalidate_user_team(user_id: int = None):
+    """Сбрасывает закэшированную команду игрока (всех игроков, если user_id не указан)"""
+    if user_id is None:
+        _user_team_cache.clear()
+    else:
+        _user_team_cache.pop(user_id)
 
 async def add_player_to_team(user_id: int, username: str, team_id: int):
+    invalidate_user_team(user_id)
+
     async with get_db_connection() as conn:
         async with conn.cursor() as cursor:
             await cursor.execute(
@@ -16,14 +31,14 @@ async def add_player_to_team(user_id: int, username: str, team_id: int):
             await conn.commit()
 
 async def get_team_players(team_id: int):
-    async with get_db_connection() as conn:
+    async with get_db_connection(readonly=True) as conn:
         async with conn.cursor() as cursor:
             await cursor.execute("SELECT user_id FROM players WHERE team_id = ?", (team_id,))
             players = [row[0] for row in await cursor.fetchall()]
             return players
 
 async def get_exist_teams():
-    async with get_db_connection() as conn:
+    async with get_db_connection(readonly=True) as conn:
         async with conn.cursor() as cursor:
             await cursor.execute("SELECT id FROM teams")
             teams = [row[0] for row in await cursor.fetchall()]
@@ -60,7 +75,7 @@ async def create_team_if_not_exists(team_name: str):
             return team_id, created
 
 async def get_game_progress(team_id: int):
-    async with get_db_connection() as conn:
+    async with get_db_connection(readonly=True) as conn:
         async with conn.cursor() as cursor:
             await cursor.execute(
                 "SELECT * FROM game_progress WHERE team_id = ?", 
@@ -113,6 +128,7 @@ async def join_team(message: Message, team_id: int, token: str) -> bool:
     """
     user_id = message.from_user.id
     print(f"Добавляем игрока {user_id} в команду {team_id}")
+    invalidate_user_team(user_id)
 
     async with get_db_connection() as conn:
         # Проверяем валидность токена
@@ -153,7 +169,7 @@ async def join_team(message: Message, team_id: int, token: str) -> bool:
             return False
         
 async def get_team_name(team_id: int):
-    async with get_db_connection() as conn:
+    async with get_db_connection(readonly=True) as conn:
         cursor = await conn.execute(
             "SELECT name FROM teams WHERE id = ?",
             (team_id,)
@@ -178,7 +194,7 @@ async def set_lyrics_for_team(team_id: int, lyrics_text: str):
 
 async def get_team_lyrics(team_id: int):
     """Получает кричалку команды, если её нет то возвращает None"""
-    async with get_db_connection() as conn:
+    async with get_db_connection(readonly=True) as conn:
         cursor = await conn.execute(
             "SELECT lyrics_text FROM teams WHERE id = ?",
             (team_id,)
@@ -189,7 +205,7 @@ async def get_team_lyrics(team_id: int):
 
 async def is_admin(user_id: int):
     """Возвращает True если админ существует и пользователь им является иначе False"""
-    async with get_db_connection() as conn:
+    async with get_db_connection(readonly=True) as conn:
         cursor = await conn.execute(
             "SELECT is_admin FROM players WHERE user_id = ?",
             (user_id,)
@@ -201,7 +217,7 @@ async def is_admin(user_id: int):
 
 async def get_team_captain(team_id: int) -> int:
     """Получает ID капитана (админа) команды"""
-    async with get_db_connection() as conn:
+    async with get_db_connection(readonly=True) as conn:
         cursor = await conn.execute(
             "SELECT admin_id FROM teams WHERE id = ?", 
             (team_id,)
@@ -227,17 +243,27 @@ async def mention_user(user_id: int) -> str:
 
 async def get_user_team(user_id: int) -> int | None:
     """Возвращает ID команды игрока или None"""
-    async with get_db_connection() as conn:
+    async with get_db_connection(readonly=True) as conn:
         cursor = await conn.execute(
             "SELECT team_id FROM players WHERE user_id = ?",
             (user_id,)
         )
         result = await cursor.fetchone()
         return result[0] if result else None
+
+async def get_user_team_cached(user_id: int) -> int | None:
+    """get_user_team с кэшем в памяти процесса - только для лимитов запросов.
+    Команда может устареть на USER_TEAM_CACHE_TTL секунд, поэтому игровая логика использует get_user_team"""
+    if user_id in _user_team_cache:
+        return _user_team_cache.get(user_id)
+
+    team_id = await get_user_team(user_id)
+    _user_team_cache.set(user_id, team_id)
+    return team_id
     
 async def get_team_players(team_id: int) -> list[dict]:
     """Возвращает список игроков команды для квеста"""
-    async with get_db_connection() as conn:
+    async with get_db_connection(readonly=True) as conn:
         cursor = await conn.execute(
             """SELECT user_id, username, full_name, is_captain, location 
             FROM players 
@@ -255,7 +281,7 @@ async def get_team_players(team_id: int) -> list[dict]:
     
 async def get_username(user_id: int) -> int | None:
     """Возвращает USERNAME игрока или None"""
-    async with get_db_connection() as conn:
+    async with get_db_connection(readonly=True) as conn:
         cursor = await conn.execute(
             "SELECT username FROM players WHERE user_id = ?",
             (user_id,)
@@ -276,7 +302,7 @@ async def set_player_location(user_id: int, location: int):
 
 async def get_player_location(user_id: int) -> int:
     """Возвращает текущую локацию игрока"""
-    async with get_db_connection() as conn:
+    async with get_db_connection(readonly=True) as conn:
         cursor = await conn.execute(
             "SELECT location FROM players WHERE user_id = ?",
             (user_id,))
@@ -285,7 +311,7 @@ async def get_player_location(user_id: int) -> int:
 
 async def get_player_by_id(user_id: int) -> dict | None:
     """Возвращает игрока по ID в виде словаря или None"""
-    async with get_db_connection() as conn:
+    async with get_db_connection(readonly=True) as conn:
         cursor = await conn.execute(
             "SELECT * FROM players WHERE user_id = ?",
             (user_id,)
@@ -306,7 +332,7 @@ async def get_player_by_id(user_id: int) -> dict | None:
 
 async def get_players_at_location(team_id: int, location: int) -> list:
     """Возвращает всех игроков команды на указанной локации"""
-    async with get_db_connection() as conn:
+    async with get_db_connection(readonly=True) as conn:
         cursor = await conn.execute('''
             SELECT user_id, username 
             FROM players 
@@ -319,7 +345,7 @@ async def is_team_captain(user_id: int) -> bool:
     """Проверяет является ли игрок капитаном"""
     team_id = await get_user_team(user_id)
 
-    async with get_db_connection() as conn:
+    async with get_db_connection(readonly=True) as conn:
         cursor = await conn.execute(
             "SELECT is_captain FROM players WHERE user_id = ? AND team_id = ?",
             (user_id, team_id))
@@ -331,6 +357,9 @@ async def create_or_upgrade_captain(user_id: int, username: str, full_name: str,
     """
     Создает запись капитана команды в таблице players или повышает права текущего
     """
+    # UPDATE ниже затрагивает не только этого игрока - сбрасываем кэш целиком
+    invalidate_user_team()
+
     async with get_db_connection() as conn:
         try:
             await conn.execute(
@@ -359,6 +388,8 @@ async def create_or_upgrade_admin(user_id: int, username: str, full_name: str, t
     """
     Создает запись админа в таблице players или повышает права текущего
     """
+    invalidate_user_team(user_id)
+
     async with get_db_connection() as conn:
         try:
             await conn.execute(
@@ -416,7 +447,7 @@ async def add_question(
     
 async def get_location_questions(location_id: int) -> list[dict]:
     """Возвращает список вопросов для локации в виде словарей"""
-    async with get_db_connection() as conn:
+    async with get_db_connection(readonly=True) as conn:
         cursor = await conn.execute(
             """SELECT id, question_text, answer, answer_hints, hints_media_paths, 
                       difficulty, question_type, media_path, cost
@@ -436,7 +467,7 @@ async def get_location_questions(location_id: int) -> list[dict]:
         return questions
     
 async def get_full_location(location_id: int) -> dict:
-    async with get_db_connection() as conn:
+    async with get_db_connection(readonly=True) as conn:
         # Получаем данные локации
         cursor = await conn.execute(
             "SELECT * FROM locations WHERE id = ?",
@@ -506,6 +537,9 @@ async def create_quest(name: str, location_ids: list[int]) -> int:
 
 async def init_team_state(team_id: int, players: list[int]):
     """Создает начальное состояние для команды"""
+    # несохраненные изменения пишем до вставки, чтобы не потерять их при перечитывании
+    await team_state_store.flush(team_id)
+
     async with get_db_connection() as conn:
         await conn.execute(
             """INSERT OR IGNORE INTO team_game_states
@@ -515,90 +549,60 @@ async def init_team_state(team_id: int, players: list[int]):
         )
         await conn.commit()
 
+    team_state_store.forget(team_id)
+
 async def update_team_state(team_id: int, **updates):
     """Обновляет несколько полей состояния команды"""
     if not updates:
         return
 
-    set_clause = ', '.join(f"{k} = ?" for k in updates.keys())
-    values = list(updates.values()) + [team_id]
-    
-    async with get_db_connection() as conn:
-        await conn.execute(
-            f"""UPDATE team_game_states
-            SET {set_clause}, updated_at = datetime('now', 'localtime')
-            WHERE team_id = ?""",
-            values
-        )
-        await conn.commit()
+    await team_state_store.update(team_id, **updates)
+    await team_state_store.commit(team_id)
 
 async def get_team_state(team_id: int) -> dict:
     """Возвращает текущее состояние команды"""
-    async with get_db_connection() as conn:
-        cursor = await conn.execute(
-            "SELECT * FROM team_game_states WHERE team_id = ?",
-            (team_id,)
-        )
-        row = await cursor.fetchone()
-        
-        if not row:
-            return None
-            
-        columns = [col[0] for col in cursor.description]
-        state = dict(zip(columns, row))
-        
-        # Декодируем JSON-поля
-        if state.get('players_order'):
-            state['players_order'] = json.loads(state['players_order'])
-            
-        return state
+    return await team_state_store.get(team_id)
     
 async def get_status_team_game(team_id: int) -> dict:
     """Возвращает текущее состояние игры команды или None"""
-    async with get_db_connection() as conn:
-        cursor = await conn.execute(
-            "SELECT status FROM team_game_states WHERE team_id = ?",
-            (team_id,)
-        )
-        status = await cursor.fetchone()
-            
-        return status[0] if status else None
+    state = await team_state_store.get(team_id)
+
+    return state['status'] if state else None
     
+async def advance_turn(team_id: int, expected_version: int, **updates) -> bool:
+    """
+    Атомарно переводит игру команды в следующее состояние одной транзакцией.
+    Возвращает:
+    - True: переход применен, версия состояния увеличена
+    - False: конфликт - состояние уже изменилось (версия не совпала)
+    """
+    return await team_state_store.advance(team_id, expected_version, **updates)
+
 async def next_player(team_id: int) -> int:
-    """Передает ход следующему игроку, возвращает user_id"""
-    async with get_db_connection() as conn:
-        # Блокируем строку для конкурентного доступа
-        await conn.execute("BEGIN IMMEDIATE")
-        
-        state = await get_team_state(team_id)
-        if not state:
-            return None
-            
-        players = state['players_order']
-        next_idx = (state['current_player_idx'] + 1) % len(players)
+    """Передает ход следующему игроку, возвращает user_id или None при конфликте"""
+    state = await get_team_state(team_id)
+    if not state:
+        return None
         
-        await conn.execute(
-            """UPDATE team_game_states
-            SET current_player_idx = ?, updated_at = datetime('now')
-            WHERE team_id = ?""",
-            (next_idx, team_id)
-        )
-        await conn.commit()
-        
-        return players[next_idx]
+    players = state['players_order']
+    next_idx = (state['current_player_idx'] + 1) % len(players)
+    
+    if not await advance_turn(team_id, state['version'], current_player_idx=next_idx):
+        return None
+    
+    return players[next_idx]
     
 async def handle_correct_answer(team_id: int):
     """Обновляет состояние после правильного ответа"""
-    async with get_db_connection() as conn:
-        await conn.execute(
-            """UPDATE team_game_states
-            SET correct_answers = correct_answers + 1,
-                current_question_idx = current_question_idx + 1,
-                updated_at = datetime('now')
-            WHERE team_id = ?""",
-            (team_id,)
-        )
-        await conn.commit()
+    state = await get_team_state(team_id)
+    if not state:
+        return
+
+    await update_team_state(
+        team_id,
+        correct_answers=state['correct_answers'] + 1,
+        current_question_idx=state['current_question_idx'] + 1,
+    )
 
 
 async def prepare_state_transfer(sender_id: int, receiver_id: int, state: FSMContext):
@@ -624,7 +628,7 @@ async def apply_state_transfer(receiver_id: int, state: FSMContext) -> bool:
         # Получаем последнюю передачу
         cursor = await conn.execute(
             """SELECT state_data FROM state_transfers
-            WHERE receiver_id = ? AND datetime(expires_at) > datetime('now')
+            WHERE receiver_id = ? AND expires_at > datetime('now')
             ORDER BY created_at DESC LIMIT 1""",
             (receiver_id,)
         )
@@ -648,7 +652,7 @@ async def apply_state_transfer(receiver_id: int, state: FSMContext) -> bool:
 
 async def get_game_state_for_team(team_id: int):
     """Получает полное состояние игры для команды"""
-    async with get_db_connection() as conn:
+    async with get_db_connection(readonly=True) as conn:
         # Получаем состояние игры
         game_state = await get_team_state(team_id=team_id)
 
@@ -676,6 +680,8 @@ async def get_game_state_for_team(team_id: int):
 
 async def delete_user_from_system(user_id: int) -> tuple[bool, Exception]:
     """Удаляет пользователя из системы. True - если успешно, иначе False"""
+    invalidate_user_team(user_id)
+
     async with get_db_connection() as conn:
         await conn.execute(
             "DELETE FROM players WHERE user_id = ?",
@@ -690,6 +696,8 @@ async def delete_user_from_system(user_id: int) -> tuple[bool, Exception]:
         
 async def clear_team_game_states(team_id: int) -> tuple[bool, Exception]:
     """Удаляет данные из таблицы team_game_states из системы. True - если успешно, иначе False"""
+    team_state_store.forget(team_id)
+
     async with get_db_connection() as conn:
         await conn.execute(
             "DELETE FROM team_game_states WHERE team_id = ?",
@@ -701,3 +709,59 @@ async def clear_team_game_states(team_id: int) -> tuple[bool, Exception]:
             return True, None 
         except aiosqlite.Error as error:
             return False, error
+
+async def save_scheduled_job(chat_id: int, kind: str, timer_id: str, due_at: float, payload: dict):
+    """Сохраняет (или заменяет) отложенную задачу таймера"""
+    async with get_db_connection() as conn:
+        await conn.execute(
+            """INSERT OR REPLACE INTO scheduled_jobs
+            (chat_id, kind, timer_id, due_at, payload)
+            VALUES (?, ?, ?, ?, ?)""",
+            (chat_id, kind, timer_id, due_at, json.dumps(payload, ensure_ascii=False))
+        )
+        await conn.commit()
+
+async def delete_scheduled_jobs(chat_id: int, kind: str, timer_id: str = None, due_at: float = None):
+    """Удаляет задачи таймеров чата (все задачи вида kind, если timer_id не указан).
+    С due_at удаляется только задача с этим временем - более новую с тем же ключом не трогаем"""
+    query = "DELETE FROM scheduled_jobs WHERE chat_id = ? AND kind = ?"
+    params = [chat_id, kind]
+
+    if timer_id is not None:
+        query += " AND timer_id = ?"
+        params.append(timer_id)
+    if due_at is not None:
+        query += " AND due_at = ?"
+        params.append(due_at)
+
+    async with get_db_connection() as conn:
+        await conn.execute(query, params)
+        await conn.commit()
+
+async def delete_stale_scheduled_jobs(before: float) -> int:
+    """Удаляет задачи, просроченные раньше before. Возвращает кол-во удаленных"""
+    async with get_db_connection() as conn:
+        cursor = await conn.execute("DELETE FROM scheduled_jobs WHERE due_at < ?", (before,))
+        await conn.commit()
+        return cursor.rowcount
+
+async def get_scheduled_jobs(not_before: float) -> list[dict]:
+    """Возвращает задачи со временем срабатывания не раньше not_before, по возрастанию времени"""
+    async with get_db_connection(readonly=True) as conn:
+        cursor = await conn.execute(
+            """SELECT chat_id, kind, timer_id, due_at, payload FROM scheduled_jobs
+            WHERE due_at >= ? ORDER BY due_at""",
+            (not_before,)
+        )
+        rows = await cursor.fetchall()
+
+    return [
+        {
+            'chat_id': chat_id,
+            'kind': kind,
+            'timer_id': timer_id,
+            'due_at': due_at,
+            'payload': json.loads(payload),
+        }
+        for chat_id, kind, timer_id, due_at, payload in rows
+    ]
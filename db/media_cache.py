@@ -0,0 +1,51 @@
+import os
+from db.database import get_db_connection
+
+class MediaCache:
+    """file_id картинок, уже загруженных в Telegram (таблица media_files).
+
+    Запись привязана к версии файла (mtime и размер): если файл на диске
+    заменили, старый file_id не используется. Чтение - из памяти,
+    изменения сразу пишутся в БД.
+    """
+
+    def __init__(self):
+        self._files = {}    # {path: (mtime_ns, size, file_id)}
+
+    async def load(self):
+        """Загружает сохраненные file_id из БД"""
+        async with get_db_connection(readonly=True) as conn:
+            cursor = await conn.execute("SELECT path, mtime_ns, size, file_id FROM media_files")
+            rows = await cursor.fetchall()
+
+        self._files = {path: (mtime_ns, size, file_id) for path, mtime_ns, size, file_id in rows}
+
+    def get(self, path: str, stat: os.stat_result) -> str | None:
+        """Возвращает file_id, если он сохранен для этой версии файла"""
+        record = self._files.get(path)
+
+        if record is None or record[:2] != (stat.st_mtime_ns, stat.st_size):
+            return None
+        return record[2]
+
+    async def set(self, path: str, stat: os.stat_result, file_id: str):
+        self._files[path] = (stat.st_mtime_ns, stat.st_size, file_id)
+
+        async with get_db_connection() as conn:
+            await conn.execute(
+                """INSERT OR REPLACE INTO media_files (path, mtime_ns, size, file_id)
+                VALUES (?, ?, ?, ?)""",
+                (path, stat.st_mtime_ns, stat.st_size, file_id)
+            )
+            await conn.commit()
+
+    async def forget(self, path: str):
+        """Удаляет недействительный file_id"""
+        self._files.pop(path, None)
+
+        async with get_db_connection() as conn:
+            await conn.execute("DELETE FROM media_files WHERE path = ?", (path,))
+            await conn.commit()
+
+
+media_cache = MediaCache()
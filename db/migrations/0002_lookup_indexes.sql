@@ -0,0 +1,28 @@
+-- Индексы под горячие запросы из db/help_db_commands.py
+
+-- get_team_players: WHERE team_id = ? ORDER BY joined_at (покрывающий)
+CREATE INDEX IF NOT EXISTS idx_players_team
+    ON players (team_id, joined_at, username, full_name, is_captain, location);
+
+-- get_players_at_location: WHERE team_id = ? AND location = ? ORDER BY joined_at
+CREATE INDEX IF NOT EXISTS idx_players_team_location
+    ON players (team_id, location, joined_at);
+
+-- get_location_questions / get_full_location: WHERE location_id = ?
+CREATE INDEX IF NOT EXISTS idx_questions_location
+    ON questions (location_id);
+
+-- apply_state_transfer: WHERE receiver_id = ? AND expires_at > ?
+CREATE INDEX IF NOT EXISTS idx_state_transfers_receiver
+    ON state_transfers (receiver_id, expires_at);
+
+-- порядок локаций квеста и обратный поиск квестов по локации
+CREATE INDEX IF NOT EXISTS idx_quest_locations_order
+    ON quest_locations (quest_id, order_num);
+
+CREATE INDEX IF NOT EXISTS idx_quest_locations_location
+    ON quest_locations (location_id);
+
+-- create_team_if_not_exists: WHERE name = ?
+CREATE INDEX IF NOT EXISTS idx_teams_name
+    ON teams (name);
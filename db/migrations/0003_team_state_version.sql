@@ -0,0 +1,2 @@
+-- Версия состояния команды для атомарного перехода хода (compare-and-swap в advance_turn)
+ALTER TABLE team_game_states ADD COLUMN version INTEGER NOT NULL DEFAULT 0;
@@ -0,0 +1,13 @@
+-- Отложенные задачи таймеров (подсказки и таймер вопроса), переживают перезапуск бота
+CREATE TABLE IF NOT EXISTS scheduled_jobs (
+    chat_id INTEGER NOT NULL,
+    kind TEXT NOT NULL,               -- группа таймера: clue / question
+    timer_id TEXT NOT NULL,
+    due_at REAL NOT NULL,             -- unix-время срабатывания
+    payload TEXT NOT NULL DEFAULT '{}',
+    PRIMARY KEY (chat_id, kind, timer_id)
+);
+
+-- восстановление при запуске: WHERE due_at >= ? ORDER BY due_at
+CREATE INDEX IF NOT EXISTS idx_scheduled_jobs_due
+    ON scheduled_jobs (due_at);
@@ -0,0 +1,8 @@
+-- file_id загруженных в Telegram картинок: повторная отправка без загрузки файла
+CREATE TABLE IF NOT EXISTS media_files (
+    path TEXT PRIMARY KEY,            -- путь относительно BASE_DIR, как в БД контента
+    mtime_ns INTEGER NOT NULL,        -- версия файла, при изменении file_id недействителен
+    size INTEGER NOT NULL,
+    file_id TEXT NOT NULL,
+    updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
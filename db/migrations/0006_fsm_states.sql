@@ -0,0 +1,11 @@
+-- FSM-состояния игроков (fsm/sqlite_storage.py), переживают перезапуск бота
+CREATE TABLE IF NOT EXISTS fsm_states (
+    key TEXT PRIMARY KEY,             -- ключ DefaultKeyBuilder: fsm:<chat_id>:<user_id>
+    state TEXT,
+    data TEXT NOT NULL DEFAULT '{}',
+    updated_at REAL NOT NULL          -- unix-время последнего изменения
+);
+
+-- чистка устаревших: WHERE updated_at < ?
+CREATE INDEX IF NOT EXISTS idx_fsm_states_updated
+    ON fsm_states (updated_at);
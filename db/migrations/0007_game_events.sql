@@ -0,0 +1,22 @@
+-- Журнал событий игры (db/game_journal.py): только добавление, seq - номер события внутри команды
+CREATE TABLE IF NOT EXISTS game_events (
+    team_id INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    type TEXT NOT NULL,               -- started / updated / advanced / cleared / answer
+    payload TEXT NOT NULL DEFAULT '{}',
+    ts REAL NOT NULL,                 -- unix-время события
+    PRIMARY KEY (team_id, seq)
+);
+
+-- аналитика по времени: WHERE ts BETWEEN ? AND ?
+CREATE INDEX IF NOT EXISTS idx_game_events_ts
+    ON game_events (ts);
+
+-- Снимки состояния команды после события seq: восстановление = снимок + события после него
+CREATE TABLE IF NOT EXISTS game_snapshots (
+    team_id INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    state TEXT NOT NULL,
+    ts REAL NOT NULL,
+    PRIMARY KEY (team_id, seq)
+);
@@ -0,0 +1,2 @@
+-- Другие принимаемые ответы на вопрос, кроме answer: JSON массив ["вариант1", "вариант2"]
+ALTER TABLE questions ADD COLUMN answer_variants TEXT;
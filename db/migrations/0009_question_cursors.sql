@@ -0,0 +1,7 @@
+-- Сколько вопросов каждой локации уже выдано (db/question_allocator.py), чтобы после перезапуска раздача продолжилась с того же места
+CREATE TABLE IF NOT EXISTS question_cursors (
+    location_id INTEGER NOT NULL,
+    shard INTEGER NOT NULL DEFAULT 0,    -- номер воркера в режиме cluster, иначе 0
+    position INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (location_id, shard)
+);
@@ -0,0 +1,2 @@
+-- Сколько воркеров было при сохранении позиции: при другом CLUSTER_WORKERS позиции воркеров сбрасываются
+ALTER TABLE question_cursors ADD COLUMN shard_count INTEGER NOT NULL DEFAULT 1;
@@ -0,0 +1,144 @@
+import asyncio
+import logging
+
+from db.database import get_db_connection
+from config.config import QUESTION_DEAL_WEIGHTS, QUESTION_CURSOR_FLUSH_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+
+class QuestionAllocator:
+    """Раздача вопросов локации командам из колод в памяти.
+
+    Колода локации строится один раз при загрузке контента: вопросы по
+    порядку id или, если заданы weights, плавным взвешенным кругом по
+    сложности (вопрос с весом 2 выдается вдвое чаще, но не подряд). deal
+    берет следующий вопрос колоды за O(1) без запросов к БД, поэтому команды
+    на одной локации получают разные вопросы. Позиции колод пишутся в
+    question_cursors раз в flush_interval секунд и при остановке.
+
+    В режиме cluster у каждого воркера своя позиция и он проходит всю
+    колоду, но начиная со своего места: воркер index из count - с карты
+    index * len(deck) // count. Позиции воркеров действительны только при
+    том же числе воркеров, при другом раздача начинается с начала.
+    """
+
+    def __init__(self, flush_interval: float, weights: dict[int, int] = None):
+        self.flush_interval = flush_interval
+        self.weights = weights
+        self.shard_index = 0
+        self.shard_count = 1
+        self._decks = {}      # {location_id: [question, ...]} в порядке выдачи
+        self._cursors = {}    # {location_id: сколько вопросов выдано}
+        self._dirty = set()   # локации с несохраненной позицией
+        self._flusher = None
+
+    def set_shard(self, index: int, count: int):
+        self.shard_index = index
+        self.shard_count = count
+
+    async def load(self, location_questions: dict[int, list[dict]]):
+        """Строит колоды и читает сохраненные позиции"""
+        self._decks = {
+            location_id: self._build_deck(questions)
+            for location_id, questions in location_questions.items()
+            if questions
+        }
+
+        async with get_db_connection() as conn:
+            # позиции, сохраненные при другом числе воркеров, не подходят
+            await conn.execute("DELETE FROM question_cursors WHERE shard_count != ?", (self.shard_count,))
+            await conn.commit()
+
+            cursor = await conn.execute(
+                "SELECT location_id, position FROM question_cursors WHERE shard = ?",
+                (self.shard_index,)
+            )
+            self._cursors = dict(await cursor.fetchall())
+
+        self._dirty = set()
+
+    def deal(self, location_id: int) -> dict | None:
+        """Следующий вопрос локации или None, если вопросов нет"""
+        deck = self._decks.get(location_id)
+        if not deck:
+            return None
+
+        position = self._cursors.get(location_id, 0)
+        self._cursors[location_id] = position + 1
+        self._dirty.add(location_id)
+
+        offset = self.shard_index * len(deck) // self.shard_count
+        return deck[(position + offset) % len(deck)]
+
+    async def flush(self):
+        """Сохраняет изменившиеся позиции одной транзакцией"""
+        if not self._dirty:
+            return
+
+        batch, self._dirty = self._dirty, set()
+        rows = [(location_id, self.shard_index, self.shard_count, self._cursors[location_id]) for location_id in batch]
+
+        try:
+            async with get_db_connection() as conn:
+                await conn.executemany(
+                    """INSERT INTO question_cursors (location_id, shard, shard_count, position) VALUES (?, ?, ?, ?)
+                    ON CONFLICT (location_id, shard) DO UPDATE
+                    SET shard_count = excluded.shard_count, position = excluded.position""",
+                    rows
+                )
+                await conn.commit()
+        except Exception:
+            self._dirty |= batch
+            raise
+
+    def start(self):
+        """Запускает фоновое сохранение позиций"""
+        if self._flusher is None and self.flush_interval > 0:
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """Останавливает фоновое сохранение и сохраняет позиции"""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+
+        await self.flush()
+
+    def _build_deck(self, questions: list[dict]) -> list[dict]:
+        questions = sorted(questions, key=lambda question: question['id'])
+        if not self.weights:
+            return questions
+
+        # плавный взвешенный круг (как в nginx): на каждом шаге вопрос с наибольшим
+        # накопленным весом идет в колоду, поэтому частые вопросы распределены равномерно
+        weights = [max(self.weights.get(question.get('difficulty'), 1), 0) for question in questions]
+        total = sum(weights)
+        if total == 0:
+            return questions
+
+        current = [0] * len(questions)
+        deck = []
+        for _ in range(total):
+            for index, weight in enumerate(weights):
+                current[index] += weight
+            best = max(range(len(questions)), key=current.__getitem__)
+            current[best] -= total
+            deck.append(questions[best])
+
+        return deck
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as error:
+                logger.error(f"Error while saving question cursors: {error}")
+
+
+question_allocator = QuestionAllocator(QUESTION_CURSOR_FLUSH_INTERVAL, QUESTION_DEAL_WEIGHTS)
@@ -0,0 +1,219 @@
+import json
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+from db.database import get_db_connection
+from config.config import TEAM_STATE_FLUSH_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+
+class TeamStateStore:
+    """Состояние команд (team_game_states) в памяти с отложенной записью в БД.
+
+    Чтение всегда идет из памяти, изменения накапливаются как "грязные" поля
+    и записываются одной транзакцией: в конце хода (commit) или фоновой
+    задачей раз в flush_interval секунд. Переход хода (advance) пишется
+    сразу с проверкой версии, завершение квеста - с синхронизацией на диск.
+    """
+
+    def __init__(self, flush_interval: float):
+        self.flush_interval = flush_interval
+        self._states = {}    # {team_id: state}
+        self._dirty = {}     # {team_id: {field: value}}
+        self._flusher = None
+
+    async def get(self, team_id: int) -> dict | None:
+        """Возвращает копию состояния команды или None"""
+        if team_id is None:
+            return None
+
+        state = self._states.get(team_id)
+        if state is None:
+            state = await self._load(team_id)
+            if state is None:
+                return None
+            self._states[team_id] = state
+
+        return dict(state)
+
+    async def update(self, team_id: int, **fields):
+        """Меняет поля состояния в памяти, в БД они попадут при commit/flush"""
+        if not fields:
+            return
+
+        if team_id not in self._states and await self.get(team_id) is None:
+            return
+
+        fields = {key: _normalize(key, value) for key, value in fields.items()}
+        fields['updated_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+        self._states[team_id].update(fields)
+        self._dirty.setdefault(team_id, {}).update(fields)
+
+    async def advance(self, team_id: int, expected_version: int, **fields) -> bool:
+        """Атомарно применяет переход хода, если версия состояния не изменилась.
+
+        Переход вместе с накопленными изменениями команды пишется в БД сразу,
+        одной транзакцией с проверкой версии. Возвращает False при конфликте.
+        """
+        state = self._states.get(team_id)
+        if state is None:
+            if await self.get(team_id) is None:
+                return False
+            state = self._states[team_id]
+
+        if state['version'] != expected_version:
+            return False
+
+        fields = {key: _normalize(key, value) for key, value in fields.items()}
+        fields['updated_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        fields['version'] = expected_version + 1
+
+        # версию занимаем до первого await, чтобы параллельный переход увидел конфликт
+        changes = {**self._dirty.pop(team_id, {}), **fields}
+        state.update(fields)
+
+        try:
+            async with self._transaction(durable=changes.get('status') == 'finished') as conn:
+                is_applied = await _write_fields(conn, team_id, changes, expected_version) > 0
+        except Exception:
+            self.forget(team_id)
+            raise
+
+        if not is_applied:
+            # состояние в БД изменили в обход памяти - перечитаем его при следующем обращении
+            self.forget(team_id)
+
+        return is_applied
+
+    async def commit(self, team_id: int):
+        """Завершает ход: пишет изменения сразу или оставляет их фоновой записи"""
+        if team_id not in self._dirty:
+            return
+
+        is_finished = self._dirty[team_id].get('status') == 'finished'
+
+        if is_finished or self.flush_interval <= 0:
+            await self.flush(team_id, durable=is_finished)
+
+    async def flush(self, team_id: int = None, durable: bool = False):
+        """Записывает накопленные изменения (одной команды или всех) одной транзакцией"""
+        if team_id is None:
+            batch, self._dirty = self._dirty, {}
+        elif team_id in self._dirty:
+            batch = {team_id: self._dirty.pop(team_id)}
+        else:
+            return
+
+        if not batch:
+            return
+
+        try:
+            async with self._transaction(durable=durable) as conn:
+                for dirty_team_id, fields in batch.items():
+                    await _write_fields(conn, dirty_team_id, fields)
+        except Exception:
+            # возвращаем изменения обратно, более свежие значения не затираем
+            for dirty_team_id, fields in batch.items():
+                self._dirty[dirty_team_id] = {**fields, **self._dirty.get(dirty_team_id, {})}
+            raise
+
+    def forget(self, team_id: int):
+        """Убирает команду из памяти вместе с незаписанными изменениями"""
+        self._states.pop(team_id, None)
+        self._dirty.pop(team_id, None)
+
+    def start(self):
+        """Запускает фоновую запись изменений"""
+        if self._flusher is None and self.flush_interval > 0:
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """Останавливает фоновую запись и сбрасывает в БД все изменения"""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+
+        await self.flush(durable=True)
+
+    @asynccontextmanager
+    async def _transaction(self, durable: bool = False):
+        """Транзакция на соединении записи; durable - с синхронизацией на диск при коммите"""
+        async with get_db_connection() as conn:
+            if durable:
+                await conn.execute_fetchall("PRAGMA synchronous = FULL")
+            try:
+                yield conn
+                await conn.commit()
+            finally:
+                if durable:
+                    await conn.execute_fetchall("PRAGMA synchronous = NORMAL")
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as error:
+                logger.error(f"Error while flushing team states: {error}")
+
+    async def _load(self, team_id: int) -> dict | None:
+        async with get_db_connection(readonly=True) as conn:
+            cursor = await conn.execute(
+                "SELECT * FROM team_game_states WHERE team_id = ?",
+                (team_id,)
+            )
+            row = await cursor.fetchone()
+
+            if not row:
+                return None
+
+            columns = [col[0] for col in cursor.description]
+            state = dict(zip(columns, row))
+
+        # Декодируем JSON-поля
+        if state.get('players_order'):
+            state['players_order'] = json.loads(state['players_order'])
+
+        return state
+
+
+async def _write_fields(conn, team_id: int, fields: dict, expected_version: int = None) -> int:
+    """UPDATE полей состояния; с expected_version - только если версия в БД совпадает"""
+    values = [
+        json.dumps(value) if key == 'players_order' else value
+        for key, value in fields.items()
+    ]
+    set_clause = ', '.join(f"{key} = ?" for key in fields.keys())
+    where_clause = "team_id = ?"
+    params = values + [team_id]
+
+    if expected_version is not None:
+        where_clause += " AND version = ?"
+        params.append(expected_version)
+
+    cursor = await conn.execute(
+        f"UPDATE team_game_states SET {set_clause} WHERE {where_clause}",
+        params
+    )
+    return cursor.rowcount
+
+def _normalize(key: str, value):
+    """Приводит значение к тому виду, в котором оно читается обратно из SQLite"""
+    if key == 'players_order' and isinstance(value, str):
+        return json.loads(value)
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, datetime):
+        return value.isoformat(' ')
+    return value
+
+
+team_state_store = TeamStateStore(TEAM_STATE_FLUSH_INTERVAL)
@@ -0,0 +1,176 @@
+import json
+import time
+import asyncio
+import logging
+from copy import copy
+from typing import Any
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StorageKey, StateType, DefaultKeyBuilder, KeyBuilder
+
+from db.database import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+
+class FSMRecord:
+    __slots__ = ('state', 'data', 'updated_at')
+
+    def __init__(self, state: str | None = None, data: dict | None = None, updated_at: float = 0.0):
+        self.state = state
+        self.data = data if data is not None else {}
+        self.updated_at = updated_at
+
+
+class SQLiteStorage(BaseStorage):
+    """FSM-хранилище в таблице fsm_states с чтением из памяти.
+
+    При открытии все неустаревшие записи загружаются в память, дальше
+    get_* не ходят в БД. Изменения копятся и пишутся пачкой (executemany
+    в одной транзакции) раз в flush_interval секунд и при закрытии.
+    Записи, не менявшиеся дольше ttl секунд, удаляются из памяти и из БД.
+    С flush_interval <= 0 каждое изменение пишется сразу.
+
+    В режиме cluster воркер загружает только записи своих игроков. Игрок,
+    вступивший в команду, переходит на воркер команды с пустым состоянием:
+    вступление сбрасывает FSM, а своей старой копии у нового воркера нет.
+    """
+
+    def __init__(self, flush_interval: float, ttl: float, key_builder: KeyBuilder = None):
+        self.flush_interval = flush_interval
+        self.ttl = ttl
+        self.key_builder = key_builder or DefaultKeyBuilder()
+        self._records = {}    # {key: FSMRecord}
+        self._dirty = set()   # ключи с незаписанными изменениями
+        self._flusher = None
+
+    async def open(self, owns_user=None):
+        """Загружает состояния из БД и запускает фоновую запись.
+        owns_user(user_id) - async-фильтр игроков воркера в режиме cluster"""
+        expire_before = time.time() - self.ttl
+
+        async with get_db_connection() as conn:
+            await conn.execute("DELETE FROM fsm_states WHERE updated_at < ?", (expire_before,))
+            await conn.commit()
+
+            cursor = await conn.execute("SELECT key, state, data, updated_at FROM fsm_states")
+            rows = await cursor.fetchall()
+
+        self._records = {
+            key: FSMRecord(state, json.loads(data), updated_at)
+            for key, state, data, updated_at in rows
+            if owns_user is None or await owns_user(self._key_user_id(key))
+        }
+
+        if self._flusher is None and self.flush_interval > 0:
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def close(self):
+        """Останавливает фоновую запись и сбрасывает изменения в БД"""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+
+        await self.flush()
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        record = self._touch(key)
+        record.state = state.state if isinstance(state, State) else state
+
+        if self.flush_interval <= 0:
+            await self.flush()
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        record = self._records.get(self.key_builder.build(key))
+        return record.state if record else None
+
+    async def set_data(self, key: StorageKey, data: dict[str, Any]) -> None:
+        record = self._touch(key)
+        record.data = data.copy()
+
+        if self.flush_interval <= 0:
+            await self.flush()
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        record = self._records.get(self.key_builder.build(key))
+        return record.data.copy() if record else {}
+
+    async def get_value(self, storage_key: StorageKey, dict_key: str, default: Any = None) -> Any:
+        record = self._records.get(self.key_builder.build(storage_key))
+        return copy(record.data.get(dict_key, default)) if record else default
+
+    async def flush(self):
+        """Пишет накопленные изменения одной транзакцией"""
+        if not self._dirty:
+            return
+
+        keys, self._dirty = self._dirty, set()
+        upserts, deletes = [], []
+
+        for key in keys:
+            record = self._records.get(key)
+            if record is None or (record.state is None and not record.data):
+                # пустую запись не храним
+                self._records.pop(key, None)
+                deletes.append((key,))
+            else:
+                upserts.append((key, record.state, json.dumps(record.data, ensure_ascii=False, default=str), record.updated_at))
+
+        try:
+            async with get_db_connection() as conn:
+                if upserts:
+                    await conn.executemany(
+                        """INSERT OR REPLACE INTO fsm_states (key, state, data, updated_at)
+                        VALUES (?, ?, ?, ?)""",
+                        upserts
+                    )
+                if deletes:
+                    await conn.executemany("DELETE FROM fsm_states WHERE key = ?", deletes)
+                await conn.commit()
+        except Exception:
+            self._dirty |= keys    # запишем при следующей попытке
+            raise
+
+    async def evict_expired(self):
+        """Удаляет записи, не менявшиеся дольше ttl"""
+        expire_before = time.time() - self.ttl
+        expired = [key for key, record in self._records.items() if record.updated_at < expire_before]
+
+        for key in expired:
+            del self._records[key]
+            self._dirty.discard(key)
+
+        if expired:
+            async with get_db_connection() as conn:
+                await conn.execute("DELETE FROM fsm_states WHERE updated_at < ?", (expire_before,))
+                await conn.commit()
+
+    def _key_user_id(self, key: str) -> int:
+        # ключ DefaultKeyBuilder: <prefix>:<chat_id>:<user_id>
+        return int(key.rsplit(self.key_builder.separator, 1)[-1])
+
+    def _touch(self, key: StorageKey) -> FSMRecord:
+        storage_key = self.key_builder.build(key)
+
+        record = self._records.get(storage_key)
+        if record is None:
+            record = self._records[storage_key] = FSMRecord()
+
+        record.updated_at = time.time()
+        self._dirty.add(storage_key)
+        return record
+
+    async def _flush_loop(self):
+        last_eviction = time.monotonic()
+
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+
+                if time.monotonic() - last_eviction > min(self.ttl, 3600):
+                    last_eviction = time.monotonic()
+                    await self.evict_expired()
+            except Exception as error:
+                logger.error(f"Error while flushing FSM states: {error}")
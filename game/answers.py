@@ -0,0 +1,85 @@
+"""Проверка ответов на вопросы.
+
+Принимаемые ответы вопроса нормализуются один раз при загрузке контента
+(AnswerMatcher в db/content_cache.py), при каждой попытке нормализуется
+только текст игрока. Опечатки допускаются ограниченной проверкой
+расстояния Дамерау-Левенштейна за O(длина ответа * max_typos).
+"""
+
+
+def normalize_answer(text: str) -> str:
+    """Ответ без регистра, пробелов и знаков препинания, ё -> е"""
+    return ''.join(char for char in text.casefold() if char.isalnum()).replace('ё', 'е')
+
+
+class AnswerMatcher:
+    """Принимаемые ответы на вопрос в нормализованном виде.
+
+    Опечатки (до max_typos правок: вставка, удаление, замена или
+    перестановка соседних букв) допускаются только в ответах не короче
+    min_length и не из одних цифр: "24" и "26" - разные варианты ответа.
+    """
+    __slots__ = ('variants', 'fuzzy_variants', 'max_typos')
+
+    def __init__(self, answers: list[str], max_typos: int = 0, min_length: int = 5):
+        self.variants = frozenset(normalize_answer(answer) for answer in answers if answer) - {''}
+        self.max_typos = max_typos
+        self.fuzzy_variants = tuple(
+            variant for variant in self.variants
+            if max_typos > 0 and len(variant) >= min_length and not variant.isdigit()
+        )
+
+    def match(self, text: str) -> bool:
+        answer = normalize_answer(text)
+        if answer in self.variants:
+            return True
+
+        return any(within_distance(answer, variant, self.max_typos) for variant in self.fuzzy_variants)
+
+
+def within_distance(a: str, b: str, limit: int) -> bool:
+    """Расстояние Дамерау-Левенштейна (без повторных правок подстроки) между a и b не больше limit.
+
+    Считается только полоса матрицы шириной 2 * limit + 1 вокруг диагонали
+    с выходом, как только вся строка полосы превысила limit.
+    """
+    n, m = len(a), len(b)
+    if abs(n - m) > limit:
+        return False
+    if limit <= 0:
+        return a == b
+
+    width = 2 * limit + 1
+    too_far = limit + 1
+    # ячейка полосы d в строке i - это столбец j = i - limit + d
+    before_prev = [too_far] * width
+    prev = [d - limit if 0 <= d - limit <= m else too_far for d in range(width)]
+
+    for i in range(1, n + 1):
+        cur = [too_far] * width
+        row_min = too_far
+
+        for d in range(width):
+            j = i - limit + d
+            if j < 0 or j > m:
+                continue
+
+            if j == 0:
+                value = i
+            else:
+                value = prev[d] + (a[i - 1] != b[j - 1])    # замена
+                if d + 1 < width:
+                    value = min(value, prev[d + 1] + 1)     # лишняя буква
+                if d > 0:
+                    value = min(value, cur[d - 1] + 1)      # пропущенная буква
+                if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                    value = min(value, before_prev[d] + 1)  # перестановка соседних букв
+
+            cur[d] = value
+            row_min = min(row_min, value)
+
+        if row_min > limit:
+            return False
+        before_prev, prev = prev, cur
+
+    return prev[m - n + limit] <= limit
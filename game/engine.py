@@ -0,0 +1,412 @@
+"""Правила квеста без Telegram и БД.
+
+Функции переходов получают состояние команды и уже загруженные данные
+(вопрос, игроки, текущее время) и возвращают список эффектов: что
+отправить, какие таймеры взвести, что записать. Выполняет эффекты
+handlers/effects.py.
+"""
+from datetime import datetime, timedelta
+
+from fsm.quest_logic import QuestStates
+from game.answers import AnswerMatcher
+from handlers.help_functions import format_timedelta
+from config.config import QUESTION_TIME_LIMIT
+
+TEAM_SIZE = 6    # игроков (и локаций) в квесте
+
+# клавиатуры в эффектах - по имени, их создает исполнитель
+MARKUP_REMOVE = 'remove'                  # убрать клавиатуру
+MARKUP_ARRIVED = 'arrived'                # кнопка "Я на месте"
+MARKUP_ACCEPT_STATE = 'accept_state'      # кнопка перехода на свой ход
+
+
+class TeamGame:
+    """Состояние игры команды (строка team_game_states)"""
+    __slots__ = ('team_id', 'players_order', 'current_player_idx', 'current_question_num',
+                 'current_question_id', 'correct_answers', 'is_pretend_on_right_answer',
+                 'question_deadline', 'status', 'is_test_mode', 'version', 'created_at')
+
+    def __init__(self, team_id: int, players_order: list[int], current_player_idx: int = 0,
+                 current_question_num: int = 1, current_question_id: int = None, correct_answers: int = 0,
+                 is_pretend_on_right_answer: bool = True, question_deadline: datetime = None,
+                 status: str = 'waiting', is_test_mode: bool = False, version: int = 0,
+                 created_at: datetime = None):
+        self.team_id = team_id
+        self.players_order = players_order
+        self.current_player_idx = current_player_idx
+        self.current_question_num = current_question_num    # он же id локации
+        self.current_question_id = current_question_id
+        self.correct_answers = correct_answers
+        self.is_pretend_on_right_answer = is_pretend_on_right_answer    # зачислять ли правильный ответ за вопрос
+        self.question_deadline = question_deadline
+        self.status = status
+        self.is_test_mode = is_test_mode
+        self.version = version
+        self.created_at = created_at
+
+    @classmethod
+    def from_state(cls, state: dict) -> 'TeamGame':
+        """Из словаря состояния team_state_store"""
+        return cls(
+            team_id=state['team_id'],
+            players_order=state['players_order'] or [],
+            current_player_idx=state['current_player_idx'],
+            current_question_num=state['current_question_num'],
+            current_question_id=state['current_question_idx'],
+            correct_answers=state['correct_answers'],
+            is_pretend_on_right_answer=bool(state['is_pretend_on_right_answer']),
+            question_deadline=_parse_datetime(state['question_deadline']),
+            status=state['status'],
+            is_test_mode=bool(state['is_test_mode']),
+            version=state['version'],
+            created_at=_parse_datetime(state['created_at']),
+        )
+
+    @property
+    def current_player_id(self) -> int | None:
+        if 0 <= self.current_player_idx < len(self.players_order):
+            return self.players_order[self.current_player_idx]
+        return None
+
+    @property
+    def is_last_turn(self) -> bool:
+        return self.current_player_idx + 1 >= len(self.players_order)
+
+    def can_accept_turn(self, user_id: int) -> bool:
+        """Перейдет ли ход к игроку в accept_turn (тогда ему нужен вопрос локации)"""
+        return self.status not in ('finished', 'waiting') and user_id == self.current_player_id
+
+
+# --- эффекты ---
+
+class Effect:
+    __slots__ = ()
+
+    def __repr__(self):
+        fields = ', '.join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+    def __eq__(self, other):
+        return type(self) is type(other) and all(
+            getattr(self, name) == getattr(other, name) for name in self.__slots__
+        )
+
+
+class Reply(Effect):
+    """Сообщение в чат, из которого пришло событие"""
+    __slots__ = ('text', 'markup')
+
+    def __init__(self, text: str, markup: str = None):
+        self.text = text
+        self.markup = markup
+
+
+class Send(Effect):
+    """Сообщение игроку; с media_path - картинка с подписью text (или просто text, если картинки нет)"""
+    __slots__ = ('chat_id', 'text', 'media_path', 'markup')
+
+    def __init__(self, chat_id: int, text: str, media_path: str = None, markup: str = None):
+        self.chat_id = chat_id
+        self.text = text
+        self.media_path = media_path
+        self.markup = markup
+
+
+class Broadcast(Effect):
+    """Рассылка всей команде, кроме exclude_id"""
+    __slots__ = ('text', 'exclude_id')
+
+    def __init__(self, text: str, exclude_id: int = None):
+        self.text = text
+        self.exclude_id = exclude_id
+
+
+class ArmQuestionTimers(Effect):
+    """Таймер вопроса и подсказки к нему в чате chat_id"""
+    __slots__ = ('chat_id', 'question')
+
+    def __init__(self, chat_id: int, question: dict):
+        self.chat_id = chat_id
+        self.question = question
+
+
+class CancelQuestionTimers(Effect):
+    __slots__ = ('chat_id',)
+
+    def __init__(self, chat_id: int):
+        self.chat_id = chat_id
+
+
+class InitState(Effect):
+    """Создание состояния игры команды"""
+    __slots__ = ('players_order', 'fields')
+
+    def __init__(self, players_order: list[int], fields: dict):
+        self.players_order = players_order
+        self.fields = fields
+
+
+class UpdateState(Effect):
+    """Изменение полей состояния без проверки версии"""
+    __slots__ = ('fields',)
+
+    def __init__(self, **fields):
+        self.fields = fields
+
+
+class AdvanceTurn(Effect):
+    """Переход хода с проверкой версии. При конфликте остальные эффекты не выполняются"""
+    __slots__ = ('expected_version', 'fields')
+
+    def __init__(self, expected_version: int, **fields):
+        self.expected_version = expected_version
+        self.fields = fields
+
+
+class ClearState(Effect):
+    """Удаление состояния игры (после тестового прохождения)"""
+    __slots__ = ()
+
+
+class SetFSMState(Effect):
+    """FSM-состояние игрока, от которого пришло событие; None - сбросить"""
+    __slots__ = ('state',)
+
+    def __init__(self, state):
+        self.state = state
+
+
+class Log(Effect):
+    __slots__ = ('text',)
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+class Record(Effect):
+    """Событие в журнал игры (db/game_journal.py), кроме изменений состояния - их пишет исполнитель"""
+    __slots__ = ('event_type', 'payload')
+
+    def __init__(self, event_type: str, **payload):
+        self.event_type = event_type
+        self.payload = payload
+
+
+CONFLICT_TEXT = "Этот ход уже обработан."
+
+
+# --- правила ---
+
+def is_correct_answer(text: str, question: dict) -> bool:
+    """Проверка ответа: AnswerMatcher из кэша контента, для других вопросов - точное совпадение с answer"""
+    matcher = question.get('answer_matcher') or AnswerMatcher([question.get('answer')])
+    return matcher.match(text)
+
+
+def check_start(players: list[dict], is_test_mode: bool) -> str | None:
+    """Можно ли начинать квест с этими игроками. Возвращает текст ошибки или None"""
+    if not is_test_mode:
+        if len(players) < TEAM_SIZE:
+            return f"В команде недостаточно игроков чтобы начать квест!\n\nНужное кол-во: {TEAM_SIZE}."
+
+        if len({player['location'] for player in players}) != len(players):
+            return "В команде есть игроки стоящие на одинаковых локациях!\n\nИзмените это используя меню из кнопок."
+
+    if not players:
+        return "В команде нет игроков!"
+    if len(players) > TEAM_SIZE:
+        return f"В команде больше допустимого кол-ва игроков!\n\nНужное кол-во: {TEAM_SIZE}."
+
+    return None
+
+
+def arrange_players(players: list[dict], is_test_mode: bool) -> list[dict]:
+    """Порядок ходов: по номеру локации. В тестовом режиме игроки по кругу занимают все локации"""
+    if is_test_mode:
+        players = [
+            {**players[location_id % len(players)], 'location': location_id + 1}
+            for location_id in range(TEAM_SIZE)
+        ]
+
+    return sorted(players, key=lambda player: player['location'])
+
+
+def start_game(team_id: int, captain_chat_id: int, players: list[dict], question: dict,
+               now: datetime, is_test_mode: bool = False) -> list[Effect]:
+    """Начало квеста: первый по порядку игрок получает вопрос своей локации.
+    players - уже упорядоченные arrange_players"""
+    first_player_id = players[0]['id']
+    players_order = [player['id'] for player in players]
+
+    return [
+        InitState(players_order, {
+            'current_player_idx': 0,
+            'players_order': players_order,
+            'current_question_num': 1,
+            'current_question_idx': question.get('id'),
+            'correct_answers': 0,
+            'question_deadline': now + timedelta(minutes=QUESTION_TIME_LIMIT),
+            'status': 'playing',
+            'is_test_mode': is_test_mode,
+            'deadline': now + timedelta(hours=1),    # +1 час на прохождение
+        }),
+        Send(first_player_id, f"Игра началась! Ваш вопрос: {question.get('question_text')}",
+             media_path=question.get('media_path'), markup=MARKUP_REMOVE),
+        # таймеры - в чате капитана, начавшего квест
+        ArmQuestionTimers(captain_chat_id, question),
+        Broadcast("Квест начат! Первый игрок получил вопрос.", exclude_id=first_player_id),
+        SetFSMState(QuestStates.waiting_for_answer),
+    ]
+
+
+def submit_answer(game: TeamGame, user_id: int, chat_id: int, text: str, question: dict,
+                  now: datetime, next_location: dict = None, team_name: str = None) -> list[Effect]:
+    """Ответ игрока на вопрос. next_location - локация следующего игрока (для карты),
+    team_name нужен только на последнем ходу (game.is_last_turn)"""
+    if user_id != game.current_player_id:
+        return [Reply("Сейчас не ваш ход!")]
+
+    effects = []
+    correct_answers = game.correct_answers
+    is_pretend_on_right_answer = game.is_pretend_on_right_answer
+
+    def answer_record(result: str) -> Record:
+        return Record('answer', user_id=user_id, question_id=question.get('id'), text=text, result=result)
+
+    if game.question_deadline and game.question_deadline < now:
+        is_pretend_on_right_answer = False    # закрываем возможность на получения балла за вопрос
+        effects += [
+            answer_record('late'),
+            Reply("❌ Время на ответ истекло!"),
+            Reply(f"Правильный ответ: {question.get('answer')}"),
+            Log(f"User [id:{user_id}] has not any time to answer question [question_id:{question.get('id')}] in quest [Base Quest]"),
+        ]
+    elif not is_correct_answer(text, question):
+        effects.append(Reply("❌ Неверно! Попробуйте еще раз."))
+        if is_pretend_on_right_answer:
+            effects.append(Reply("Вы истратили свою попытку и ответили неверно, продолжайте отвечать, вопрос не будет засчитан."))
+
+        return effects + [
+            answer_record('wrong'),
+            UpdateState(is_pretend_on_right_answer=False),
+            Log(f"User [id:{user_id}] unsuccessfully answered question [question_id:{question.get('id')}] in quest [Base Quest]"),
+        ]
+    else:
+        if is_pretend_on_right_answer:    # если первая попытка то зачисляем ответ
+            correct_answers += 1
+
+        effects += [
+            answer_record('correct'),
+            CancelQuestionTimers(chat_id),
+            Reply("✅ Верно, молодец!"),
+            Log(f"User [id:{user_id}] completed question [question_id:{question.get('id')}] in quest [Base Quest]"),
+        ]
+
+    if game.is_last_turn:
+        return effects + _finish(game, correct_answers, is_pretend_on_right_answer, now, team_name)
+
+    return effects + [
+        AdvanceTurn(
+            game.version,
+            current_player_idx=game.current_player_idx + 1,
+            current_question_num=game.current_question_num + 1,
+            correct_answers=correct_answers,
+            is_pretend_on_right_answer=True,
+        ),
+        *_arrival(chat_id, next_location),
+        SetFSMState(QuestStates.waiting_for_location_confirmation),
+    ]
+
+
+def _arrival(chat_id: int, location: dict | None) -> list[Effect]:
+    """Карта к следующей локации и кнопка «Я на месте»"""
+    if location is None:
+        effects = [Reply("Карта не найдена")]
+    else:
+        effects = [Send(
+            chat_id,
+            f"Отлично! Задание выполнено! Лови карту с отмеченной точкой передвижения. На следующем этапе тебя уже заждался твой сокомандник! Буква, полученная на этапе - «{location.get('letter_for_location')}»",
+            media_path=location.get('image_path'),
+        )]
+
+    return effects + [Reply("Нажмите кнопку по прибытии:", markup=MARKUP_ARRIVED)]
+
+
+def _finish(game: TeamGame, correct_answers: int, is_pretend_on_right_answer: bool,
+            now: datetime, team_name: str) -> list[Effect]:
+    quest_time_passed = format_timedelta(now - game.created_at) if game.created_at else '-'
+
+    effects = [
+        AdvanceTurn(
+            game.version,
+            current_player_idx=game.current_player_idx,
+            current_question_num=game.current_question_num,
+            correct_answers=correct_answers,
+            is_pretend_on_right_answer=is_pretend_on_right_answer,
+            ended_at=now,
+            status='finished',
+        ),
+        Broadcast(f"🎉 Команда завершила квест!\n\nКоманда: {team_name}\nПравильных ответов: {correct_answers}/{len(game.players_order)}\nВремя прохождения: {quest_time_passed}."),
+        Broadcast("Всех участников команды ждём на месте сборов. Спасибо за игру!"),
+        Log(f"The team [team_id:{game.team_id}] has finished the quest [Base quest]."),
+    ]
+
+    if game.is_test_mode:    # processing removing all achievements for test mode of the quest
+        effects.append(ClearState())
+
+    return effects + [SetFSMState(None)]
+
+
+def confirm_arrival(game: TeamGame, next_username: str) -> list[Effect]:
+    """Игрок дошел до следующей локации: ход передается следующему игроку"""
+    next_player_id = game.current_player_id
+
+    return [
+        Send(next_player_id, "Предыдущий игрок закончил свой ход, ваша очередь!\n\nДля перехода на свой ход используйте кнопку ниже",
+             markup=MARKUP_ACCEPT_STATE),
+        SetFSMState(None),
+        Reply(f"Так точно, ход передан другому игроку - @{next_username}. Следите за состоянием игры!"),
+        Log(f"The move of game passed to next player [user_id:{next_player_id}]."),
+    ]
+
+
+def accept_turn(game: TeamGame, user_id: int, chat_id: int, question: dict | None, now: datetime) -> list[Effect]:
+    """Игрок принимает ход и получает вопрос своей локации.
+    question - выданный для локации вопрос (None - вопросов нет); выдавать его нужно, только если game.can_accept_turn"""
+    if game.status == 'finished':
+        return [Reply("Ошибка: игра уже закончена.")]
+    if game.status == 'waiting':
+        return [Reply("Ошибка: игра ещё не началась.")]
+
+    if user_id != game.current_player_id:
+        return [
+            Reply("Сейчас не ваш ход для получения состояния."),
+            Log(f"Error: Move of game is transfered unsuccessfully from player1 [user_id:{user_id}] to player2 [user_id:{game.current_player_id}]. The move is not of player."),
+        ]
+
+    if question is None:
+        return [
+            Reply("Вы успешно перешли на свой ход!"),
+            ClearState(),
+            Log(f'Error: there arent any questions for location [location_id:{game.current_question_num}]'),
+            Reply("Ошибка: нет вопросов для этой локации"),
+        ]
+
+    return [
+        Reply("Вы успешно перешли на свой ход!"),
+        Send(user_id, f"Вопрос {game.current_question_num}: {question.get('question_text')}",
+             media_path=question.get('media_path'), markup=MARKUP_REMOVE),
+        ArmQuestionTimers(chat_id, question),
+        UpdateState(
+            current_question_idx=question.get('id'),
+            question_deadline=now + timedelta(minutes=QUESTION_TIME_LIMIT),
+        ),
+        SetFSMState(QuestStates.waiting_for_answer),
+        Log(f"Move of game is transfered successfully from player1 [user_id:{user_id}] to player2 [user_id:{user_id}]."),
+    ]
+
+
+def _parse_datetime(value) -> datetime | None:
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
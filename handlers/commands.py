@@ -1,37 +1,26 @@
-import os
-import json
-from random import choice
-from datetime import datetime, timedelta
-from aiogram import types, Dispatcher, Bot
-from aiogram.types import ReplyKeyboardRemove
-from aiogram.fsm.storage.base import StorageKey
+from datetime import datetime
+from aiogram import types
 from aiogram.fsm.context import FSMContext
 from aiogram.utils.keyboard import InlineKeyboardBuilder
-from aiogram.exceptions import TelegramForbiddenError
 
 from texts.messages import WELCOME, HELP
-from fsm.quest_logic import QuestStates, WaitForPassword
-from db.help_db_commands import (add_player_to_team, get_team_players, 
-                                 update_game_state, get_exist_teams, create_team_if_not_exists, 
-                                 update_game_progress, generate_invite_link, create_team, join_team,
+from fsm.quest_logic import WaitForPassword
+from db.help_db_commands import (get_team_players, generate_invite_link, create_team, join_team,
                                  get_team_name, is_admin, get_team_captain, mention_user, get_user_team,
                                  get_player_location, is_team_captain, set_player_location, create_or_upgrade_captain,
-                                 create_or_upgrade_admin, get_full_location, get_location_questions,
-                                 init_team_state, update_team_state, get_team_state, get_player_by_id,
-                                 update_team_state, prepare_state_transfer, apply_state_transfer, get_game_state_for_team,
-                                 get_status_team_game, set_lyrics_for_team, get_team_lyrics, delete_user_from_system, clear_team_game_states)
+                                 create_or_upgrade_admin, get_team_state, get_player_by_id, get_game_state_for_team,
+                                 get_status_team_game, set_lyrics_for_team, get_team_lyrics, delete_user_from_system)
+from db.content_cache import content_cache
+from db.question_allocator import question_allocator
 from handlers.messages import format_game_state
-from handlers.help_functions import format_timedelta
 from help.logging import log_action
-from handlers.timer_manager import TimerManager, QuestionTimerManager
-from main import BASE_DIR, bot
-from keyboards import start_markup, captain_user_markup, default_user_markup, accept_state_markup
-from config.config import (CAPTAIN_PASSWORD, ADMIN_PASSWORD, 
-                           QUESTION_TIME_LIMIT, FIRST_CLUE_OF_QUESTION,
-                           SECOND_CLUE_OF_QUESTION, THIRD_CLUE_OF_QUESTION)
+from game import engine
+from handlers.effects import apply_effects
+from handlers.team_actors import TeamActorRegistry
+from keyboards import start_markup, captain_user_markup, default_user_markup
+from config.config import CAPTAIN_PASSWORD, ADMIN_PASSWORD, TEAM_ACTOR_IDLE_TIMEOUT
 
-timer_manager = TimerManager()
-question_timer_manager = QuestionTimerManager()
+team_actors = TeamActorRegistry(idle_timeout=TEAM_ACTOR_IDLE_TIMEOUT)
 
 async def cmd_my_location(message: types.Message, state: FSMContext):
     """Показывает текущую локацию игрока"""
@@ -313,26 +302,7 @@ async def cmd_help(message: types.Message, state: FSMContext):
 
     await message.answer(HELP, parse_mode="HTML")
 
-async def start_quest_for_team(team_id: int, question_id: int, players: list[dict], is_test_mode=False):
-    """Инициализирует квест для команды"""
-    players = players
-    players_ids = [pl["id"] for pl in players]    # [user_id1, user_id2, ...]
-    question_deadline = datetime.now() + timedelta(minutes=QUESTION_TIME_LIMIT)
-    await init_team_state(team_id=team_id, players=players_ids)
-
-    await update_team_state(
-        team_id,
-        current_player_idx=0,
-        players_order=json.dumps(players_ids),
-        current_question_num=1,
-        current_question_idx=question_id,
-        correct_answers=0,
-        question_deadline = question_deadline,
-        status='playing',
-        is_test_mode=is_test_mode,
-        deadline=datetime.now() + timedelta(hours=1)  # +1 час на прохождение
-    )
-
+@team_actors.serialized
 async def start_quest(message: types.Message, state: FSMContext, is_test_mode=False):
     await state.clear()
 
@@ -345,511 +315,91 @@ async def start_quest(message: types.Message, state: FSMContext, is_test_mode=Fa
     team_id = await get_user_team(user_id)
     status_quest = await get_status_team_game(team_id=team_id)
     
-    if status_quest is None:    # первый заход в квест
-        ...
-    else:
-        if status_quest.lower() == 'finished':
-            return await message.answer("Квест уже закончен, его нельзя начать снова! \n\nЗа подробностями обратитесь к организатору.")
+    if status_quest is not None and status_quest.lower() == 'finished':
+        return await message.answer("Квест уже закончен, его нельзя начать снова! \n\nЗа подробностями обратитесь к организатору.")
 
     players = await get_team_players(team_id)
 
     log_action(f"Players from team [team_id:{team_id}]: {players}")
 
-    if not is_test_mode:
-        if len(players) < 6: 
-            await message.answer("В команде недостаточно игроков чтобы начать квест!\n\nНужное кол-во: 6.")
-            return
+    error_text = engine.check_start(players, is_test_mode)
+    if error_text:
+        return await message.answer(error_text)
 
-        if [players.count(pl['location']) for pl in players].count(1) != len(players):
-            await message.answer("В команде есть игроки стоящие на одинаковых локациях!\n\nИзмените это используя меню из кнопок.")
-            return
-    
-    if not players:
-        await message.answer("В команде нет игроков!")
-        return
-    elif len(players) > 6:
-        await message.answer("В команде больше допустимого кол-ва игроков!\n\nНужное кол-во: 6.")
-        return
-    
     if is_test_mode:
         log_action(f"User [id:{user_id}] started quest in the test mode [Base Quest]")
 
-        # creating needed players for the quest in the test mode
-        j = 0
-        new_players_list = []
-        
-        for location_id in range(1, 7):
-            cur_player = players[j].copy()
-            cur_player['location'] = location_id
-            new_players_list.append(cur_player)
-
-            if j + 1 < len(players):
-                j += 1
-            else:
-                j = 0
-        
-        players = new_players_list
-
-    # сортировка игроков по локации
-    players.sort(key=lambda pl: pl['location'])
-
-    first_player = players[0]
-    first_player_id = first_player["id"]
-    
-    location_id = first_player['location']
-    questions = await get_location_questions(location_id=location_id)
-
-    try:
-        question = choice(questions)    # рандомный вопрос из соответственной локации
-        question_id = question.get('id')
-        answer_hints = json.loads(question.get('answer_hints'))
-        hints_media_paths_db = question.get('hints_media_paths')
-
-        if hints_media_paths_db:
-            hints_media_paths = json.loads(hints_media_paths_db)
+    players = engine.arrange_players(players, is_test_mode)
+    location_id = players[0]['location']
+    question = question_allocator.deal(location_id)
 
-        question_media_path = question.get('media_path')
-    except IndexError:    # выбрана локация для которой нет вопросов
+    if question is None:    # выбрана локация для которой нет вопросов
         await message.answer("На вашу локацию нет вопросов в БД.")
         log_action(f"Error: Location [location_id:{location_id}] has not have any questions.")
         return
-    except TypeError as error:    
-        await message.answer("Ошибка с данными в БД")
-        log_action(f"Error: {error=}")
-        return 
-    except Exception as error:
-        log_action(f"Error: {error=}")
-
-    try:
-        path_to_question_photo = os.path.join(BASE_DIR, question_media_path)
-        photo = types.FSInputFile(path_to_question_photo)
-        await bot.send_photo(
-            first_player_id, 
-            photo, 
-            caption=f"Игра началась! Ваш вопрос: {question.get('question_text')}",
-            reply_markup=ReplyKeyboardRemove()
-        )
-    except Exception:
-        await bot.send_message(
-            first_player_id, 
-            f"Игра началась! Ваш вопрос: {question.get('question_text')}",
-            reply_markup=ReplyKeyboardRemove()
-        )
-
-    # добавляем таймер для вопроса
-    await question_timer_manager.add_timer(
-        chat_id=chat_id,
-        bot=bot,
-        delay=QUESTION_TIME_LIMIT,
-        message="Время вышло!",
-        timer_id="question_timer"
-    )
-
-
-    # планируем сообщения подсказок
-    try:
-        fisrt_clue, second_clue, third_clue = answer_hints
-        media_fc, media_sc, media_tc = hints_media_paths
-
-        await timer_manager.add_timer(
-            chat_id, 
-            bot, 
-            FIRST_CLUE_OF_QUESTION, 
-            message=f"Подсказка #1: {fisrt_clue}",
-            media_path=media_fc, 
-            timer_id="clue1"
-        )
-        await timer_manager.add_timer(
-            chat_id, 
-            bot, 
-            SECOND_CLUE_OF_QUESTION, 
-            message=f"Подсказка #2: {second_clue}", 
-            media_path=media_sc, 
-            timer_id="clue2"
-        )
-        await timer_manager.add_timer(
-            chat_id, 
-            bot, 
-            THIRD_CLUE_OF_QUESTION, 
-            message=f"Подсказка #3: {third_clue}", 
-            media_path=media_tc, 
-            timer_id="clue3"
-        )
-    except Exception as error:
-        log_action(f"Error: {error=}")
-
-    # уведомляем остальных участников команды
-    await notify_team_except_current(
-        team_id, 
-        first_player_id, 
-        "Квест начат! Первый игрок получил вопрос."
-    )
-    await start_quest_for_team(team_id=team_id, question_id=question_id, players=players, is_test_mode=is_test_mode)
-
-    await state.set_state(QuestStates.waiting_for_answer) 
-    log_action(f"User [id:{user_id}] started quest [Base Quest]")
-
-async def send_question(player_id: int, message: types.Message, state: FSMContext): 
-    user_id = player_id
-    chat_id = message.chat.id
-
-    team_id = await get_user_team(user_id=user_id)
-    user_data = await get_team_state(team_id=team_id)
-    team_id = user_data["team_id"]
-    current_player_idx = user_data["current_player_idx"]
-    players_ids=user_data["players_order"]
-    question_num = user_data["current_question_num"]
-
-    # получение экземпляров игроков
-    players = [await get_player_by_id(user_id=user_id) for user_id in players_ids]
-
-    current_player = players[current_player_idx]
-    location_id = question_num    # question_num is similar to location_id. generally, its the same
-    
-    try:
-        questions = await get_location_questions(location_id=location_id)
-        question = choice(questions)    # рандомный вопрос из соответственной локации
-        question_id = question.get('id')
-        question_media_path = question.get('media_path')
-    except IndexError as error:
-        await clear_team_game_states(team_id=team_id)
-        log_action(f'Error: there arent any questions for location [location_id:{location_id}]')
-        return await message.answer("Ошибка: нет вопросов для этой локации")
-
-    try:
-        path_to_question_photo = os.path.join(BASE_DIR, question_media_path)
-        photo = types.FSInputFile(path_to_question_photo)
-        await bot.send_photo(
-            player_id, 
-            photo, 
-            caption=f"Вопрос {question_num}: {question.get('question_text')}",
-            reply_markup=ReplyKeyboardRemove()
-        )
-    except Exception:        
-        await bot.send_message(
-            player_id, 
-            f"Вопрос {question_num}: {question.get('question_text')}",
-            reply_markup=ReplyKeyboardRemove()
-        )
-
-    question_deadline = datetime.now() + timedelta(minutes=QUESTION_TIME_LIMIT)
-
-    # try:
-    #     answer_hints = json.loads(question.get('answer_hints'))
-    #     print(question.get('hints_media_paths'))
-    # except json.decoder.JSONDecodeError as error:    
-    #     await message.answer("Ошибка с данными в БД")
-    #     log_action(f"Error: {error}")
-    
-    # answer_hints = json.loads(question.get('answer_hints'))
-
-    # добавляем таймер для вопроса
-    await question_timer_manager.add_timer(
-        chat_id=chat_id,
-        bot=bot,
-        delay=QUESTION_TIME_LIMIT,
-        message="Время вышло!",
-        timer_id="question_timer"
-    )
-
-    try:
-        question_id = question.get('id')
-        answer_hints = json.loads(question.get('answer_hints'))
-        hints_media_paths_db = question.get('hints_media_paths')
-
-        if hints_media_paths_db:
-            hints_media_paths = json.loads(hints_media_paths_db)
-
-        question_media_path = question.get('media_path')
-    except IndexError:    # выбрана локация для которой нет вопросов
-        await message.answer("На вашу локацию нет вопросов в БД.")
-        log_action(f"Error: Location [location_id:{location_id}] has not have any questions.")
-        return 
-
-    # планируем сообщения подсказок
-    try:
-        fisrt_clue, second_clue, third_clue = answer_hints
-        media_fc, media_sc, media_tc = hints_media_paths
-        await timer_manager.add_timer(
-            chat_id, 
-            bot, 
-            FIRST_CLUE_OF_QUESTION, 
-            message=f"Подсказка #1: {fisrt_clue}",
-            media_path=media_fc, 
-            timer_id="clue1"
-        )
-        await timer_manager.add_timer(
-            chat_id, 
-            bot, 
-            SECOND_CLUE_OF_QUESTION, 
-            message=f"Подсказка #2: {second_clue}", 
-            media_path=media_sc, 
-            timer_id="clue2"
-        )
-        await timer_manager.add_timer(
-            chat_id, 
-            bot, 
-            THIRD_CLUE_OF_QUESTION, 
-            message=f"Подсказка #3: {third_clue}", 
-            media_path=media_tc, 
-            timer_id="clue3"
-        )
-    except:
-        ...
-    
-    await update_team_state(
-        team_id=team_id,
-        current_question_idx=question_id,
-        question_deadline = question_deadline,
-    )
 
-    await state.set_state(QuestStates.waiting_for_answer)
+    effects = engine.start_game(team_id, chat_id, players, question, datetime.now(), is_test_mode)
+    if await apply_effects(effects, message.bot, chat_id, team_id, state):
+        log_action(f"User [id:{user_id}] started quest [Base Quest]")
 
+@team_actors.serialized
 async def process_answer(message: types.Message, state: FSMContext):
     user_id = message.from_user.id
     chat_id = message.chat.id
 
     team_id = await get_user_team(user_id=user_id)
-    user_data = await get_team_state(team_id=team_id)
+    game = engine.TeamGame.from_state(await get_team_state(team_id=team_id))
 
-    team_id = user_data["team_id"]
-    current_player_idx = user_data["current_player_idx"]
-    current_question_idx = user_data["current_question_idx"]
-    question_num = user_data["current_question_num"]
-    correct_answers = user_data["correct_answers"]
-    players_ids = user_data["players_order"]
-    is_pretend_on_right_answer = user_data["is_pretend_on_right_answer"]
-    question_deadline = user_data["question_deadline"]
+    question = content_cache.get_question(game.current_question_id)
+    next_location = content_cache.get_location(game.current_question_num + 1)    # question_num is similar to location_id
+    team_name = await get_team_name(team_id=team_id) if game.is_last_turn else None
 
-    is_question_deadline_passed = False
-
-    # получение экземпляров игроков
-    players = [await get_player_by_id(user_id=user_id) for user_id in players_ids]
-
-
-    if message.from_user.id != players[current_player_idx].get('user_id'):
-        await message.answer("Сейчас не ваш ход!")
-        return
-    
-    
-    current_player = players[current_player_idx]
-    location_id = question_num    # question_num is similar to location_id. generally, its the same
-    questions = await get_location_questions(location_id=location_id)
-    question = list(filter(lambda q: q["id"] == current_question_idx, questions))[0]    
-
-    if question_deadline and datetime.fromisoformat(question_deadline) < datetime.now():
-        is_question_deadline_passed = True
-        await message.answer("❌ Время на ответ истекло!")
-        
-        is_pretend_on_right_answer = False    # закрываем возможность на получения балла за вопрос
-
-        await update_team_state(
-            team_id=team_id,
-            is_pretend_on_right_answer=is_pretend_on_right_answer, 
-        )
-        
-        await message.answer(f"Правильный ответ: {question.get('answer')}")
-        log_action(f"User [id:{user_id}] has not any time to answer question [question_id:{question.get('id')}] in quest [Base Quest]")
-
-
-    if not is_question_deadline_passed:
-        if "".join(message.text.lower().strip().split()) != "".join(question.get("answer").lower().strip().split()):
-            await message.answer("❌ Неверно! Попробуйте еще раз.")
-
-            if is_pretend_on_right_answer:
-                await message.answer("Вы истратили свою попытку и ответили неверно, продолжайте отвечать, вопрос не будет засчитан.")
-
-            is_pretend_on_right_answer = False    # закрываем возможность на получения балла за вопрос
-
-            await update_team_state(
-                team_id=team_id,
-                is_pretend_on_right_answer=is_pretend_on_right_answer, 
-            )
-
-            log_action(f"User [id:{user_id}] unsuccessfully answered question [question_id:{question.get('id')}] in quest [Base Quest]")
-            return
-        else:
-            # Отменяем все таймеры при правильном ответе
-            await timer_manager.cancel_timer(chat_id)
-            await question_timer_manager.cancel_timer(message.chat.id, "question_timer")
-
-            if is_pretend_on_right_answer:    # если первая попытка то зачисляем ответ
-                correct_answers += 1
-
-            await message.answer("✅ Верно, молодец!")
-            log_action(f"User [id:{user_id}] completed question [question_id:{question.get('id')}] in quest [Base Quest]")
-    
-    current_player_idx += 1
-    try:
-        current_player = players[current_player_idx]    # следующий игрок
-        location_id = question_num + 1   # question_num is similar to location_id. generally, its the same
-        next_players = players[current_player_idx:]
-    except IndexError:
-        next_players = None
-
-    if not next_players:
-        await update_team_state(
-            team_id=team_id, 
-            current_player_idx=current_player_idx - 1, 
-            current_question_num=question_num,
-            correct_answers=correct_answers,
-            ended_at=datetime.now(),
-            status='finished',
-        )
-
-        team_name = await get_team_name(team_id=team_id)
-        user_data = await get_team_state(team_id=team_id)
-        quest_time_passed = datetime.fromisoformat(user_data["ended_at"]) - datetime.fromisoformat(user_data["created_at"])
-        quest_time_passed = format_timedelta(quest_time_passed)
-
-        # Уведомляем всех участников команды
-        await notify_team_except_current(
-            team_id, 
-            None, 
-            f"🎉 Команда завершила квест!\n\nКоманда: {team_name}\nПравильных ответов: {correct_answers}/{len(players_ids)}\nВремя прохождения: {quest_time_passed}."
-        )
-
-        await notify_team_except_current(
-            team_id, 
-            None, 
-            f"Всех участников команды ждём на месте сборов. Спасибо за игру!"
-        )
-
-        log_action(f"The team [team_id:{team_id}] has finished the quest [Base quest].")
-
-
-        is_test_mode = user_data["is_test_mode"]
-    
-        if is_test_mode:    # processing removing all achievements for test mode of the quest
-            await clear_team_game_states(team_id=team_id)
-
-        await state.clear()
-        return
-
-    try:
-        # location_data = await get_full_location(location_id=location_id)
-        # latitude, longtitude = location_data.get('coordinates').split(',')
-        # await message.answer_location(latitude=latitude, longitude=longtitude)
-
-        location_data = await get_full_location(location_id=location_id)
-        letter_for_location = location_data.get('letter_for_location')
-        media_path = location_data.get('image_path')
-        path_to_map_photo = os.path.join(BASE_DIR, media_path)
-        photo = types.FSInputFile(path_to_map_photo)
-        await bot.send_photo(chat_id, photo)
-        await message.answer(f'Отлично! Задание выполнено! Лови карту с отмеченной точкой передвижения. На следующем этапе тебя уже заждался твой сокомандник! Буква, полученная на этапе - «{letter_for_location}»')
-    except:
-        await message.answer("Карта не найдена")
-        
-
-    builder = InlineKeyboardBuilder()
-    builder.button(text="Я на месте", callback_data="arrived")
-    
-    await message.answer(
-        "Нажмите кнопку по прибытии:",
-        reply_markup=builder.as_markup()
-    )
-    
-    await update_team_state(
-        team_id=team_id, 
-        current_player_idx=current_player_idx, 
-        current_question_num=question_num + 1,
-        correct_answers=correct_answers,
-        is_pretend_on_right_answer=True, 
+    effects = engine.submit_answer(
+        game, user_id, chat_id, message.text, question, datetime.now(),
+        next_location=next_location, team_name=team_name
     )
+    await apply_effects(effects, message.bot, chat_id, team_id, state)
 
-    await state.set_state(QuestStates.waiting_for_location_confirmation)
-
-async def notify_team_except_current(team_id: int, current_player_id: int, message_text: str):
-    players = await get_team_players(team_id)
-    
-    # Отправляем сообщение всем, кроме текущего игрока
-    for player_data in players:
-        player_id = player_data.get('id')
-        if player_id != current_player_id:
-            try:
-                await bot.send_message(player_id, message_text)
-            except Exception as e:
-                print(f"Не удалось отправить сообщение игроку {player_id}: {e}")
-            except TelegramForbiddenError:
-                print(f"Пользователь {player_id} не начал диалог с ботом")
-
+@team_actors.serialized
 async def confirm_arrival(callback: types.CallbackQuery, state: FSMContext):
     user_id = callback.from_user.id
     team_id = await get_user_team(user_id=user_id)
-    user_data = await get_team_state(team_id=team_id)
-    current_player_idx = user_data["current_player_idx"]
-    players_ids = user_data["players_order"]
+    game = engine.TeamGame.from_state(await get_team_state(team_id=team_id))
 
     log_action(f"User [id:{user_id}] used /confirm_arrival")
 
-    # получение экземпляров игроков
-    players = [await get_player_by_id(user_id=user_id) for user_id in players_ids]
+    next_player = await get_player_by_id(game.current_player_id)
 
-    target_user = players[current_player_idx]
-    target_user_id = target_user.get('user_id')
-
-    await bot.send_message(
-        target_user_id, 
-        f"Предыдущий игрок закончил свой ход, ваша очередь!\n\nДля перехода на свой ход используйте кнопку ниже",
-        reply_markup=accept_state_markup,
-    )
-
-    await state.clear()
-    await callback.message.answer(f"Так точно, ход передан другому игроку - @{target_user.get('username')}. Следите за состоянием игры!")
+    effects = engine.confirm_arrival(game, next_player.get('username'))
+    await apply_effects(effects, callback.bot, callback.message.chat.id, team_id, state)
     await callback.answer()
-    log_action(f"The move of game passed to next player [user_id:{target_user_id}].")
 
+@team_actors.serialized
 async def cmd_accept_state(update: types.Message | types.CallbackQuery, state: FSMContext):
     if isinstance(update, types.Message):
-        user_id = update.from_user.id
         message = update
     elif isinstance(update, types.CallbackQuery):
-        print('111')
-        user_id = update.from_user.id
         message = update.message
     else:
         raise ValueError("Unsupported update type")
-    
-    print(user_id)
 
+    user_id = update.from_user.id
     log_action(f"User [id:{user_id}] used /accept_state")
 
     try:
         team_id = await get_user_team(user_id=user_id)
-        user_data = await get_team_state(team_id=team_id)
-        current_player_idx = user_data["current_player_idx"]
-        players_ids = user_data["players_order"]
+        game = engine.TeamGame.from_state(await get_team_state(team_id=team_id))
     except Exception as error:
         await message.answer("Ошибка: вы не состоите в системе или не имеете права на эту команду.")
         return
 
-    status_game = user_data.get('status')
-
-    if status_game == 'finished':
-        await message.answer("Ошибка: игра уже закончена.")
-        return
-    elif status_game == 'waiting':
-        await message.answer("Ошибка: игра ещё не началась.")
-        return
-
-    # получение экземпляров игроков
-    players = [await get_player_by_id(user_id=user_id) for user_id in players_ids]
-
-    target_user = players[current_player_idx]
-    target_user_id = target_user.get('user_id')
-
-    if user_id != target_user_id: 
-        await message.answer("Сейчас не ваш ход для получения состояния.")
-        log_action(f"Error: Move of game is transfered unsuccessfully from player1 [user_id:{user_id}] to player2 [user_id:{target_user_id}]. The move is not of player.")
-        return
-    
-    await message.answer(
-            "Вы успешно перешли на свой ход!"
-        )
-    await send_question(target_user_id, message, state)
+    # вопрос выдается, только если ход действительно переходит: иначе позиция колоды сдвинулась бы зря
+    question = None
+    if game.can_accept_turn(user_id):
+        question = question_allocator.deal(game.current_question_num)    # question_num is similar to location_id
 
-    log_action(f"Move of game is transfered successfully from player1 [user_id:{user_id}] to player2 [user_id:{target_user_id}].")
+    effects = engine.accept_turn(game, user_id, message.chat.id, question, datetime.now())
+    await apply_effects(effects, update.bot, message.chat.id, team_id, state)
 
 async def cmd_create_team(message: types.Message, state: FSMContext):
     """Команда для создания новой команды (только для админов)"""
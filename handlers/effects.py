@@ -0,0 +1,180 @@
+import asyncio
+import logging
+from aiogram import Bot
+from aiogram.types import ReplyKeyboardRemove
+from aiogram.fsm.context import FSMContext
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+from aiogram.exceptions import TelegramForbiddenError
+
+from game.engine import (Reply, Send, Broadcast, ArmQuestionTimers, CancelQuestionTimers,
+                         InitState, UpdateState, AdvanceTurn, ClearState, SetFSMState, Log, Record,
+                         CONFLICT_TEXT, MARKUP_REMOVE, MARKUP_ARRIVED, MARKUP_ACCEPT_STATE)
+from db.help_db_commands import (init_team_state, advance_turn, clear_team_game_states, get_team_players)
+from db.team_state_store import team_state_store
+from db.game_journal import game_journal
+from handlers.outbox import outbox, Priority
+from handlers.media import send_media_photo
+from handlers.timer_manager import timer_manager, question_timer_manager
+from help.logging import log_action
+from keyboards import accept_state_markup
+from config.config import (QUESTION_TIME_LIMIT, FIRST_CLUE_OF_QUESTION,
+                           SECOND_CLUE_OF_QUESTION, THIRD_CLUE_OF_QUESTION)
+
+logger = logging.getLogger(__name__)
+
+_arrived_builder = InlineKeyboardBuilder()
+_arrived_builder.button(text="Я на месте", callback_data="arrived")
+
+MARKUPS = {
+    MARKUP_REMOVE: ReplyKeyboardRemove(),
+    MARKUP_ARRIVED: _arrived_builder.as_markup(),
+    MARKUP_ACCEPT_STATE: accept_state_markup,
+}
+
+STATE_EFFECTS = (InitState, UpdateState, AdvanceTurn, ClearState, Record)
+
+
+async def apply_effects(effects: list, bot: Bot, chat_id: int, team_id: int, state: FSMContext = None) -> bool:
+    """Выполняет эффекты перехода game.engine пачкой.
+
+    Порядок: запись состояния команды одной транзакцией (при конфликте версии
+    игрок получает CONFLICT_TEXT, остальное не выполняется) и события в журнал
+    игры, FSM-состояние
+    игрока, сообщения - в разные чаты параллельно, в один чат по порядку,
+    затем новые таймеры (сообщение таймера приходит после вопроса).
+    Возвращает False при конфликте.
+    """
+    if not await _persist([effect for effect in effects if isinstance(effect, STATE_EFFECTS)], team_id):
+        log_action(f"Conflict: turn of team [team_id:{team_id}] was already advanced, action in chat [chat_id:{chat_id}] is skipped")
+        await outbox.send_message(bot, chat_id, CONFLICT_TEXT)
+        return False
+
+    messages = {}    # {chat_id: [(text, media_path, markup, priority), ...]}
+    timers = []
+    team_players = None
+
+    for effect in effects:
+        if isinstance(effect, SetFSMState) and state is not None:
+            if effect.state is None:
+                await state.clear()
+            else:
+                await state.set_state(effect.state)
+        elif isinstance(effect, ArmQuestionTimers):
+            timers.append(effect)
+        elif isinstance(effect, CancelQuestionTimers):
+            await timer_manager.cancel_timer(effect.chat_id)
+            await question_timer_manager.cancel_timer(effect.chat_id, "question_timer")
+        elif isinstance(effect, Reply):
+            messages.setdefault(chat_id, []).append((effect.text, None, effect.markup, Priority.TURN))
+        elif isinstance(effect, Send):
+            messages.setdefault(effect.chat_id, []).append((effect.text, effect.media_path, effect.markup, Priority.TURN))
+        elif isinstance(effect, Broadcast):
+            if team_players is None:
+                team_players = await get_team_players(team_id)
+            for player in team_players:
+                if player['id'] != effect.exclude_id:
+                    messages.setdefault(player['id'], []).append((effect.text, None, None, Priority.BROADCAST))
+        elif isinstance(effect, Log):
+            log_action(effect.text)
+
+    await asyncio.gather(*(_send_all(bot, target_id, queue) for target_id, queue in messages.items()))
+
+    for effect in timers:
+        await _arm_question_timers(bot, effect.chat_id, effect.question)
+
+    await game_journal.commit()
+    return True
+
+
+async def _persist(effects: list, team_id: int) -> bool:
+    """Изменения состояния копятся в памяти и пишутся одной транзакцией: вместе с переходом хода или commit.
+    Примененные изменения добавляются в журнал игры"""
+    advance = None
+    events = []    # [(тип, поля), ...]
+
+    for effect in effects:
+        if isinstance(effect, InitState):
+            await init_team_state(team_id=team_id, players=effect.players_order)
+            await team_state_store.update(team_id, **effect.fields)
+            events.append(('started', effect.fields))
+        elif isinstance(effect, UpdateState):
+            await team_state_store.update(team_id, **effect.fields)
+            events.append(('updated', effect.fields))
+        elif isinstance(effect, AdvanceTurn):
+            advance = effect
+        elif isinstance(effect, ClearState):
+            # удаление - только после перехода хода, иначе запись состояния вернула бы строку
+            if advance is not None and not await _advance(advance, team_id, events):
+                return False
+            advance = None
+            await clear_team_game_states(team_id=team_id)
+            events.append(('cleared', {}))
+        elif isinstance(effect, Record):
+            events.append((effect.event_type, effect.payload))
+
+    if advance is not None:
+        if not await _advance(advance, team_id, events):
+            return False
+    else:
+        await team_state_store.commit(team_id)
+
+    for event_type, fields in events:
+        game_journal.record(team_id, event_type, **fields)
+    return True
+
+
+async def _advance(effect: AdvanceTurn, team_id: int, events: list) -> bool:
+    if not await advance_turn(team_id, effect.expected_version, **effect.fields):
+        return False
+
+    events.append(('advanced', {**effect.fields, 'version': effect.expected_version + 1}))
+    return True
+
+
+async def _send_all(bot: Bot, chat_id: int, queue: list):
+    for text, media_path, markup, priority in queue:
+        reply_markup = MARKUPS.get(markup)
+        try:
+            if media_path:
+                try:
+                    await send_media_photo(bot, chat_id, media_path, priority=priority,
+                                           caption=text, reply_markup=reply_markup)
+                    continue
+                except Exception:
+                    pass    # картинки нет - отправляем только текст
+
+            await outbox.send_message(bot, chat_id, text, priority=priority, reply_markup=reply_markup)
+        except TelegramForbiddenError:
+            logger.warning(f"User [id:{chat_id}] has not started a chat with the bot, message is not delivered")
+        except Exception as error:
+            logger.warning(f"Failed to send a message to user [id:{chat_id}]: {error}")
+
+
+async def _arm_question_timers(bot: Bot, chat_id: int, question: dict):
+    # добавляем таймер для вопроса
+    await question_timer_manager.add_timer(
+        chat_id=chat_id,
+        bot=bot,
+        delay=QUESTION_TIME_LIMIT,
+        message="Время вышло!",
+        timer_id="question_timer"
+    )
+
+    # планируем сообщения подсказок
+    try:
+        clues = zip(
+            question.get('answer_hints'),
+            question.get('hints_media_paths'),
+            (FIRST_CLUE_OF_QUESTION, SECOND_CLUE_OF_QUESTION, THIRD_CLUE_OF_QUESTION),
+        )
+        for number, (clue, media_path, delay) in enumerate(clues, start=1):
+            await timer_manager.add_timer(
+                chat_id,
+                bot,
+                delay,
+                message=f"Подсказка #{number}: {clue}",
+                media_path=media_path,
+                timer_id=f"clue{number}"
+            )
+    except Exception as error:
+        log_action(f"Error: {error=}")
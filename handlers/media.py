@@ -0,0 +1,166 @@
+import os
+import asyncio
+import logging
+from aiogram import Bot, types
+from aiogram.exceptions import TelegramBadRequest
+
+from main import BASE_DIR
+from config.config import (MEDIA_STORAGE_CHAT_ID, MEDIA_OPTIMIZE, MEDIA_CACHE_DIR,
+                           MEDIA_MAX_SIDE, MEDIA_JPEG_QUALITY)
+from help import image_optimizer
+from db.media_cache import media_cache
+from db.content_cache import content_cache
+from handlers.outbox import outbox, Priority
+
+logger = logging.getLogger(__name__)
+
+MAX_PHOTO_SIZE = 10 * 1024 * 1024    # лимит Telegram на фото, в байтах
+
+# загрузки файлов, которые идут прямо сейчас {path: Future}
+_uploads = {}
+# оптимизированные варианты картинок {путь из контента: путь к варианту}
+_variants = {}
+# фоновая предзагрузка картинок при запуске
+_prewarm_task = None
+
+
+async def send_media_photo(bot: Bot, chat_id: int, media_path: str,
+                           priority: Priority = Priority.TURN, **kwargs) -> types.Message:
+    """Отправляет картинку из BASE_DIR: по сохраненному file_id, а если его нет - загрузкой файла.
+
+    Файл загружается в Telegram один раз: параллельные отправки той же картинки
+    ждут первую загрузку и используют ее file_id. Если у картинки есть
+    оптимизированный вариант - отправляется он.
+    """
+    media_path = _variants.get(media_path, media_path)
+    path = os.path.join(BASE_DIR, media_path)
+    stat = os.stat(path)    # FileNotFoundError, если файла нет
+
+    upload = _uploads.get(media_path)
+    if upload is not None:
+        await asyncio.wait([upload])
+
+    file_id = media_cache.get(media_path, stat)
+    if file_id is not None:
+        try:
+            return await outbox.send_photo(bot, chat_id, file_id, priority=priority, **kwargs)
+        except TelegramBadRequest:
+            # file_id больше не принимается - загружаем файл заново
+            await media_cache.forget(media_path)
+
+    upload = _uploads[media_path] = asyncio.get_running_loop().create_future()
+    try:
+        msg = await outbox.send_photo(bot, chat_id, types.FSInputFile(path), priority=priority, **kwargs)
+        await media_cache.set(media_path, stat, msg.photo[-1].file_id)
+        return msg
+    finally:
+        if _uploads.get(media_path) is upload:
+            del _uploads[media_path]
+        upload.set_result(None)
+
+
+async def verify_media_manifest() -> dict[str, os.stat_result]:
+    """Проверяет все картинки контента параллельно и сообщает о проблемных.
+    Возвращает {путь: stat} для найденных файлов"""
+    paths = sorted(content_cache.get_media_paths())
+    results = await asyncio.gather(
+        *(asyncio.to_thread(os.stat, os.path.join(BASE_DIR, path)) for path in paths),
+        return_exceptions=True
+    )
+
+    present, problems = {}, []
+    for path, result in zip(paths, results):
+        if isinstance(result, OSError):
+            problems.append(f"{path}: файл не найден")
+        elif result.st_size == 0:
+            problems.append(f"{path}: пустой файл")
+        elif result.st_size > MAX_PHOTO_SIZE and not _can_optimize():
+            problems.append(f"{path}: больше 10 МБ, Telegram не примет его как фото")
+        else:
+            present[path] = result
+
+    for problem in problems:
+        logger.warning(f"Media check: {problem}")
+    logger.info(f"Media check: {len(present)} of {len(paths)} files are ready")
+
+    return present
+
+
+async def optimize_media(paths: list[str], lookup_only: bool = False):
+    """Готовит уменьшенные варианты картинок (в пуле процессов), дальше отправляются они.
+    lookup_only=True - только находит варианты, уже готовые в MEDIA_CACHE_DIR"""
+    global _variants
+
+    sources = [os.path.join(BASE_DIR, path) for path in paths]
+    cache_dir = os.path.join(BASE_DIR, MEDIA_CACHE_DIR)
+    if lookup_only:
+        optimized = await asyncio.to_thread(
+            image_optimizer.find_optimized_images, sources, cache_dir, MEDIA_MAX_SIDE, MEDIA_JPEG_QUALITY
+        )
+    else:
+        optimized = await image_optimizer.optimize_images(sources, cache_dir, MEDIA_MAX_SIDE, MEDIA_JPEG_QUALITY)
+
+    _variants = {
+        path: os.path.relpath(optimized[source], BASE_DIR)
+        for path, source in zip(paths, sources)
+        if source in optimized
+    }
+    logger.info(f"Media optimization: {len(_variants)} of {len(paths)} files have a smaller variant")
+
+
+async def prewarm_media(bot: Bot, chat_id: int, paths: list[str]):
+    """Заранее загружает в служебный чат картинки без сохраненного file_id"""
+    paths = [path for path in paths if not _has_file_id(path)]
+    results = await asyncio.gather(
+        *(send_media_photo(bot, chat_id, path, priority=Priority.BROADCAST, disable_notification=True)
+          for path in paths),
+        return_exceptions=True
+    )
+
+    for path, result in zip(paths, results):
+        if isinstance(result, Exception):
+            logger.warning(f"Media prewarm: failed to upload {path}: {result}")
+    logger.info(f"Media prewarm: uploaded {sum(not isinstance(result, Exception) for result in results)} of {len(paths)} files")
+
+
+async def prepare_media(bot: Bot, prewarm: bool = True, optimize: bool = True):
+    """Этап запуска: проверка картинок, их оптимизация и, если задан MEDIA_STORAGE_CHAT_ID, фоновая предзагрузка.
+    prewarm=False - без предзагрузки (в режиме cluster ее делает только первый воркер),
+    optimize=False - без оптимизации, только готовые варианты (в режиме cluster их готовит фронт-процесс)"""
+    global _prewarm_task
+
+    files = await verify_media_manifest()
+
+    if _can_optimize() and files:
+        await optimize_media(list(files), lookup_only=not optimize)
+
+    if prewarm and MEDIA_STORAGE_CHAT_ID is not None and files:
+        _prewarm_task = asyncio.create_task(prewarm_media(bot, MEDIA_STORAGE_CHAT_ID, list(files)))
+
+
+async def optimize_content_media():
+    """Проверка и оптимизация картинок контента без бота: в режиме cluster - один раз до запуска воркеров"""
+    files = await verify_media_manifest()
+
+    if _can_optimize() and files:
+        await optimize_media(list(files))
+
+
+async def stop_media_prewarm():
+    """Прерывает незавершенную предзагрузку"""
+    if _prewarm_task is not None and not _prewarm_task.done():
+        _prewarm_task.cancel()
+        await asyncio.gather(_prewarm_task, return_exceptions=True)
+
+
+def _can_optimize() -> bool:
+    return MEDIA_OPTIMIZE and image_optimizer.is_available()
+
+
+def _has_file_id(media_path: str) -> bool:
+    media_path = _variants.get(media_path, media_path)
+    try:
+        stat = os.stat(os.path.join(BASE_DIR, media_path))
+    except OSError:
+        return False
+    return media_cache.get(media_path, stat) is not None
@@ -1,6 +1,7 @@
 import json
 from aiogram import types
-from db.help_db_commands import get_location_questions, get_team_name, is_team_captain
+from db.help_db_commands import get_team_name, is_team_captain
+from db.content_cache import content_cache
 from keyboards import captain_user_markup, default_user_markup
 
 async def echo(message: types.Message):
@@ -30,8 +31,7 @@ async def format_game_state(state: dict) -> str:
     current_player_id = info['players_order'][info['current_player_idx']]
     current_player = next((p for p in players if p['id'] == current_player_id), None)
 
-    questions = await get_location_questions(current_player['location'])
-    question = list(filter(lambda q: q["id"] == info['current_question_idx'], questions))[0]
+    question = content_cache.get_question(info['current_question_idx'])
     team_name = await get_team_name(team_id=info['team_id'])
 
     text = [
@@ -0,0 +1,169 @@
+import asyncio
+import logging
+from collections import Counter
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.flags import get_flag
+from aiogram.types import Update, TelegramObject, Message, CallbackQuery
+
+from help.cache import TTLCache
+from help.token_bucket import TokenBucket
+from db.help_db_commands import get_user_team_cached
+
+THROTTLED_TEXT = "Слишком часто! Подождите немного и попробуйте снова."
+
+logger = logging.getLogger(__name__)
+
+
+class InFlightMiddleware(BaseMiddleware):
+    """Считает обновления в обработке, чтобы при остановке бота дождаться их завершения.
+    Регистрируется первым outer-middleware для update"""
+
+    def __init__(self):
+        self.active = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: dict[str, Any],
+    ) -> Any:
+        self.active += 1
+        self._idle.clear()
+        try:
+            return await handler(event, data)
+        finally:
+            self.active -= 1
+            if not self.active:
+                self._idle.set()
+
+    async def drain(self, timeout: float) -> int:
+        """Ждет завершения обработки (не дольше timeout), возвращает кол-во незавершенных обновлений"""
+        # задачи, созданные вебхуком перед остановкой сервера, успевают войти в обработку
+        await asyncio.sleep(0)
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"{self.active} updates are still being handled after {timeout} s")
+        return self.active
+
+
+class DeduplicationMiddleware(BaseMiddleware):
+    """Отбрасывает повторы до обработчиков и запросов к БД.
+
+    - повторно доставленное обновление (тот же update_id);
+    - повторное нажатие той же inline-кнопки на том же сообщении
+      (user_id, data, message_id) в течение callback_ttl секунд - на него
+      сразу отвечаем, чтобы у игрока не крутились "часики".
+    Регистрируется как outer-middleware для update.
+    """
+
+    def __init__(self, maxsize: int, update_ttl: float, callback_ttl: float):
+        self.updates = TTLCache(maxsize, update_ttl)
+        self.callbacks = TTLCache(maxsize, callback_ttl)
+        self.dropped = 0
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: dict[str, Any],
+    ) -> Any:
+        if not self.updates.add(event.update_id):
+            self.dropped += 1
+            return None
+
+        callback = event.callback_query
+        if callback is not None and callback.message is not None:
+            key = (callback.from_user.id, callback.data, callback.message.message_id)
+
+            if not self.callbacks.add(key):
+                self.dropped += 1
+                logger.debug(f"Duplicate callback [{callback.data}] from user [id:{callback.from_user.id}] is dropped")
+                try:
+                    await callback.answer()
+                except Exception:
+                    pass
+                return None
+
+        return await handler(event, data)
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """Ограничивает частоту запросов игрока и его команды ведрами токенов.
+
+    Лимит выбирается по флагу обработчика rate_limit (имя из RATE_LIMITS),
+    без флага действует лимит 'default'. Запрос сверх лимита отбрасывается
+    до обработчика: в режиме 'reply' игрок один раз получает короткий ответ,
+    дальше запросы молча игнорируются, пока лимит не восстановится.
+    Ведра неактивных игроков и команд удаляются через idle_timeout секунд.
+    Регистрируется как inner-middleware для message и callback_query.
+    """
+
+    def __init__(self, limits: dict, idle_timeout: float, maxsize: int):
+        self.limits = limits
+        self.buckets = TTLCache(maxsize, idle_timeout)    # {(вид, id, лимит): TokenBucket}
+        self.notified = TTLCache(maxsize, idle_timeout)   # кому уже ответили о превышении
+        self.stats = Counter()    # {(лимит, passed/throttled): кол-во}
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        limit_name = get_flag(data, 'rate_limit', default='default')
+        limit = self.limits.get(limit_name)
+        user = data.get('event_from_user')
+
+        if limit is None or user is None:
+            return await handler(event, data)
+
+        is_allowed = self._acquire(('user', user.id, limit_name), limit.get('user'))
+
+        if is_allowed and limit.get('team'):
+            team_id = await get_user_team_cached(user_id=user.id)
+            if team_id is not None:
+                is_allowed = self._acquire(('team', team_id, limit_name), limit['team'])
+
+        if is_allowed:
+            self.stats[(limit_name, 'passed')] += 1
+            self.notified.pop(user.id)
+            return await handler(event, data)
+
+        self.stats[(limit_name, 'throttled')] += 1
+
+        if limit.get('mode', 'reply') == 'reply' and self.notified.add(user.id):
+            await self._notify(event)
+
+        return None
+
+    def snapshot(self) -> dict:
+        """Счетчики для мониторинга: {'лимит': {'passed': n, 'throttled': n}}"""
+        result = {}
+        for (limit_name, outcome), count in self.stats.items():
+            result.setdefault(limit_name, {})[outcome] = count
+        return result
+
+    def _acquire(self, key: tuple, rate: tuple | None) -> bool:
+        if rate is None:
+            return True
+
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(*rate)
+        self.buckets.set(key, bucket)    # продлеваем жизнь ведра активного игрока
+
+        return bucket.try_acquire()
+
+    async def _notify(self, event: TelegramObject):
+        try:
+            if isinstance(event, CallbackQuery):
+                await event.answer(THROTTLED_TEXT)
+            elif isinstance(event, Message):
+                await event.answer(THROTTLED_TEXT)
+        except Exception as error:
+            logger.debug(f"Failed to send throttling notice: {error}")
@@ -0,0 +1,266 @@
+import time
+import asyncio
+import logging
+import itertools
+from enum import IntEnum
+from collections import OrderedDict, deque
+
+from aiogram import Bot
+from aiogram.methods import TelegramMethod, SendMessage, SendPhoto
+from aiogram.exceptions import TelegramRetryAfter
+
+from help.token_bucket import TokenBucket
+from config.config import (OUTBOX_GLOBAL_RATE, OUTBOX_CHAT_RATE, OUTBOX_CHAT_BURST,
+                           OUTBOX_WORKERS, OUTBOX_MAX_RETRIES, OUTBOX_MAX_CHATS)
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    """Приоритет исходящего сообщения: чем меньше, тем раньше отправка (между чатами, в чате - по порядку)"""
+    TURN = 0         # ход игры: вопрос, передача хода, ответ игроку
+    NOTICE = 1       # подсказки и прочие сообщения по таймеру
+    BROADCAST = 2    # рассылки всей команде
+
+
+class OutboxJob:
+    """Одна отправка в очереди"""
+    __slots__ = ('bot', 'method', 'chat_id', 'priority', 'seq', 'future', 'attempts', 'enqueued_at')
+
+    def __init__(self, bot: Bot, method: TelegramMethod, priority: Priority, seq: int, future: asyncio.Future):
+        self.bot = bot
+        self.method = method
+        self.chat_id = method.chat_id
+        self.priority = priority
+        self.seq = seq    # порядок постановки, для FIFO внутри приоритета
+        self.future = future
+        self.attempts = 0
+        self.enqueued_at = time.monotonic()
+
+
+class OutboxMetrics:
+    """Счетчики доставки"""
+    __slots__ = ('sent', 'failed', 'retried', 'deferred', 'total_wait', 'max_wait')
+
+    def __init__(self):
+        self.sent = 0        # доставлено
+        self.failed = 0      # ошибка после всех попыток
+        self.retried = 0     # повторы после TelegramRetryAfter
+        self.deferred = 0    # откладывания из-за лимита чата
+        self.total_wait = 0.0
+        self.max_wait = 0.0  # максимальное время от постановки в очередь до доставки
+
+    def snapshot(self) -> dict:
+        return {
+            'sent': self.sent,
+            'failed': self.failed,
+            'retried': self.retried,
+            'deferred': self.deferred,
+            'avg_wait': self.total_wait / self.sent if self.sent else 0.0,
+            'max_wait': self.max_wait,
+        }
+
+
+class Outbox:
+    """Очередь исходящих сообщений с лимитами Telegram.
+
+    Сообщения отправляют несколько воркеров в порядке приоритета (внутри
+    приоритета - в порядке постановки). Общий бакет держит лимит на весь бот,
+    бакет чата - лимит на один чат. В один чат в каждый момент отправляется
+    одно сообщение, остальные ждут в очереди чата, не занимая воркеры.
+    Внутри чата сообщения уходят строго в порядке постановки: приоритет
+    решает только, какой чат обслужить раньше. На TelegramRetryAfter
+    отправка повторяется через указанное Telegram время. Вызывающий
+    получает результат метода (Message) или исключение через await.
+    """
+
+    def __init__(self, global_rate: float, chat_rate: float, chat_burst: int,
+                 workers_count: int, max_retries: int, max_chats: int):
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.workers_count = workers_count
+        self.max_retries = max_retries
+        self.max_chats = max_chats
+        self.global_bucket = TokenBucket(global_rate)
+        self.metrics = OutboxMetrics()
+        self._chat_buckets = OrderedDict()    # {chat_id: TokenBucket}, LRU
+        self._queue = None
+        self._seq = itertools.count()
+        self._workers = []
+        self._holders = {}     # {chat_id: OutboxJob} - сообщение, которое сейчас "владеет" чатом
+        self._waiting = {}     # {chat_id: deque(OutboxJob)} - ожидающие своей очереди в чате, по порядку постановки
+        self._deferred = {}    # отложенные перепостановки {asyncio.TimerHandle: OutboxJob}
+
+    @property
+    def is_running(self) -> bool:
+        return bool(self._workers)
+
+    def start(self):
+        """Запускает воркеры отправки"""
+        if self.is_running:
+            return
+
+        self._queue = asyncio.PriorityQueue()
+        self._workers = [asyncio.create_task(self._work()) for _ in range(self.workers_count)]
+
+    async def stop(self, timeout: float = 10):
+        """Дожидается отправки поставленных сообщений (не дольше timeout) и останавливает воркеры"""
+        if not self.is_running:
+            return
+
+        try:
+            await asyncio.wait_for(self._drain(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Outbox stopped with {len(self._holders)} chats having undelivered messages")
+
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+        # недоставленные сообщения отменяем, чтобы никто не ждал их вечно
+        for handle in self._deferred:
+            handle.cancel()
+        undelivered = []
+        while not self._queue.empty():
+            undelivered.append(self._queue.get_nowait()[2])
+        undelivered += [job for queue in self._waiting.values() for job in queue]
+        undelivered += self._holders.values()
+        for job in undelivered:
+            job.future.cancel()
+
+        self._deferred.clear()
+        self._holders.clear()
+        self._waiting.clear()
+
+        logger.info(f"Outbox metrics: {self.metrics.snapshot()}")
+
+    async def send(self, bot: Bot, method: TelegramMethod, priority: Priority = Priority.TURN):
+        """Ставит метод в очередь и ждет результата. Без запущенных воркеров отправляет сразу"""
+        if not self.is_running:
+            return await bot(method)
+
+        future = asyncio.get_running_loop().create_future()
+        self._enqueue(OutboxJob(bot, method, priority, next(self._seq), future))
+        return await future
+
+    async def send_message(self, bot: Bot, chat_id: int, text: str,
+                           priority: Priority = Priority.TURN, **kwargs):
+        return await self.send(bot, SendMessage(chat_id=chat_id, text=text, **kwargs), priority)
+
+    async def send_photo(self, bot: Bot, chat_id: int, photo,
+                         priority: Priority = Priority.TURN, **kwargs):
+        return await self.send(bot, SendPhoto(chat_id=chat_id, photo=photo, **kwargs), priority)
+
+    def _enqueue(self, job: OutboxJob):
+        """Первое сообщение чата сразу идет в общую очередь, следующие ждут его в очереди чата"""
+        if job.chat_id in self._holders:
+            self._waiting.setdefault(job.chat_id, deque()).append(job)
+        else:
+            self._holders[job.chat_id] = job
+            self._put(job)
+
+    def _put(self, job: OutboxJob):
+        self._queue.put_nowait((job.priority, job.seq, job))
+
+    def _defer(self, job: OutboxJob, delay: float):
+        """Возвращает отправку в общую очередь через delay секунд (чат остается за ней)"""
+        loop = asyncio.get_running_loop()
+
+        def requeue():
+            self._deferred.pop(handle, None)
+            self._put(job)
+
+        handle = loop.call_later(delay, requeue)
+        self._deferred[handle] = job
+
+    def _release(self, chat_id: int):
+        """Передает чат следующему ожидающему сообщению"""
+        queue = self._waiting.get(chat_id)
+
+        if queue:
+            job = queue.popleft()
+            self._holders[chat_id] = job
+            self._put(job)
+        else:
+            self._holders.pop(chat_id, None)
+            self._waiting.pop(chat_id, None)
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+
+        if bucket is None:
+            bucket = self._chat_buckets[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+            if len(self._chat_buckets) > self.max_chats:
+                self._chat_buckets.popitem(last=False)
+        else:
+            self._chat_buckets.move_to_end(chat_id)
+
+        return bucket
+
+    async def _drain(self):
+        while self._holders:
+            await asyncio.sleep(0.05)
+
+    async def _work(self):
+        while True:
+            _, _, job = await self._queue.get()
+            try:
+                await self._deliver(job)
+            finally:
+                self._queue.task_done()
+
+    async def _deliver(self, job: OutboxJob):
+        chat_id = job.chat_id
+
+        if job.future.done():    # ожидающий отменил отправку
+            self._release(chat_id)
+            return
+
+        bucket = self._chat_bucket(chat_id)
+        if not bucket.try_acquire():
+            self.metrics.deferred += 1
+            self._defer(job, bucket.delay())
+            return
+
+        await self.global_bucket.acquire()
+        job.attempts += 1
+
+        try:
+            result = await job.bot(job.method)
+        except TelegramRetryAfter as error:
+            bucket.pause(error.retry_after)
+
+            if job.attempts <= self.max_retries:
+                self.metrics.retried += 1
+                logger.warning(f"Flood control for chat [chat_id:{chat_id}], retry in {error.retry_after} s")
+                self._defer(job, error.retry_after)
+                return
+
+            self.metrics.failed += 1
+            if not job.future.done():
+                job.future.set_exception(error)
+        except Exception as error:
+            self.metrics.failed += 1
+            if not job.future.done():
+                job.future.set_exception(error)
+        else:
+            wait = time.monotonic() - job.enqueued_at
+            self.metrics.sent += 1
+            self.metrics.total_wait += wait
+            self.metrics.max_wait = max(self.metrics.max_wait, wait)
+
+            if not job.future.done():
+                job.future.set_result(result)
+
+        self._release(chat_id)
+
+
+outbox = Outbox(
+    global_rate=OUTBOX_GLOBAL_RATE,
+    chat_rate=OUTBOX_CHAT_RATE,
+    chat_burst=OUTBOX_CHAT_BURST,
+    workers_count=OUTBOX_WORKERS,
+    max_retries=OUTBOX_MAX_RETRIES,
+    max_chats=OUTBOX_MAX_CHATS,
+)
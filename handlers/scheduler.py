@@ -0,0 +1,180 @@
+import heapq
+import asyncio
+import logging
+import itertools
+
+logger = logging.getLogger(__name__)
+
+
+class Timer:
+    """Запись таймера в куче планировщика"""
+    __slots__ = ('due', 'seq', 'chat_id', 'group', 'timer_id', 'callback', 'args', 'cancelled', 'task')
+
+    def __init__(self, due: float, seq: int, chat_id: int, group: str, timer_id: str, callback, args: tuple):
+        self.due = due
+        self.seq = seq
+        self.chat_id = chat_id
+        self.group = group
+        self.timer_id = timer_id
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+        self.task = None    # задача, в которой выполняется сработавший таймер
+
+    def __lt__(self, other: 'Timer') -> bool:
+        return (self.due, self.seq) < (other.due, other.seq)
+
+
+class TimerScheduler:
+    """Все таймеры бота в одной min-куче, которую обслуживает одна задача-диспетчер.
+
+    Таймер идентифицируется тройкой (chat_id, group, timer_id); группа отделяет
+    таймеры разных менеджеров в одном чате. Отмена помечает запись и удаляет ее
+    из индекса, а из кучи она выбрасывается при извлечении (или при чистке).
+    Сработавший таймер вызывает callback(timer, *args) в отдельной задаче.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._timers = {}    # {chat_id: {(group, timer_id): Timer}}
+        self._seq = itertools.count()
+        self._cancelled_in_heap = 0
+        self._wakeup = asyncio.Event()
+        self._dispatcher = None
+        self._running = set()
+        self._stopping = False
+
+    def add(self, chat_id: int, group: str, timer_id: str, delay: float, callback, *args) -> Timer:
+        """Добавляет таймер (существующий с тем же ключом отменяется)"""
+        self.cancel(chat_id, group, timer_id)
+
+        loop = asyncio.get_running_loop()
+        timer = Timer(loop.time() + delay, next(self._seq), chat_id, group, timer_id, callback, args)
+
+        self._timers.setdefault(chat_id, {})[(group, timer_id)] = timer
+        self._push(timer)
+        return timer
+
+    def reschedule(self, timer: Timer, delay: float) -> bool:
+        """Повторно взводит сработавший таймер, если его не отменили. Возвращает True при успехе"""
+        if timer.cancelled or self._timers.get(timer.chat_id, {}).get((timer.group, timer.timer_id)) is not timer:
+            return False
+
+        timer.due = asyncio.get_running_loop().time() + delay
+        timer.seq = next(self._seq)
+        timer.task = None
+        self._push(timer)
+        return True
+
+    def cancel(self, chat_id: int, group: str = None, timer_id: str = None):
+        """Отменяет таймер, все таймеры группы в чате (timer_id=None) или все таймеры чата (group=None)"""
+        chat_timers = self._timers.get(chat_id)
+        if not chat_timers:
+            return
+
+        if group is not None and timer_id is not None:
+            keys = [(group, timer_id)] if (group, timer_id) in chat_timers else []
+        else:
+            keys = [key for key in chat_timers if group is None or key[0] == group]
+
+        for key in keys:
+            self._cancel_timer(chat_timers.pop(key))
+
+        if not chat_timers:
+            del self._timers[chat_id]
+
+        self._compact()
+
+    def get(self, chat_id: int, group: str, timer_id: str) -> Timer | None:
+        return self._timers.get(chat_id, {}).get((group, timer_id))
+
+    def __len__(self) -> int:
+        return sum(len(chat_timers) for chat_timers in self._timers.values())
+
+    async def stop(self, timeout: float = 0):
+        """Останавливает диспетчер: новые таймеры больше не срабатывают.
+        Выполняющимся обработчикам дается timeout секунд, затем они отменяются"""
+        self._stopping = True
+
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            await asyncio.gather(self._dispatcher, return_exceptions=True)
+            self._dispatcher = None
+
+        running = list(self._running)
+        if running and timeout > 0:
+            await asyncio.wait(running, timeout=timeout)
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+
+    def _push(self, timer: Timer):
+        heapq.heappush(self._heap, timer)
+
+        if self._stopping:
+            return    # таймер сохранен в scheduled_jobs и будет восстановлен после перезапуска
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        self._wakeup.set()
+
+    def _cancel_timer(self, timer: Timer):
+        timer.cancelled = True
+
+        if timer.task is None:
+            self._cancelled_in_heap += 1
+        elif timer.task is not asyncio.current_task():
+            timer.task.cancel()
+
+    def _compact(self):
+        """Перестраивает кучу, если в ней накопилось много отмененных записей"""
+        if self._cancelled_in_heap > 64 and self._cancelled_in_heap > len(self._heap) // 2:
+            self._heap = [timer for timer in self._heap if not timer.cancelled]
+            heapq.heapify(self._heap)
+            self._cancelled_in_heap = 0
+
+    async def _dispatch(self):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            self._wakeup.clear()
+
+            while self._heap and self._heap[0].cancelled:
+                heapq.heappop(self._heap)
+                self._cancelled_in_heap -= 1
+
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+
+            timeout = self._heap[0].due - loop.time()
+            if timeout > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            timer = heapq.heappop(self._heap)
+            timer.task = asyncio.create_task(self._fire(timer))
+            self._running.add(timer.task)
+            timer.task.add_done_callback(self._running.discard)
+
+    async def _fire(self, timer: Timer):
+        try:
+            await timer.callback(timer, *timer.args)
+        except asyncio.CancelledError:
+            pass
+        except Exception as error:
+            logger.error(f"Error in timer [{timer.group}:{timer.timer_id}] of chat [chat_id:{timer.chat_id}]: {error}")
+        finally:
+            # таймер мог быть перевзведен (reschedule) или заменен новым с тем же ключом
+            chat_timers = self._timers.get(timer.chat_id)
+            key = (timer.group, timer.timer_id)
+
+            if chat_timers and chat_timers.get(key) is timer and timer.task is asyncio.current_task():
+                del chat_timers[key]
+                if not chat_timers:
+                    del self._timers[timer.chat_id]
+
+
+timer_scheduler = TimerScheduler()
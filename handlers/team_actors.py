@@ -0,0 +1,122 @@
+import asyncio
+import inspect
+import logging
+from functools import wraps
+from contextvars import ContextVar
+
+from db.help_db_commands import get_user_team
+
+logger = logging.getLogger(__name__)
+
+# команда, чей актор выполняет текущую задачу (для вложенных вызовов обработчиков)
+_current_team_id = ContextVar('current_team_id', default=None)
+
+
+class TeamActor:
+    """Очередь игровых действий одной команды и задача, выполняющая их строго по порядку"""
+
+    def __init__(self, team_id: int, registry: 'TeamActorRegistry'):
+        self.team_id = team_id
+        self.registry = registry
+        self.queue = asyncio.Queue()
+        self.pending = 0    # поставленные действия, результата которых еще ждут
+        self._wakeup = asyncio.Event()
+        self.task = asyncio.create_task(self._work())
+
+    def submit(self, func, *args, **kwargs) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self.pending += 1
+        future.add_done_callback(self._done)
+        self.queue.put_nowait((future, func, args, kwargs))
+        self._wakeup.set()
+        return future
+
+    def _done(self, future: asyncio.Future):
+        self.pending -= 1
+
+    async def _work(self):
+        _current_team_id.set(self.team_id)
+
+        while True:
+            if self.queue.empty():
+                # ждем сигнала о новом действии, а не queue.get(): wait_for может отменить get()
+                # уже после того, как он забрал действие из очереди, и действие потеряется
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.registry.idle_timeout)
+                except asyncio.TimeoutError:
+                    pass
+
+                # между проверкой и удалением нет await, новая задача сюда уже не попадет
+                if self.queue.empty() and not self.pending:
+                    self.registry._reap(self)
+                    return
+                continue
+
+            future, func, args, kwargs = self.queue.get_nowait()
+
+            if future.cancelled():
+                continue
+
+            try:
+                result = await func(*args, **kwargs)
+            except Exception as error:
+                if not future.cancelled():
+                    future.set_exception(error)
+            else:
+                if not future.cancelled():
+                    future.set_result(result)
+
+
+class TeamActorRegistry:
+    """Акторы активных команд: действия одной команды идут по очереди, разные команды - параллельно"""
+
+    def __init__(self, idle_timeout: float):
+        self.idle_timeout = idle_timeout
+        self.actors = {}  # {team_id: TeamActor}
+
+    async def run(self, team_id: int, func, *args, **kwargs):
+        """Выполняет корутинную функцию в акторе команды и возвращает ее результат"""
+        if team_id is None or _current_team_id.get() == team_id:
+            return await func(*args, **kwargs)
+
+        actor = self.actors.get(team_id)
+        if actor is None:
+            actor = self.actors[team_id] = TeamActor(team_id, self)
+
+        return await actor.submit(func, *args, **kwargs)
+
+    def serialized(self, handler):
+        """Декоратор обработчика: выполняет его в акторе команды пользователя из события"""
+        signature = inspect.signature(handler)
+        event_param = next(iter(signature.parameters))
+
+        @wraps(handler)
+        async def wrapper(*args, **kwargs):
+            event = signature.bind_partial(*args, **kwargs).arguments.get(event_param)
+            team_id = await get_user_team(user_id=event.from_user.id)
+
+            return await self.run(team_id, handler, *args, **kwargs)
+
+        return wrapper
+
+    async def stop(self):
+        """Дожидается выполнения уже поставленных действий и останавливает акторы"""
+        actors = list(self.actors.values())
+
+        # очередь FIFO: пустое действие завершится после всех поставленных ранее
+        await asyncio.gather(
+            *(actor.submit(asyncio.sleep, 0) for actor in actors),
+            return_exceptions=True
+        )
+
+        tasks = [actor.task for actor in actors]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.actors.clear()
+
+    def _reap(self, actor: TeamActor):
+        if self.actors.get(actor.team_id) is actor:
+            del self.actors[actor.team_id]
+            logger.debug(f"Actor of team [team_id:{actor.team_id}] is reaped after idle timeout")
@@ -0,0 +1,59 @@
+from aiogram import types
+from aiogram.dispatcher.event.handler import CallableObject
+
+
+class TextRouter:
+    """Разбор текстовых сообщений одним поиском по словарю вместо цепочки фильтров.
+
+    Команды ("/start payload" -> "start") и подписи кнопок сопоставляются
+    обработчикам через dict; если ничего не подошло - вызывается fallback.
+    Обработчику передаются только те аргументы из данных aiogram (state и
+    т.д.), которые есть в его сигнатуре, как при обычной регистрации.
+    """
+
+    def __init__(self, fallback=None):
+        self._commands = {}    # {команда без "/": CallableObject}
+        self._buttons = {}     # {подпись кнопки: CallableObject}
+        self._fallback = CallableObject(fallback) if fallback else None
+
+    def command(self, name: str, handler):
+        self._commands[name] = CallableObject(handler)
+
+    def button(self, label: str, handler):
+        self._buttons[label] = CallableObject(handler)
+
+    def resolve(self, text: str):
+        """Возвращает обработчик для текста или None"""
+        handler = self._lookup(text)
+        return handler.callback if handler else None
+
+    def routes(self) -> list[tuple[str, str, str]]:
+        """Таблица маршрутов [(вид, команда или кнопка, имя обработчика), ...]"""
+        table = [('command', f"/{name}", _handler_name(handler)) for name, handler in self._commands.items()]
+        table += [('button', label, _handler_name(handler)) for label, handler in self._buttons.items()]
+        if self._fallback:
+            table.append(('fallback', '*', _handler_name(self._fallback)))
+        return table
+
+    async def handle(self, message: types.Message, **data):
+        """Обработчик aiogram для всех текстовых сообщений"""
+        handler = self._lookup(message.text)
+        if handler is None:
+            handler = self._fallback
+        if handler is None:
+            return
+
+        return await handler.call(message, **data)
+
+    def _lookup(self, text: str) -> CallableObject | None:
+        if text.startswith('/'):
+            # "/cmd@BotName аргументы" -> "cmd"
+            parts = text[1:].split(maxsplit=1)
+            name = parts[0].split('@', maxsplit=1)[0] if parts else ''
+            return self._commands.get(name)
+
+        return self._buttons.get(text)
+
+
+def _handler_name(handler: CallableObject) -> str:
+    return getattr(handler.callback, '__qualname__', repr(handler.callback))
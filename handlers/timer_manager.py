@@ -1,133 +1,212 @@
-import os
-import asyncio
-from datetime import datetime, timedelta
-from aiogram import Bot, types
-from main import BASE_DIR
+import math
+import time
+from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter, TelegramBadRequest
+from config.config import COUNTDOWN_REFRESH_STEPS, COUNTDOWN_EDITS_PER_SECOND, SCHEDULED_JOB_MAX_OVERDUE
+from help.token_bucket import TokenBucket
+from handlers.scheduler import TimerScheduler, Timer, timer_scheduler
+from handlers.outbox import outbox, Priority
+from handlers.media import send_media_photo
+from db.help_db_commands import (
+    save_scheduled_job, delete_scheduled_jobs,
+    delete_stale_scheduled_jobs, get_scheduled_jobs
+)
+
+# менеджеры таймеров по виду задачи в scheduled_jobs (для восстановления после перезапуска)
+_job_managers = {}
+
+
+async def restore_timers(bot: Bot, owns_chat=None):
+    """Перевзводит сохраненные таймеры после перезапуска, просроченные срабатывают сразу.
+    Задачи, просроченные больше чем на SCHEDULED_JOB_MAX_OVERDUE секунд, удаляются.
+    owns_chat(chat_id) - async-фильтр чатов воркера в режиме cluster"""
+    not_before = time.time() - SCHEDULED_JOB_MAX_OVERDUE
+
+    stale_count = await delete_stale_scheduled_jobs(not_before)
+    jobs = await get_scheduled_jobs(not_before)
+
+    if owns_chat is not None:
+        jobs = [job for job in jobs if await owns_chat(job['chat_id'])]
+
+    for job in jobs:
+        manager = _job_managers.get(job['kind'])
+        if manager is None:
+            print(f"Неизвестный вид таймера: {job['kind']}")
+            continue
+
+        manager._restore(bot, job)
+
+    print(f"✅ Восстановлено таймеров: {len(jobs)}, удалено устаревших: {stale_count}")
+
 
 class TimerManager:
-    def __init__(self):
-        self.timers = {}  # {chat_id: {timer_id: task}}
-    
+    """Таймеры подсказок к вопросу (поверх общего планировщика, с сохранением в scheduled_jobs)"""
+    group = 'clue'
+
+    def __init__(self, scheduler: TimerScheduler = timer_scheduler):
+        self.scheduler = scheduler
+        _job_managers[self.group] = self
+
     async def add_timer(self, chat_id: int, bot: Bot, delay: int, message: str, media_path: str, timer_id: str):
         """Добавление нового таймера"""
-        await self.cancel_timer(chat_id, timer_id)
-        
-        task = asyncio.create_task(
-            self._send_timed_message(chat_id, bot, delay, message, media_path, timer_id)
+        due_at = time.time() + delay * 60    # минуты
+
+        self.scheduler.add(
+            chat_id, self.group, timer_id, delay * 60,
+            self._send_timed_message, bot, message, media_path, due_at
+        )
+        await save_scheduled_job(
+            chat_id, self.group, timer_id, due_at,
+            {'message': message, 'media_path': media_path}
         )
-        
-        if chat_id not in self.timers:
-            self.timers[chat_id] = {}
-        self.timers[chat_id][timer_id] = task
 
     async def cancel_timer(self, chat_id: int, timer_id: str = None):
-        """Отмена таймеров"""
-        if chat_id not in self.timers:
-            return
-        
-        if timer_id is None:
-            # Отмена всех таймеров
-            for task in self.timers[chat_id].values():
-                task.cancel()
-            self.timers[chat_id].clear()
-        else:
-            # Отмена конкретного таймера
-            if timer_id in self.timers[chat_id]:
-                self.timers[chat_id][timer_id].cancel()
-                del self.timers[chat_id][timer_id]
-    
-    async def _send_timed_message(self, chat_id: int, bot: Bot, delay: int, message: str, media_path: str, timer_id: str):
-        try:
-            await asyncio.sleep(delay * 60)    # минуты
+        """Отмена таймеров (всех таймеров чата, если timer_id не указан)"""
+        self.scheduler.cancel(chat_id, self.group, timer_id)
+        await delete_scheduled_jobs(chat_id, self.group, timer_id)
+
+    def _restore(self, bot: Bot, job: dict):
+        payload = job['payload']
+
+        self.scheduler.add(
+            job['chat_id'], self.group, job['timer_id'], max(job['due_at'] - time.time(), 0),
+            self._send_timed_message, bot, payload['message'], payload['media_path'], job['due_at']
+        )
+
+    async def _send_timed_message(self, timer: Timer, bot: Bot, message: str, media_path: str, due_at: float):
+        chat_id = timer.chat_id
 
+        try:
             if media_path:
-                path_to_question_photo = os.path.join(BASE_DIR, media_path)
-                photo = types.FSInputFile(path_to_question_photo)
-                await bot.send_photo(chat_id, photo)
+                await send_media_photo(bot, chat_id, media_path, priority=Priority.NOTICE)
 
-            await bot.send_message(chat_id, message)
-        except (asyncio.CancelledError | Exception):
+            await outbox.send_message(bot, chat_id, message, priority=Priority.NOTICE)
+        except Exception:
             pass
-        finally:
-            if chat_id in self.timers and timer_id in self.timers[chat_id]:
-                del self.timers[chat_id][timer_id]
+
+        await delete_scheduled_jobs(chat_id, self.group, timer.timer_id, due_at)
+
+
+class Countdown:
+    """Состояние обновляемого сообщения с таймером вопроса"""
+    __slots__ = ('message_id', 'end_time', 'final_message', 'last_text')
+
+    def __init__(self, message_id: int, end_time: float, final_message: str, last_text: str):
+        self.message_id = message_id
+        self.end_time = end_time    # unix-время окончания
+        self.final_message = final_message
+        self.last_text = last_text    # текст, который сейчас виден в чате
+
+
+# общий на все чаты бюджет правок сообщений-таймеров
+countdown_edit_budget = TokenBucket(COUNTDOWN_EDITS_PER_SECOND)
 
 
 class QuestionTimerManager:
-    def __init__(self):
-        self.timers = {}  # {chat_id: {timer_id: (task, message_id, end_time)}}
-    
+    """Таймер вопроса с обновляемым сообщением (поверх общего планировщика).
+
+    Сообщение обновляется не каждую секунду, а по шагам COUNTDOWN_REFRESH_STEPS:
+    редко в начале и посекундно в конце. Правки без изменения текста не
+    отправляются, промежуточные правки сверх общего бюджета пропускаются.
+    """
+    group = 'question'
+
+    def __init__(self, scheduler: TimerScheduler = timer_scheduler,
+                 budget: TokenBucket = countdown_edit_budget):
+        self.scheduler = scheduler
+        self.budget = budget
+        _job_managers[self.group] = self
+
     async def add_timer(self, chat_id: int, bot: Bot, delay: int, message: str, timer_id: str):
         """Добавление нового таймера с обновляемым сообщением"""
         await self.cancel_timer(chat_id, timer_id)
-        
-        end_time = datetime.now() + timedelta(minutes=delay)
+
+        end_time = time.time() + delay * 60
         initial_text = f"⏳ Таймер: {delay} мин.\nОсталось: {delay}:00"
-        
+
         # Отправляем начальное сообщение
-        msg = await bot.send_message(chat_id, initial_text)
-        
-        # Создаем задачу для обновления сообщения
-        task = asyncio.create_task(
-            self._update_timer_message(chat_id, bot, msg.message_id, end_time, timer_id, message)
+        msg = await outbox.send_message(bot, chat_id, initial_text)
+        countdown = Countdown(msg.message_id, end_time, message, initial_text)
+
+        self.scheduler.add(
+            chat_id, self.group, timer_id, _next_refresh_delay(delay * 60),
+            self._update_timer_message, bot, countdown
         )
-        
-        if chat_id not in self.timers:
-            self.timers[chat_id] = {}
-        self.timers[chat_id][timer_id] = (task, msg.message_id, end_time)
-    
-    async def _update_timer_message(self, chat_id: int, bot: Bot, message_id: int, 
-                                 end_time: datetime, timer_id: str, final_message: str):
+        # сохраняем только срабатывание в конце, промежуточные обновления не нужны
+        await save_scheduled_job(
+            chat_id, self.group, timer_id, end_time,
+            {'message_id': msg.message_id, 'final_message': message}
+        )
+
+    def _restore(self, bot: Bot, job: dict):
+        payload = job['payload']
+        countdown = Countdown(
+            payload['message_id'], job['due_at'],
+            payload['final_message'], last_text=None
+        )
+
+        # сразу обновляем сообщение: в чате осталось время на момент остановки бота
+        self.scheduler.add(
+            job['chat_id'], self.group, job['timer_id'], 0,
+            self._update_timer_message, bot, countdown
+        )
+
+    async def _update_timer_message(self, timer: Timer, bot: Bot, countdown: Countdown):
         """Обновление сообщения с таймером"""
-        while True:
+        remaining = countdown.end_time - time.time()
+        is_final = remaining <= 0
+
+        if is_final:
+            text = f"⏰ {countdown.final_message}"
+        else:
+            minutes, seconds = divmod(round(remaining), 60)
+            text = f"⏳ Таймер \nОсталось: {minutes}:{seconds:02d}"
+
+        if text != countdown.last_text:
+            if is_final:
+                await self.budget.acquire()
+            elif not self.budget.try_acquire():
+                # бюджет исчерпан - пропускаем промежуточное обновление
+                self.scheduler.reschedule(timer, _next_refresh_delay(remaining))
+                return
+
             try:
-                now = datetime.now()
-                remaining = end_time - now
-                
-                if remaining.total_seconds() <= 0:
-                    await bot.edit_message_text(
-                        f"⏰ {final_message}",
-                        chat_id=chat_id,
-                        message_id=message_id
-                    )
-                    self._cleanup_timer(chat_id, timer_id)
-                    break
-                
-                # Форматируем оставшееся время
-                total_seconds = int(remaining.total_seconds())
-                minutes, seconds = divmod(total_seconds, 60)
-                time_str = f"{minutes}:{seconds:02d}"
-                
-                await bot.edit_message_text(
-                    f"⏳ Таймер \nОсталось: {time_str}",
-                    chat_id=chat_id,
-                    message_id=message_id
-                )
-                
-                await asyncio.sleep(1)
-                
+                await bot.edit_message_text(text, chat_id=timer.chat_id, message_id=countdown.message_id)
+                countdown.last_text = text
+            except TelegramRetryAfter as e:
+                self.scheduler.reschedule(timer, e.retry_after)
+                return
+            except TelegramBadRequest as e:
+                if 'message is not modified' in e.message:
+                    countdown.last_text = text
+                else:
+                    print(f"Ошибка в таймере: {e}")
+                    is_final = True    # сообщение недоступно - таймер останавливается
             except Exception as e:
                 print(f"Ошибка в таймере: {e}")
-                self._cleanup_timer(chat_id, timer_id)
-                break
-    
-    def _cleanup_timer(self, chat_id: int, timer_id: str):
-        """Очистка таймера из словаря"""
-        if chat_id in self.timers and timer_id in self.timers[chat_id]:
-            del self.timers[chat_id][timer_id]
-    
-    async def cancel_timer(self, chat_id: int, timer_id: str = None):
-        """Отмена таймеров"""
-        if chat_id not in self.timers:
-            return
-        
-        if timer_id is None:
-            # Отмена всех таймеров в чате
-            for timer_data in self.timers[chat_id].values():
-                timer_data[0].cancel()  # task
-            self.timers[chat_id].clear()
+                is_final = True
+
+        if is_final:
+            await delete_scheduled_jobs(timer.chat_id, self.group, timer.timer_id, countdown.end_time)
         else:
-            # Отмена конкретного таймера
-            if timer_id in self.timers[chat_id]:
-                self.timers[chat_id][timer_id][0].cancel()
-                self._cleanup_timer(chat_id, timer_id)
+            self.scheduler.reschedule(timer, _next_refresh_delay(remaining))
+
+    async def cancel_timer(self, chat_id: int, timer_id: str = None):
+        """Отмена таймеров (вместе с сохраненными задачами, иначе они вернутся после перезапуска)"""
+        self.scheduler.cancel(chat_id, self.group, timer_id)
+        await delete_scheduled_jobs(chat_id, self.group, timer_id)
+
+
+def _next_refresh_delay(remaining: float) -> float:
+    """Через сколько секунд обновить таймер, чтобы попасть на ближайшую "круглую" отметку шага"""
+    for threshold, step in COUNTDOWN_REFRESH_STEPS:
+        if remaining > threshold:
+            # полсекунды допуска: таймер, сработавший чуть раньше отметки, не перевзводится на нее же
+            target = max(threshold, (math.ceil((remaining - 0.5) / step) - 1) * step)
+            return remaining - target
+
+    return max(remaining, 0)
+
+
+timer_manager = TimerManager()
+question_timer_manager = QuestionTimerManager()
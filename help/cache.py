@@ -0,0 +1,62 @@
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Ограниченный по размеру LRU-словарь, записи которого живут ttl секунд"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()    # {key: (expires_at, value)}, от старых к новым
+
+    def get(self, key, default=None):
+        record = self._data.get(key)
+        if record is None:
+            return default
+
+        if record[0] <= time.monotonic():
+            del self._data[key]
+            return default
+
+        self._data.move_to_end(key)
+        return record[1]
+
+    def set(self, key, value=True):
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        self._prune()
+
+    def add(self, key) -> bool:
+        """Запоминает ключ. Возвращает False, если он уже был (и еще не истек)"""
+        if key in self:
+            return False
+
+        self.set(key)
+        return True
+
+    def pop(self, key, default=None):
+        record = self._data.pop(key, None)
+        return default if record is None or record[0] <= time.monotonic() else record[1]
+
+    def clear(self):
+        self._data.clear()
+
+    def __contains__(self, key) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _prune(self):
+        now = time.monotonic()
+
+        # в начале самые давно использованные записи: выбрасываем истекшие и лишние
+        while self._data:
+            key, (expires_at, _) = next(iter(self._data.items()))
+            if expires_at > now and len(self._data) <= self.maxsize:
+                break
+            del self._data[key]
+
+
+_MISSING = object()
@@ -0,0 +1,130 @@
+import os
+import sys
+import asyncio
+import hashlib
+import logging
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:    # Pillow не установлен - картинки отправляются как есть
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# версия алгоритма входит в адрес файла: при изменении обработки кэш пересобирается
+PIPELINE_VERSION = 2
+
+
+def is_available() -> bool:
+    return Image is not None
+
+
+def optimize_image(source: str, cache_dir: str, max_side: int, quality: int) -> str | None:
+    """Уменьшает и пережимает картинку в JPEG. Выполняется в процессе пула.
+
+    Имя результата - хэш содержимого исходника и параметров обработки, поэтому
+    повторный запуск не пересчитывает готовые файлы. Возвращает путь к
+    оптимизированному файлу или None, если он не меньше исходного.
+    """
+    with open(source, 'rb') as file:
+        content = file.read()
+
+    target = _target_path(content, cache_dir, max_side, quality)
+
+    if os.path.exists(target):
+        return target
+    if os.path.exists(target + '.skip'):
+        return None
+
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)    # телефонные фото: поворот из EXIF
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+
+        if image.mode in ('RGBA', 'LA') or 'transparency' in image.info:
+            # в JPEG нет прозрачности: прозрачные места (карты в PNG) делаем белыми, а не черными
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+        elif image.mode != 'RGB':
+            image = image.convert('RGB')
+
+        # пишем во временный файл, чтобы параллельный запуск не увидел недописанный
+        temp_path = f"{target}.{os.getpid()}.tmp"
+        image.save(temp_path, 'JPEG', quality=quality, optimize=True, progressive=True)
+
+    if os.path.getsize(temp_path) >= len(content):
+        os.remove(temp_path)
+        open(target + '.skip', 'w').close()    # исходник уже оптимален, запоминаем это
+        return None
+
+    os.replace(temp_path, target)
+    return target
+
+
+def find_optimized_images(sources: list[str], cache_dir: str, max_side: int, quality: int) -> dict[str, str]:
+    """Только ищет готовые оптимизированные варианты, ничего не пересчитывая.
+    Возвращает {исходный путь: путь к оптимизированному файлу}"""
+    variants = {}
+    for source in sources:
+        try:
+            with open(source, 'rb') as file:
+                target = _target_path(file.read(), cache_dir, max_side, quality)
+        except OSError as error:
+            logger.warning(f"Image lookup failed for {source}: {error}")
+            continue
+
+        if os.path.exists(target):
+            variants[source] = target
+
+    return variants
+
+
+async def optimize_images(sources: list[str], cache_dir: str, max_side: int, quality: int,
+                          workers_count: int = None) -> dict[str, str]:
+    """Оптимизирует картинки параллельно на всех ядрах.
+    Возвращает {исходный путь: путь к оптимизированному файлу} для тех, что удалось уменьшить"""
+    if not is_available():
+        logger.warning("Pillow is not installed, images are sent without optimization")
+        return {}
+
+    os.makedirs(cache_dir, exist_ok=True)
+    loop = asyncio.get_running_loop()
+
+    with ProcessPoolExecutor(max_workers=workers_count) as pool:
+        results = await asyncio.gather(
+            *(loop.run_in_executor(pool, optimize_image, source, cache_dir, max_side, quality)
+              for source in sources),
+            return_exceptions=True
+        )
+
+    variants = {}
+    for source, result in zip(sources, results):
+        if isinstance(result, Exception):
+            logger.warning(f"Image optimization failed for {source}: {result}")
+        elif result is not None:
+            variants[source] = result
+
+    return variants
+
+
+def _target_path(content: bytes, cache_dir: str, max_side: int, quality: int) -> str:
+    digest = hashlib.sha256(content)
+    digest.update(f"{PIPELINE_VERSION}:{max_side}:{quality}".encode())
+    return os.path.join(cache_dir, f"{digest.hexdigest()}.jpg")
+
+
+if __name__ == '__main__':
+    # офлайн-обработка: python -m help.image_optimizer images/*.jpg
+    from config.config import MEDIA_CACHE_DIR, MEDIA_MAX_SIDE, MEDIA_JPEG_QUALITY
+
+    logging.basicConfig(level=logging.INFO)
+    variants = asyncio.run(optimize_images(sys.argv[1:], MEDIA_CACHE_DIR, MEDIA_MAX_SIDE, MEDIA_JPEG_QUALITY))
+
+    for source in sys.argv[1:]:
+        target = variants.get(source)
+        if target:
+            print(f"{source}: {os.path.getsize(source)} -> {os.path.getsize(target)} байт ({target})")
+        else:
+            print(f"{source}: без изменений")
@@ -0,0 +1,100 @@
+import time
+import signal
+import asyncio
+import inspect
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Hook:
+    """Этап жизненного цикла: что сделать при запуске и при остановке"""
+    __slots__ = ('name', 'start', 'stop', 'timeout')
+
+    def __init__(self, name: str, start=None, stop=None, timeout: float = None):
+        self.name = name
+        self.start = start
+        self.stop = stop
+        self.timeout = timeout    # сколько ждать остановки этапа, None - без ограничения
+
+
+class Lifecycle:
+    """Упорядоченный запуск и остановка частей бота.
+
+    Этапы запускаются в порядке добавления, а останавливаются в обратном -
+    и только те, что успели запуститься. Ошибка или таймаут при остановке
+    одного этапа не мешают остановить остальные: сброс данных в БД и
+    закрытие соединений выполняются всегда. SIGTERM/SIGINT переводят бот
+    в режим остановки (см. wait_stop), повторный сигнал завершает процесс сразу.
+    """
+
+    def __init__(self):
+        self._hooks = []
+        self._started = []
+        self._stop_requested = asyncio.Event()
+
+    @property
+    def stop_requested(self) -> bool:
+        return self._stop_requested.is_set()
+
+    def add(self, name: str, start=None, stop=None, timeout: float = None):
+        """Добавляет этап. start и stop - функции без аргументов, обычные или async"""
+        self._hooks.append(Hook(name, start, stop, timeout))
+
+    async def start(self):
+        for hook in self._hooks:
+            if hook.start is not None:
+                await _call(hook.start)
+            self._started.append(hook)
+
+    async def stop(self):
+        started_at = time.monotonic()
+
+        while self._started:
+            hook = self._started.pop()
+            if hook.stop is None:
+                continue
+
+            hook_started_at = time.monotonic()
+            try:
+                await asyncio.wait_for(_call(hook.stop), hook.timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"Shutdown step [{hook.name}] timed out after {hook.timeout} s")
+            except Exception:
+                logger.exception(f"Shutdown step [{hook.name}] failed")
+            else:
+                logger.info(f"Shutdown step [{hook.name}] done in {time.monotonic() - hook_started_at:.2f} s")
+
+        logger.info(f"Shutdown finished in {time.monotonic() - started_at:.2f} s")
+
+    def request_stop(self, reason: str = None):
+        if not self.stop_requested:
+            logger.info(f"Stop requested{f' ({reason})' if reason else ''}, draining in-flight work")
+        self._stop_requested.set()
+
+    def install_signal_handlers(self):
+        """SIGTERM (docker stop) и SIGINT (Ctrl+C) запрашивают плавную остановку"""
+        loop = asyncio.get_running_loop()
+
+        def on_signal(signum: int):
+            # второй сигнал обрабатывается по умолчанию: процесс завершается сразу
+            for sig in (signal.SIGTERM, signal.SIGINT):
+                loop.remove_signal_handler(sig)
+            self.request_stop(signal.Signals(signum).name)
+
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, on_signal, sig)
+
+    async def wait_stop(self, *tasks: asyncio.Task):
+        """Ждет запроса остановки или завершения одной из задач (например, polling упал с ошибкой)"""
+        waiter = asyncio.create_task(self._stop_requested.wait())
+        try:
+            await asyncio.wait({waiter, *tasks}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            waiter.cancel()
+
+
+async def _call(func):
+    result = func()
+    if inspect.isawaitable(result):
+        await result
@@ -1,20 +1,21 @@
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, ReplyKeyboardMarkup, KeyboardButton
+from texts import buttons
 
 start_markup = InlineKeyboardMarkup(inline_keyboard=[
-    [InlineKeyboardButton(text="Зарегистрироваться как капитан", callback_data="sign_up_as_captain")],
-    [InlineKeyboardButton(text="Зарегистрироваться как участник", callback_data="sign_up_as_player")],
+    [InlineKeyboardButton(text=buttons.SIGN_UP_AS_CAPTAIN, callback_data="sign_up_as_captain")],
+    [InlineKeyboardButton(text=buttons.SIGN_UP_AS_PLAYER, callback_data="sign_up_as_player")],
 ])
 
 default_user_markup = ReplyKeyboardMarkup(keyboard=[
-    [KeyboardButton(text="Моя локация"), KeyboardButton(text="Расстановка игроков"), KeyboardButton(text="Получить текст кричалки")],
+    [KeyboardButton(text=buttons.MY_LOCATION), KeyboardButton(text=buttons.PLAYERS_LOCATIONS), KeyboardButton(text=buttons.GET_LYRICS)],
 ], resize_keyboard=True)
 
 captain_user_markup = ReplyKeyboardMarkup(keyboard=[
-    [KeyboardButton(text="Моя локация"), KeyboardButton(text="Расстановка игроков"), KeyboardButton(text="Получить текст кричалки")],
-    [KeyboardButton(text="Установить кричалку"), KeyboardButton(text="Поменять расстановку"), KeyboardButton(text="Начать квест")],
-    [KeyboardButton(text="Начать квест в тестовом режиме")]
+    [KeyboardButton(text=buttons.MY_LOCATION), KeyboardButton(text=buttons.PLAYERS_LOCATIONS), KeyboardButton(text=buttons.GET_LYRICS)],
+    [KeyboardButton(text=buttons.SET_LYRICS), KeyboardButton(text=buttons.SET_LOCATION), KeyboardButton(text=buttons.START_QUEST)],
+    [KeyboardButton(text=buttons.START_QUEST_TEST)]
 ], resize_keyboard=True)
 
 accept_state_markup = InlineKeyboardMarkup(inline_keyboard=[
-    [InlineKeyboardButton(text="Принять ход", callback_data="accept_state")]
-])
\ No newline at end of file
+    [InlineKeyboardButton(text=buttons.ACCEPT_STATE, callback_data="accept_state")]
+])
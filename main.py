@@ -1,96 +1,342 @@
 import os
 import logging
 import asyncio
+from aiohttp import web
 from aiogram import F
 from aiogram import Dispatcher, Bot
-from aiogram.filters import Command, StateFilter
+from aiogram.filters import StateFilter
 from aiogram.fsm.storage.memory import MemoryStorage
-from db.database import init_db
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler
+from db.database import init_db, open_db_pool, close_db_pool
+from db.content_cache import content_cache
+from db.media_cache import media_cache
+from db.team_state_store import team_state_store
+from db.game_journal import game_journal
+from db.question_allocator import question_allocator
+from handlers.scheduler import timer_scheduler
+from handlers.outbox import outbox
 
 import handlers.commands as handlers
-from config.config import BOT_TOKEN, DEBUG_MODE
+from config.config import (BOT_TOKEN, DEBUG_MODE, RUN_MODE, WEBHOOK_URL, WEBHOOK_PATH,
+                           WEBHOOK_HOST, WEBHOOK_PORT, WEBHOOK_SECRET,
+                           DEDUP_MAX_SIZE, DEDUP_UPDATE_TTL, DEDUP_CALLBACK_TTL,
+                           RATE_LIMITS, RATE_LIMIT_IDLE_TIMEOUT, RATE_LIMIT_MAX_KEYS,
+                           FSM_STORAGE, FSM_FLUSH_INTERVAL, FSM_STATE_TTL,
+                           CLUSTER_WORKERS, CLUSTER_TEAM_CACHE_TTL, USER_TEAM_CACHE_SIZE,
+                           OUTBOX_GLOBAL_RATE, COUNTDOWN_EDITS_PER_SECOND, SHUTDOWN_DRAIN_TIMEOUT)
 from handlers.messages import invalid_command
+from handlers.text_router import TextRouter
+from handlers.middlewares import InFlightMiddleware, DeduplicationMiddleware, ThrottlingMiddleware
+from help.lifecycle import Lifecycle
+from texts import buttons
 from fsm.quest_logic import QuestStates, WaitForPassword
+from fsm.sqlite_storage import SQLiteStorage
+from cluster.sharding import Shard, ShardRouter
+from cluster.workers import WorkerPool, consume_updates
+from cluster.front import create_front_app
 
 BASE_DIR = os.path.dirname(__file__)
 
-storage = MemoryStorage()
+if FSM_STORAGE == 'sqlite':
+    storage = SQLiteStorage(flush_interval=FSM_FLUSH_INTERVAL, ttl=FSM_STATE_TTL)
+else:
+    storage = MemoryStorage()
 bot = Bot(token=BOT_TOKEN)
 dp = Dispatcher(storage=storage)
 logger = logging.getLogger(__name__)
+text_router = TextRouter(fallback=invalid_command)
+throttling = ThrottlingMiddleware(RATE_LIMITS, RATE_LIMIT_IDLE_TIMEOUT, RATE_LIMIT_MAX_KEYS)
+in_flight = InFlightMiddleware()
+lifecycle = Lifecycle()
 
-def load_text_commands(dp: Dispatcher):
-    dp.message.register(handlers.cmd_my_location, F.text == "Моя локация")
-    dp.message.register(handlers.cmd_players_locations, F.text == "Расстановка игроков")
-    dp.message.register(handlers.cmd_get_team_lyrics, F.text == "Получить текст кричалки")
-    dp.message.register(handlers.cmd_set_team_lyrics, F.text == "Установить кричалку")
-    dp.message.register(handlers.cmd_set_location, F.text == "Поменять расстановку")
-    dp.message.register(handlers.start_quest, F.text == "Начать квест")
-    dp.message.register(handlers.start_quest_in_test_mode, F.text == "Начать квест в тестовом режиме")
+def load_text_commands(router: TextRouter):
+    router.button(buttons.MY_LOCATION, handlers.cmd_my_location)
+    router.button(buttons.PLAYERS_LOCATIONS, handlers.cmd_players_locations)
+    router.button(buttons.GET_LYRICS, handlers.cmd_get_team_lyrics)
+    router.button(buttons.SET_LYRICS, handlers.cmd_set_team_lyrics)
+    router.button(buttons.SET_LOCATION, handlers.cmd_set_location)
+    router.button(buttons.START_QUEST, handlers.start_quest)
+    router.button(buttons.START_QUEST_TEST, handlers.start_quest_in_test_mode)
 
+def load_commands(router: TextRouter):
+    router.command("start", handlers.handle_start)
+    router.command("begin", handlers.start_quest)
+    router.command("create_team", handlers.cmd_create_team)
+    router.command("team_status", handlers.cmd_team_status)
+    router.command("help", handlers.cmd_help)
+    router.command("accept_state", handlers.cmd_accept_state)
+    router.command("become_captain", handlers.request_captain_role)
+    router.command("become_admin", handlers.request_admin_role)
+    router.command("mylocation", handlers.cmd_my_location)
+    router.command("players_locations", handlers.cmd_players_locations)
+    router.command("set_lyrics", handlers.cmd_set_team_lyrics)
+    router.command("get_lyrics", handlers.cmd_get_team_lyrics)
+    router.command("setlocation", handlers.cmd_set_location)
+    router.command("delete_me_from_system", handlers.cmd_delete_me_from_system)
 
 
+def register_middlewares(dp: Dispatcher):
+    # первым: учет обновлений в обработке для плавной остановки
+    dp.update.outer_middleware(in_flight)
+
+    # повторные обновления и нажатия кнопок отбрасываются до обработчиков
+    dp.update.outer_middleware(DeduplicationMiddleware(
+        maxsize=DEDUP_MAX_SIZE,
+        update_ttl=DEDUP_UPDATE_TTL,
+        callback_ttl=DEDUP_CALLBACK_TTL,
+    ))
+
+    # лимиты частоты запросов игроков и команд (по флагу обработчика rate_limit)
+    dp.message.middleware(throttling)
+    dp.callback_query.middleware(throttling)
+
 def register_handlers(dp: Dispatcher):
+    # обработчики состояний идут первыми: ответ на вопрос не должен попасть в команды
     dp.message.register(handlers.process_captain_password, StateFilter(WaitForPassword.waiting_for_captain_password))
     dp.message.register(handlers.process_admin_password, StateFilter(WaitForPassword.waiting_for_admin_password))
-    dp.message.register(handlers.process_answer, StateFilter(QuestStates.waiting_for_answer))
+    dp.message.register(handlers.process_answer, StateFilter(QuestStates.waiting_for_answer), flags={'rate_limit': 'answer'})
     dp.callback_query.register(handlers.confirm_arrival, StateFilter(QuestStates.waiting_for_location_confirmation), F.data == 'arrived')
     dp.callback_query.register(handlers.handle_player_location_change, F.data.startswith("setloc_"))
     dp.callback_query.register(handlers.handle_sign_up_as_captain, F.data == "sign_up_as_captain")
     dp.callback_query.register(handlers.handle_sign_up_as_player, F.data == "sign_up_as_player")
     dp.callback_query.register(handlers.handle_accept_state, F.data == "accept_state")
     dp.message.register(handlers.handle_location_reply, F.reply_to_message & F.text.isdigit())
-    dp.message.register(handlers.handle_start, Command("start"))
-    dp.message.register(handlers.start_quest, Command("begin"))
-    dp.message.register(handlers.cmd_create_team, Command("create_team"))
-    dp.message.register(handlers.cmd_team_status, Command("team_status"))
-    dp.message.register(handlers.cmd_help, Command("help"))
-    dp.message.register(handlers.cmd_accept_state, Command("accept_state"))
-    dp.message.register(handlers.request_captain_role, Command("become_captain"))
-    dp.message.register(handlers.request_admin_role, Command("become_admin"))
-    dp.message.register(handlers.cmd_my_location, Command("mylocation"))
-    dp.message.register(handlers.cmd_players_locations, Command("players_locations"))
-    dp.message.register(handlers.cmd_set_team_lyrics, Command("set_lyrics"))
-    dp.message.register(handlers.cmd_get_team_lyrics, Command("get_lyrics"))
-    dp.message.register(handlers.cmd_set_location, Command("setlocation"))
-    dp.message.register(handlers.cmd_delete_me_from_system, Command("delete_me_from_system"))
-    
-    load_text_commands(dp)
-
-    dp.message.register(invalid_command, F.text)
-
-async def on_startup():
-    register_handlers(dp=dp)
 
+    # команды и кнопки - одним поиском по словарю, остальное уходит в invalid_command
+    load_commands(text_router)
+    load_text_commands(text_router)
+
+    dp.message.register(text_router.handle, F.text)
+
+def setup_logging():
     # подключение логов
     logging.basicConfig(
         level=logging.INFO,
-        format='%(asctime)s - %(levelname)s - %(message)s',
+        format='%(asctime)s - %(processName)s - %(levelname)s - %(message)s',
         handlers=[
             logging.FileHandler('mainapp.log'),  # Log to file
             logging.StreamHandler()              # Also print to console
         ]
         )
 
-    # Инициализация БД при старте
+async def load_fixtures():
+    from db.fixtures import load_fixtures_from_json
+    try:
+        await load_fixtures_from_json()
+    except Exception as e:
+        print(f"⚠️ Ошибка загрузки фикстур: {e}")
+
+def register_lifecycle(lifecycle: Lifecycle, shard: Shard = None):
+    """Этапы запуска по порядку. Остановка идет в обратном порядке: сначала дожидаемся
+    обработчиков, таймеров и отправки сообщений, потом сбрасываем данные в БД и закрываем соединения"""
+    from handlers.timer_manager import restore_timers, countdown_edit_budget
+    from handlers.media import prepare_media, stop_media_prewarm
+
+    async def open_database():
+        # Инициализация БД при старте
+        await init_db()
+        await open_db_pool()
+
+    def share_rate_limits():
+        # лимиты Telegram на весь бот делятся между воркерами поровну
+        outbox.global_bucket.set_rate(OUTBOX_GLOBAL_RATE / shard.count)
+        countdown_edit_budget.set_rate(COUNTDOWN_EDITS_PER_SECOND / shard.count)
+
+    async def load_content():
+        # статический контент квеста держим в памяти
+        await content_cache.load()
+        await media_cache.load()
+
+    async def start_question_allocator():
+        if shard is not None:
+            question_allocator.set_shard(shard.index, shard.count)
+        await question_allocator.load(content_cache.get_all_location_questions())
+        question_allocator.start()
+
+    lifecycle.add('bot session', stop=bot.session.close)
+    lifecycle.add('database', start=open_database, stop=close_db_pool)
+
+    # FSM-состояния игроков, сохраненные до перезапуска (в режиме cluster - только своих игроков)
+    if isinstance(storage, SQLiteStorage):
+        lifecycle.add(
+            'fsm storage',
+            start=lambda: storage.open(owns_user=shard.owns_chat if shard else None),
+            stop=storage.close,
+        )
+
+    # в режиме cluster фикстуры загружает фронт-процесс до запуска воркеров
+    if DEBUG_MODE and shard is None:
+        lifecycle.add('fixtures', start=load_fixtures)
+
+    lifecycle.add('content', start=load_content)
+
+    # колоды вопросов локаций и позиции раздачи, сохраненные до перезапуска
+    lifecycle.add('question pools', start=start_question_allocator, stop=question_allocator.stop)
+
+    # фоновая запись состояний команд в БД
+    lifecycle.add('team states', start=team_state_store.start, stop=team_state_store.stop)
+    # журнал событий игры пишется пачками в фоне
+    lifecycle.add('game journal', start=game_journal.start, stop=game_journal.stop)
+    lifecycle.add('throttling stats', stop=lambda: logger.info(f"Throttling stats: {throttling.snapshot()}"))
+
+    if shard is not None:
+        lifecycle.add('rate limits', start=share_rate_limits)
+
+    # очередь исходящих сообщений с лимитами Telegram
+    lifecycle.add('outbox', start=outbox.start, stop=lambda: outbox.stop(SHUTDOWN_DRAIN_TIMEOUT))
+
+    # таймеры подсказок и вопросов, не сработавшие до остановки бота (в режиме cluster - только своих чатов).
+    # При остановке несработавшие таймеры остаются в scheduled_jobs, сработавшим дается время закончить
+    lifecycle.add(
+        'timers',
+        start=lambda: restore_timers(bot, owns_chat=shard.owns_chat if shard else None),
+        stop=lambda: timer_scheduler.stop(SHUTDOWN_DRAIN_TIMEOUT),
+    )
+    lifecycle.add('team actors', stop=handlers.team_actors.stop, timeout=SHUTDOWN_DRAIN_TIMEOUT)
+
+    # проверка картинок контента до начала игры (и их предзагрузка).
+    # В режиме cluster картинки уменьшает фронт-процесс до запуска воркеров, воркеры берут готовые
+    lifecycle.add(
+        'media',
+        start=lambda: prepare_media(bot, prewarm=shard is None or shard.index == 0, optimize=shard is None),
+        stop=stop_media_prewarm,
+    )
+
+    # останавливается первым: новые обновления уже не принимаются, дожидаемся начатых
+    lifecycle.add('in-flight updates', stop=lambda: in_flight.drain(SHUTDOWN_DRAIN_TIMEOUT))
+
+async def on_startup(shard: Shard = None):
+    """Запуск бота. shard - часть команд, которую обслуживает воркер в режиме cluster"""
+    register_middlewares(dp=dp)
+    register_handlers(dp=dp)
+    setup_logging()
+
+    register_lifecycle(lifecycle, shard)
+    await lifecycle.start()
+
+async def on_shutdown():
+    await lifecycle.stop()
+
+def create_webhook_app() -> web.Application:
+    """aiohttp-приложение, принимающее обновления от Telegram на WEBHOOK_PATH.
+    Обновление подтверждается ответом 200 сразу, обработка идет в фоне"""
+    app = web.Application()
+    SimpleRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        handle_in_background=True,
+        secret_token=WEBHOOK_SECRET,
+    ).register(app, path=WEBHOOK_PATH)
+    return app
+
+async def run_polling():
+    # getUpdates не работает, пока у бота установлен вебхук
+    await bot.delete_webhook()
+
+    # сигналы и сессию бота обрабатывает lifecycle: после остановки polling еще дорабатываются начатые обновления
+    polling = asyncio.create_task(dp.start_polling(bot, handle_signals=False, close_bot_session=False))
+    await lifecycle.wait_stop(polling)
+
+    if not polling.done():
+        await dp.stop_polling()
+    await polling
+
+async def serve_webhook_app(app: web.Application):
+    """Запускает aiohttp-приложение на WEBHOOK_HOST:WEBHOOK_PORT и работает до запроса остановки"""
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, WEBHOOK_HOST, WEBHOOK_PORT).start()
+    logger.info(f"Webhook server is listening on {WEBHOOK_HOST}:{WEBHOOK_PORT}{WEBHOOK_PATH}")
+
+    # без WEBHOOK_URL вебхук регистрируется вручную (например, за обратным прокси)
+    if WEBHOOK_URL:
+        await bot.set_webhook(
+            f"{WEBHOOK_URL.rstrip('/')}{WEBHOOK_PATH}",
+            secret_token=WEBHOOK_SECRET,
+            allowed_updates=dp.resolve_used_update_types(),
+        )
+
+    try:
+        await lifecycle.wait_stop()
+    finally:
+        # сервер закрывается до остановки остального: Telegram повторит недоставленные обновления
+        await runner.cleanup()
+
+async def run_webhook():
+    await serve_webhook_app(create_webhook_app())
+
+def run_worker(shard: Shard, updates):
+    """Точка входа процесса-воркера в режиме cluster"""
+    asyncio.run(serve_worker(shard, updates))
+
+async def serve_worker(shard: Shard, updates):
+    await on_startup(shard)
+    logger.info(f"{shard} is ready")
+    try:
+        await consume_updates(dp, bot, updates)
+    finally:
+        await on_shutdown()
+
+async def prepare_cluster():
+    """Миграции, фикстуры и оптимизация картинок - один раз, до запуска воркеров"""
+    from handlers.media import optimize_content_media
+
+    setup_logging()
     await init_db()
-    
     if DEBUG_MODE:
-        from db.fixtures import load_fixtures_from_json
-        try:
-            await load_fixtures_from_json()
-        except Exception as e:
-            print(f"⚠️ Ошибка загрузки фикстур: {e}")
+        await load_fixtures()
+
+    # воркеры только находят готовые варианты картинок в MEDIA_CACHE_DIR
+    await content_cache.load()
+    await optimize_content_media()
+
+async def run_front(pool: WorkerPool):
+    lifecycle.install_signal_handlers()
+
+    # обработчики нужны фронту только для списка allowed_updates вебхука
+    register_handlers(dp=dp)
+    await open_db_pool()
+
+    router = ShardRouter(pool.workers_count, USER_TEAM_CACHE_SIZE, CLUSTER_TEAM_CACHE_TTL)
+    try:
+        await serve_webhook_app(create_front_app(pool, router, WEBHOOK_PATH, WEBHOOK_SECRET))
+    finally:
+        await close_db_pool()
+        await bot.session.close()
+
+def run_cluster():
+    """Режим cluster: фронт-процесс принимает вебхук и раздает обновления
+    CLUSTER_WORKERS процессам-воркерам, команда всегда обслуживается одним воркером"""
+    asyncio.run(prepare_cluster())
+
+    pool = WorkerPool(CLUSTER_WORKERS, run_worker)
+    pool.start()
+    try:
+        asyncio.run(run_front(pool))
+    finally:
+        pool.stop()
 
 async def main():
-    await on_startup()
-    await dp.start_polling(bot)
+    lifecycle.install_signal_handlers()
+    try:
+        # при ошибке запуска останавливаются только уже запущенные этапы
+        await on_startup()
+        if RUN_MODE == 'webhook':
+            await run_webhook()
+        else:
+            await run_polling()
+    finally:
+        await on_shutdown()
 
 
 if __name__ == '__main__':
     print('Бот стартует...')
     try:
         print('Бот запущен')
-        asyncio.run(main())
-    except InterruptedError:
-        print('Бот выключен')
+        if RUN_MODE == 'cluster':
+            run_cluster()
+        else:
+            asyncio.run(main())
+    except (KeyboardInterrupt, InterruptedError):
+        pass
+    print('Бот выключен')
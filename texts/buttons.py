@@ -0,0 +1,15 @@
+# Подписи кнопок. По ним же бот узнает нажатия кнопок обычной клавиатуры (handlers/text_router.py)
+
+# обычная клавиатура
+MY_LOCATION = "Моя локация"
+PLAYERS_LOCATIONS = "Расстановка игроков"
+GET_LYRICS = "Получить текст кричалки"
+SET_LYRICS = "Установить кричалку"
+SET_LOCATION = "Поменять расстановку"
+START_QUEST = "Начать квест"
+START_QUEST_TEST = "Начать квест в тестовом режиме"
+
+# inline-кнопки
+SIGN_UP_AS_CAPTAIN = "Зарегистрироваться как капитан"
+SIGN_UP_AS_PLAYER = "Зарегистрироваться как участник"
+ACCEPT_STATE = "Принять ход"
@@ -0,0 +1,95 @@
+"""Скорость проверки ответов: прежнее сравнение строк и game.answers.AnswerMatcher.
+
+На каждый вопрос банка - попытки: точный ответ, ответ в другом регистре и с
+пунктуацией, ответ с опечаткой и чужой ответ. Запускается из корня репозитория:
+    python tools/bench_answer_matcher.py --rounds 2000
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from game.answers import AnswerMatcher
+from config.config import ANSWER_MAX_TYPOS, ANSWER_TYPO_MIN_LENGTH
+
+FIXTURES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'db', 'quest_fixtures.json')
+
+
+def old_match(text: str, answer: str) -> bool:
+    """Проверка, как было в process_answer: обе строки нормализуются на каждой попытке"""
+    return "".join(text.lower().strip().split()) == "".join(answer.lower().strip().split())
+
+
+def make_typo(answer: str, rng: random.Random) -> str:
+    letters = [index for index, char in enumerate(answer) if char.isalpha()]
+    if not letters:
+        return answer
+    index = rng.choice(letters[1:] or letters)
+    return answer[:index] + answer[index + 1:]    # пропущенная буква
+
+
+def make_attempts(questions: list[dict], rng: random.Random) -> list[tuple[dict, str, str]]:
+    """[(вопрос, вид попытки, текст), ...]"""
+    attempts = []
+    for question in questions:
+        answer = question['answer']
+        other = rng.choice([item for item in questions if item['answer'] != answer] or questions)
+        attempts += [
+            (question, 'exact', answer),
+            (question, 'styled', f" {answer.upper()}!"),
+            (question, 'typo', make_typo(answer, rng)),
+            (question, 'wrong', other['answer']),
+        ]
+    return attempts
+
+
+def bench(name: str, check, attempts: list, rounds: int):
+    timings = []
+    for _ in range(rounds):
+        started_at = time.perf_counter()
+        for question, _, text in attempts:
+            check(question, text)
+        timings.append(time.perf_counter() - started_at)
+
+    accepted = {}
+    for question, kind, text in attempts:
+        accepted[kind] = accepted.get(kind, 0) + bool(check(question, text))
+
+    per_kind = ', '.join(f"{kind} {count}/{len(attempts) // 4}" for kind, count in accepted.items())
+    print(f"{name:>18}: {min(timings) / len(attempts) * 1e6:6.2f} мкс на попытку; принято: {per_kind}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fixtures', default=FIXTURES_PATH, help="JSON с вопросами (формат фикстур)")
+    parser.add_argument('--rounds', type=int, default=2000)
+    parser.add_argument('--max-typos', type=int, default=ANSWER_MAX_TYPOS or 1,
+                        help="сколько опечаток прощать (по умолчанию ANSWER_MAX_TYPOS, но не меньше 1)")
+    args = parser.parse_args()
+
+    with open(args.fixtures, encoding='utf-8') as file:
+        questions = json.load(file)['questions']
+
+    started_at = time.perf_counter()
+    for question in questions:
+        question['answer_matcher'] = AnswerMatcher(
+            [question['answer'], *(question.get('answer_variants') or [])],
+            max_typos=args.max_typos,
+            min_length=ANSWER_TYPO_MIN_LENGTH,
+        )
+        question['exact_matcher'] = AnswerMatcher([question['answer'], *(question.get('answer_variants') or [])])
+    print(f"{len(questions)} вопросов, подготовка ответов: {(time.perf_counter() - started_at) * 1e6:.0f} мкс")
+
+    attempts = make_attempts(questions, random.Random(1))
+
+    bench('как было', lambda question, text: old_match(text, question['answer']), attempts, args.rounds)
+    bench('точное совпадение', lambda question, text: question['exact_matcher'].match(text), attempts, args.rounds)
+    bench(f"опечатки <= {args.max_typos}", lambda question, text: question['answer_matcher'].match(text), attempts, args.rounds)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Сравнение скорости FSM-хранилищ: aiogram MemoryStorage и fsm.sqlite_storage.SQLiteStorage.
+
+Запускается из корня репозитория, БД создается во временной папке:
+    python tools/bench_fsm_storage.py --users 1000 --rounds 20
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# относительный DB_PATH из конфига будет указывать во временную папку
+os.chdir(tempfile.mkdtemp(prefix='fsm_bench_'))
+
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from db.database import init_db, open_db_pool, close_db_pool
+from fsm.sqlite_storage import SQLiteStorage
+from fsm.quest_logic import QuestStates
+
+
+async def run_round(storage, keys: list[StorageKey]) -> float:
+    """Один "ход" каждого игрока: как в обработчике - прочитать состояние и данные, записать новые"""
+    started_at = time.perf_counter()
+
+    for key in keys:
+        await storage.get_state(key)
+        await storage.get_data(key)
+        await storage.set_state(key, QuestStates.waiting_for_answer)
+        await storage.update_data(key, {'question_num': 1})
+
+    return time.perf_counter() - started_at
+
+
+async def bench(name: str, storage, keys: list[StorageKey], rounds: int):
+    timings = [await run_round(storage, keys) for _ in range(rounds)]
+    ops = len(keys) * 5    # get_state, get_data, set_state, update_data (= get_data + set_data)
+
+    best = min(timings)
+    print(f"{name:>14}: {best / ops * 1e6:7.2f} мкс/операция, "
+          f"{best / len(keys) * 1e6:7.2f} мкс на обновление игрока")
+
+    if isinstance(storage, SQLiteStorage):
+        started_at = time.perf_counter()
+        for key in keys:
+            await storage.set_state(key, QuestStates.waiting_for_location_confirmation)
+        await storage.flush()
+        print(f"{'flush':>14}: {(time.perf_counter() - started_at) * 1000:7.2f} мс на {len(keys)} изменений")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+
+    keys = [StorageKey(bot_id=1, chat_id=user_id, user_id=user_id) for user_id in range(args.users)]
+
+    await init_db()
+    await open_db_pool()
+
+    await bench('MemoryStorage', MemoryStorage(), keys, args.rounds)
+
+    storage = SQLiteStorage(flush_interval=0.5, ttl=3600)
+    await storage.open()
+    await bench('SQLiteStorage', storage, keys, args.rounds)
+    await storage.close()
+
+    # без отложенной записи: каждое изменение - отдельная транзакция
+    storage = SQLiteStorage(flush_interval=0, ttl=3600)
+    await storage.open()
+    await bench('без батчинга', storage, keys[:200], 3)
+    await storage.close()
+
+    await close_db_pool()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,86 @@
+"""Скорость переходов game.engine: полная игра команды без Telegram и БД.
+
+Запускается из корня репозитория:
+    python tools/bench_game_engine.py --teams 1000 --rounds 20
+"""
+import os
+import sys
+import time
+import argparse
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from game import engine
+from game.engine import TeamGame, AdvanceTurn
+
+QUESTIONS = [
+    {'id': location_id, 'question_text': f"Вопрос {location_id}", 'answer': f"Ответ {location_id}",
+     'media_path': None, 'answer_hints': ['a', 'b', 'c'], 'hints_media_paths': [None, None, None]}
+    for location_id in range(1, engine.TEAM_SIZE + 1)
+]
+LOCATIONS = {location_id: {'letter_for_location': 'А', 'image_path': None}
+             for location_id in range(1, engine.TEAM_SIZE + 2)}
+
+
+def play(team_id: int, now: datetime) -> int:
+    """Одна игра: старт, и на каждой локации - принятие хода, неверный и верный ответ, прибытие.
+    Возвращает кол-во эффектов"""
+    players = [{'id': team_id * 10 + i, 'location': i + 1} for i in range(engine.TEAM_SIZE)]
+    players = engine.arrange_players(players, is_test_mode=False)
+
+    effects = engine.start_game(team_id, players[0]['id'], players, QUESTIONS[0], now)
+    game = TeamGame(team_id, [player['id'] for player in players], current_question_id=1,
+                    status='playing', created_at=now)
+    count = len(effects)
+
+    for idx in range(engine.TEAM_SIZE):
+        user_id = game.current_player_id
+        question = QUESTIONS[idx]
+
+        if idx:
+            count += len(engine.accept_turn(game, user_id, user_id, question, now))
+
+        count += len(engine.submit_answer(game, user_id, user_id, "не то", question, now))
+        effects = engine.submit_answer(game, user_id, user_id, question['answer'], question, now,
+                                       next_location=LOCATIONS[idx + 2], team_name="Команда")
+        count += len(effects)
+
+        # применяем переход хода к состоянию в памяти, как это сделала бы БД
+        for effect in effects:
+            if isinstance(effect, AdvanceTurn):
+                for name, value in effect.fields.items():
+                    if name in TeamGame.__slots__:
+                        setattr(game, name, value)
+                game.version += 1
+
+        if idx + 1 < engine.TEAM_SIZE:
+            count += len(engine.confirm_arrival(game, "user"))
+
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--teams', type=int, default=1000)
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+
+    now = datetime.now()
+    timings = []
+
+    for _ in range(args.rounds):
+        started_at = time.perf_counter()
+        effects_count = sum(play(team_id, now) for team_id in range(args.teams))
+        timings.append(time.perf_counter() - started_at)
+
+    # на игру: старт + по локациям принятие хода, два ответа и прибытие
+    transitions = args.teams * (1 + engine.TEAM_SIZE * 4 - 2)
+    best = min(timings)
+    print(f"{args.teams} игр за {best * 1000:.1f} мс: "
+          f"{best / transitions * 1e6:.2f} мкс на переход, "
+          f"{best / effects_count * 1e6:.3f} мкс на эффект ({effects_count // args.teams} эффектов на игру)")
+
+
+if __name__ == '__main__':
+    main()
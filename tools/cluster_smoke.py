@@ -0,0 +1,238 @@
+"""Проверка режима cluster без Telegram: несколько процессов-воркеров одновременно
+обрабатывают поток обновлений множества команд.
+
+Проверяется, что все обновления одной команды попадают в один процесс и
+обрабатываются в порядке поступления, а нагрузка распределяется по воркерам.
+Вторая проверка проходит путь настоящего бота: фронт выбирает воркер через
+ShardRouter по игрокам в БД, воркер передает JSON обновления в
+consume_updates -> dp.feed_raw_update. Игроки без команды по ходу проверки
+вступают в команды, и их обновления должны сразу перейти к воркеру команды.
+БД создается во временной папке.
+    python tools/cluster_smoke.py --workers 4 --teams 40 --updates 2000
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import threading
+import multiprocessing
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# относительный DB_PATH из конфига будет указывать во временную папку
+os.chdir(tempfile.mkdtemp(prefix='cluster_smoke_'))
+
+from aiogram import Bot, Dispatcher, types
+
+from db.database import init_db, get_db_connection
+from cluster.sharding import shard_index, ShardRouter
+from cluster.workers import WorkerPool, consume_updates
+
+SMOKE_TOKEN = '42:SMOKE'    # запросы в Telegram не отправляются
+PLAYERS_PER_TEAM = 3
+NEWCOMERS = 20              # игроки без команды, вступающие в команды по ходу проверки
+NEWCOMER_ID = 1_000_000
+
+_context = multiprocessing.get_context('fork')
+results = _context.Queue()
+
+
+def handle_updates(shard, updates):
+    """Воркер-заглушка: "обрабатывает" обновление и сообщает, где и в каком порядке"""
+    while (update := updates.get()) is not None:
+        time.sleep(random.random() / 1000)    # медленный обработчик не должен задерживать другие воркеры
+        results.put((update['team_id'], update['seq'], shard.index, os.getpid()))
+    results.put(None)
+
+
+def handle_raw_updates(shard, updates):
+    """Воркер с диспетчером aiogram: обработчик сообщает, чье сообщение и где обработано"""
+    dp = Dispatcher()
+
+    @dp.message()
+    async def record(message: types.Message):
+        results.put((message.from_user.id, int(message.text), shard.index, os.getpid()))
+
+    asyncio.run(consume_updates(dp, Bot(SMOKE_TOKEN), updates, poll_interval=0.1))
+    results.put(None)
+
+
+def stop_and_collect(pool: WorkerPool) -> list[tuple]:
+    """Останавливает воркеры, параллельно забирая результаты: иначе воркер может
+    не завершиться, пока его результаты не прочитаны из очереди"""
+    workers_count = pool.workers_count
+    stopper = threading.Thread(target=pool.stop)
+    stopper.start()
+
+    handled = []
+    finished = 0
+    while finished < workers_count:
+        item = results.get()
+        if item is None:
+            finished += 1
+        else:
+            handled.append(item)
+
+    stopper.join()
+    return handled
+
+
+def message_update(update_id: int, user_id: int, text: str) -> dict:
+    """JSON обновления с личным сообщением, как его присылает Telegram"""
+    user = {'id': user_id, 'is_bot': False, 'first_name': f"Игрок {user_id}"}
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'date': int(datetime.now().timestamp()),
+            'chat': {'id': user_id, 'type': 'private', 'first_name': user['first_name']},
+            'from': user,
+            'text': text,
+        },
+    }
+
+
+def check_worker_pool(args) -> list[str]:
+    """Пул со воркерами-заглушками: привязка команд к процессам и порядок"""
+    pool = WorkerPool(args.workers, handle_updates)
+    pool.start()
+
+    started_at = time.perf_counter()
+    sent = {}    # {team_id: кол-во отправленных обновлений}
+    for _ in range(args.updates):
+        team_id = random.randrange(1, args.teams + 1)
+        seq = sent[team_id] = sent.get(team_id, 0) + 1
+        pool.dispatch(shard_index(team_id, 0, args.workers), {'team_id': team_id, 'seq': seq})
+
+    handled = stop_and_collect(pool)
+    elapsed = time.perf_counter() - started_at
+
+    processes = {}      # {team_id: {pid, ...}}
+    sequences = {}      # {team_id: [seq, ...]} в порядке обработки
+    load = {}           # {pid: кол-во обновлений}
+    for team_id, seq, _, pid in handled:
+        processes.setdefault(team_id, set()).add(pid)
+        sequences.setdefault(team_id, []).append(seq)
+        load[pid] = load.get(pid, 0) + 1
+
+    errors = []
+    if len(handled) != args.updates:
+        errors.append(f"обработано {len(handled)} из {args.updates} обновлений")
+    errors += [f"команда {team_id} обработана в процессах {pids}" for team_id, pids in processes.items() if len(pids) > 1]
+    errors += [f"команда {team_id}: нарушен порядок" for team_id, seqs in sequences.items() if seqs != sorted(seqs)]
+
+    print(f"Обработано {len(handled)} обновлений за {elapsed:.2f} с, по процессам: {sorted(load.values())}")
+    return errors
+
+
+async def create_players(teams_count: int) -> dict[int, int | None]:
+    """Команды с игроками и игроки без команды в БД, {user_id: team_id}"""
+    await init_db()
+
+    teams = {team_id * 100 + number: team_id
+             for team_id in range(1, teams_count + 1) for number in range(PLAYERS_PER_TEAM)}
+    newcomers = {NEWCOMER_ID + number: None for number in range(NEWCOMERS)}
+
+    async with get_db_connection() as conn:
+        await conn.executemany(
+            "INSERT INTO teams (id, name, admin_id) VALUES (?, ?, 0)",
+            [(team_id, f"Команда {team_id}") for team_id in range(1, teams_count + 1)]
+        )
+        await conn.executemany(
+            "INSERT INTO players (user_id, username, team_id) VALUES (?, ?, ?)",
+            [(user_id, f"player{user_id}", team_id) for user_id, team_id in {**teams, **newcomers}.items()]
+        )
+        await conn.commit()
+
+    return {**teams, **newcomers}
+
+
+async def join_teams(players: dict[int, int | None], teams_count: int):
+    """Игроки без команды вступают в команды (как join_team по ссылке-приглашению)"""
+    joined = {user_id: user_id % teams_count + 1 for user_id, team_id in players.items() if team_id is None}
+
+    async with get_db_connection() as conn:
+        await conn.executemany(
+            "UPDATE players SET team_id = ? WHERE user_id = ?",
+            [(team_id, user_id) for user_id, team_id in joined.items()]
+        )
+        await conn.commit()
+
+    players.update(joined)
+
+
+async def route_updates(pool: WorkerPool, router: ShardRouter, players: dict[int, int | None],
+                        teams_count: int, updates_count: int) -> dict[int, tuple[int, int | None]]:
+    """Фронт: обновления случайных игроков через ShardRouter, на середине - вступление в команды.
+    Возвращает {номер обновления: (user_id, команда игрока в момент отправки)}"""
+    sent = {}
+    users = list(players)
+
+    for seq in range(1, updates_count + 1):
+        if seq == updates_count // 2:
+            await join_teams(players, teams_count)
+
+        user_id = random.choice(users)
+        update = message_update(seq, user_id, str(seq))
+        pool.dispatch(await router.resolve(update), update)
+        sent[seq] = (user_id, players[user_id])
+
+    return sent
+
+
+def check_dispatcher(args) -> list[str]:
+    """Настоящий путь обновления: ShardRouter -> очередь воркера -> consume_updates -> dp.feed_raw_update"""
+    players = asyncio.run(create_players(args.teams))
+
+    pool = WorkerPool(args.workers, handle_raw_updates)
+    pool.start()
+
+    started_at = time.perf_counter()
+    router = ShardRouter(args.workers, maxsize=10_000, ttl=60)
+    sent = asyncio.run(route_updates(pool, router, players, args.teams, args.updates))
+    handled = stop_and_collect(pool)
+    elapsed = time.perf_counter() - started_at
+
+    processes = {}    # {команда или игрок без команды: {pid, ...}}
+    for user_id, seq, _, pid in handled:
+        sent_user_id, team_id = sent[seq]
+        if sent_user_id != user_id:
+            return [f"обновление {seq} игрока {sent_user_id} обработано как сообщение игрока {user_id}"]
+
+        owner = f"команда {team_id}" if team_id is not None else f"игрок {user_id} без команды"
+        processes.setdefault(owner, set()).add(pid)
+
+    errors = []
+    if len(handled) != len(sent):
+        errors.append(f"через диспетчер обработано {len(handled)} из {len(sent)} обновлений")
+    errors += [f"{owner} обработан(а) в процессах {pids}" for owner, pids in processes.items() if len(pids) > 1]
+
+    print(f"Через диспетчер обработано {len(handled)} обновлений за {elapsed:.2f} с "
+          f"({NEWCOMERS} игроков вступили в команды по ходу проверки)")
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--teams', type=int, default=40)
+    parser.add_argument('--updates', type=int, default=2000)
+    args = parser.parse_args()
+
+    errors = check_worker_pool(args)
+    errors += check_dispatcher(args)
+
+    for error in errors:
+        print(f"❌ {error}")
+    if not errors:
+        print("✅ Каждая команда обслуживается одним воркером, порядок сохранен, "
+              "вступившие в команду игроки перешли к воркеру команды")
+
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,46 @@
+"""История игры команды по журналу game_events и ее состояние на любой момент.
+
+Запускается из корня репозитория (БД - DB_PATH из конфига):
+    python tools/game_history.py 1                          # все события и текущее состояние
+    python tools/game_history.py 1 --seq 12                 # состояние после 12-го события
+    python tools/game_history.py 1 --at "2026-05-01 14:30"  # состояние на момент времени
+"""
+import os
+import sys
+import json
+import asyncio
+import argparse
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db.database import open_db_pool, close_db_pool
+from db.game_journal import game_journal
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('team_id', type=int)
+    parser.add_argument('--seq', type=int, help="номер события, после которого показать состояние")
+    parser.add_argument('--at', help="момент времени, например '2026-05-01 14:30'")
+    args = parser.parse_args()
+
+    until_ts = datetime.fromisoformat(args.at).timestamp() if args.at else None
+
+    await open_db_pool()
+    try:
+        state, seq = await game_journal.replay(args.team_id, until_seq=args.seq, until_ts=until_ts)
+        events = await game_journal.get_events(args.team_id, until_seq=seq)
+    finally:
+        await close_db_pool()
+
+    for event in events:
+        moment = datetime.fromtimestamp(event['ts']).strftime('%Y-%m-%d %H:%M:%S')
+        print(f"#{event['seq']:<5} {moment}  {event['type']:<9} {json.dumps(event['payload'], ensure_ascii=False)}")
+
+    print(f"\nСостояние после события #{seq}:")
+    print(json.dumps(state, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,73 @@
+"""Отправляет записанные Update из JSON-файла на вебхук бота (RUN_MODE = 'webhook').
+
+Файл - JSON-массив обновлений или по одному обновлению в строке (JSON Lines).
+Пример:
+    python tools/replay_updates.py tools/sample_updates.json --url http://localhost:8000/webhook --secret SECRET
+"""
+import sys
+import json
+import time
+import asyncio
+import argparse
+import aiohttp
+
+
+def load_updates(path: str) -> list[dict]:
+    with open(path, encoding='utf-8') as file:
+        text = file.read().strip()
+
+    if text.startswith('['):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+async def post_update(session: aiohttp.ClientSession, url: str, headers: dict, update: dict) -> tuple[int, float]:
+    started_at = time.perf_counter()
+    async with session.post(url, json=update, headers=headers) as response:
+        await response.read()
+        return response.status, time.perf_counter() - started_at
+
+
+async def replay(updates: list[dict], url: str, secret: str | None, delay: float, concurrency: int):
+    headers = {'X-Telegram-Bot-Api-Secret-Token': secret} if secret else {}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with aiohttp.ClientSession() as session:
+        async def send(update: dict):
+            async with semaphore:
+                status, elapsed = await post_update(session, url, headers, update)
+                print(f"update_id={update.get('update_id')}: HTTP {status}, {elapsed * 1000:.1f} мс")
+                return status, elapsed
+
+        tasks = []
+        for update in updates:
+            tasks.append(asyncio.create_task(send(update)))
+            if delay:
+                await asyncio.sleep(delay)
+
+        results = await asyncio.gather(*tasks)
+
+    failed = sum(status != 200 for status, _ in results)
+    latencies = sorted(elapsed for _, elapsed in results)
+    if latencies:
+        print(f"Отправлено: {len(results)}, ошибок: {failed}, "
+              f"медиана: {latencies[len(latencies) // 2] * 1000:.1f} мс, максимум: {latencies[-1] * 1000:.1f} мс")
+
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('path', help="JSON-файл с обновлениями")
+    parser.add_argument('--url', default='http://localhost:8000/webhook')
+    parser.add_argument('--secret', default=None, help="значение WEBHOOK_SECRET")
+    parser.add_argument('--delay', type=float, default=0, help="пауза между обновлениями, в секундах")
+    parser.add_argument('--concurrency', type=int, default=10, help="сколько запросов держать одновременно")
+    args = parser.parse_args()
+
+    failed = asyncio.run(replay(load_updates(args.path), args.url, args.secret, args.delay, args.concurrency))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""Проверка таймеров при перезапуске без Telegram: отмененные таймеры вопроса и
+подсказок (ответ дан) не должны восстанавливаться, неотмененные - должны.
+
+Запускается из корня репозитория, запросы в Telegram не отправляются (токен
+подставляется фиктивный), БД создается во временной папке:
+    python tools/timers_restart_check.py
+"""
+import os
+import sys
+import asyncio
+import tempfile
+import itertools
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# относительный DB_PATH из конфига будет указывать во временную папку
+os.chdir(tempfile.mkdtemp(prefix='timers_check_'))
+
+from aiogram import Bot, types
+from aiogram.client.session.base import BaseSession
+
+import config.config
+config.config.BOT_TOKEN = CHECK_TOKEN = '42:TIMERS'    # main создает Bot из конфига, токен из примера не проходит проверку
+
+import handlers.commands    # порядок импорта как при запуске бота: commands -> main
+from db.database import init_db, open_db_pool, close_db_pool
+from db.help_db_commands import get_scheduled_jobs
+from handlers.scheduler import TimerScheduler
+from handlers.timer_manager import TimerManager, QuestionTimerManager, restore_timers
+
+ANSWERED_CHAT_ID = 100    # игрок ответил: таймеры отменены
+WAITING_CHAT_ID = 200     # игрок еще думает: таймеры должны пережить перезапуск
+
+
+class OfflineSession(BaseSession):
+    """Сессия без сети: на отправку и правку сообщений отвечает как Telegram"""
+    _message_ids = itertools.count(1)
+
+    async def make_request(self, bot, method, timeout=None):
+        return types.Message.model_validate(
+            {'message_id': next(self._message_ids), 'date': int(datetime.now().timestamp()),
+             'chat': {'id': method.chat_id, 'type': 'private'}, 'text': getattr(method, 'text', None)},
+            context={'bot': bot}
+        )
+
+    async def close(self):
+        pass
+
+    async def stream_content(self, *args, **kwargs):
+        raise NotImplementedError
+
+
+async def arm(bot: Bot, timer_manager: TimerManager, question_timer_manager: QuestionTimerManager, chat_id: int):
+    """Таймеры вопроса, как их взводит handlers/effects.py"""
+    await question_timer_manager.add_timer(chat_id, bot, delay=5, message="Время вышло!", timer_id="question_timer")
+    for number in (1, 2, 3):
+        await timer_manager.add_timer(chat_id, bot, number, message=f"Подсказка #{number}", media_path=None,
+                                      timer_id=f"clue{number}")
+
+
+async def main():
+    bot = Bot(CHECK_TOKEN, session=OfflineSession())
+    await init_db()
+    await open_db_pool()
+
+    # до перезапуска: оба игрока получили вопрос, первый ответил
+    scheduler = TimerScheduler()
+    timer_manager, question_timer_manager = TimerManager(scheduler), QuestionTimerManager(scheduler)
+    for chat_id in (ANSWERED_CHAT_ID, WAITING_CHAT_ID):
+        await arm(bot, timer_manager, question_timer_manager, chat_id)
+
+    # как при правильном ответе (эффект CancelQuestionTimers)
+    await timer_manager.cancel_timer(ANSWERED_CHAT_ID)
+    await question_timer_manager.cancel_timer(ANSWERED_CHAT_ID, "question_timer")
+    await scheduler.stop()
+
+    # после перезапуска: новый планировщик восстанавливает таймеры из scheduled_jobs
+    scheduler = TimerScheduler()
+    TimerManager(scheduler), QuestionTimerManager(scheduler)
+    await restore_timers(bot)
+
+    saved = {(job['chat_id'], job['kind'], job['timer_id']) for job in await get_scheduled_jobs(0)}
+    restored = {(chat_id, *key) for chat_id, timers in scheduler._timers.items() for key in timers}
+    await scheduler.stop()
+    await close_db_pool()
+
+    expected = {(WAITING_CHAT_ID, 'question', 'question_timer')}
+    expected |= {(WAITING_CHAT_ID, 'clue', f"clue{number}") for number in (1, 2, 3)}
+
+    errors = []
+    if saved != expected:
+        errors.append(f"в scheduled_jobs: {sorted(saved)}, ожидалось {sorted(expected)}")
+    if restored != expected:
+        errors.append(f"восстановлены таймеры: {sorted(restored)}, ожидалось {sorted(expected)}")
+
+    for error in errors:
+        print(f"❌ {error}")
+    if not errors:
+        print("✅ Отмененные таймеры не восстанавливаются, остальные восстановлены")
+
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(asyncio.run(main()))